@@ -0,0 +1,196 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from label_ingest import natural_sort_key
+from ellipse_fit import FIT_METHOD_HELP, FIT_METHODS, fit_ellipses
+from label_cache import CACHE_SUFFIX, load_labels
+from label_archive import ARCHIVE_EXTENSIONS, is_label_archive, read_archive_members, read_label_source, parse_class_names
+from yolo2df import ellipse_frame, save_dataset
+
+DATA_ROOTS = ['Data', 'Data-NoCrash']
+CLIP_SUFFIX = '-yolo'
+
+
+def read_class_names(clip_dir):
+    """Read the class names of a YOLO export from its data.yaml."""
+    yaml_file = os.path.join(clip_dir, 'data.yaml')
+    if not os.path.exists(yaml_file):
+        return {}
+    with open(yaml_file, 'rb') as f:
+        return parse_class_names(f.read())
+
+def source_class_names(source):
+    """
+    Class names for a label source: the data.yaml inside an archive, or the
+    clip's data.yaml for a <clip>/labels/<split> directory.
+    """
+    if is_label_archive(source):
+        return parse_class_names(read_archive_members(source, select=lambda name: False)[3])
+    return read_class_names(os.path.dirname(os.path.dirname(os.path.normpath(source))))
+
+def wheel_classes(class_names, front=0, rear=1):
+    """
+    (front, rear) class ids from class names such as 'Front wheel' and
+    'Rear Wheel'. With two classes one named side is enough; the given
+    defaults are used when the names are missing or ambiguous.
+    """
+    class_names = class_names or {}
+    matches = {}
+    for key in ('front', 'rear'):
+        ids = [class_id for class_id, name in class_names.items() if key in str(name).lower()]
+        matches[key] = ids[0] if len(ids) == 1 else None
+    if len(class_names) == 2:
+        # e.g. {0: 'Rear wheel', 1: 'wheel'}: the other class is the other wheel
+        for key, other in (('front', 'rear'), ('rear', 'front')):
+            if matches[key] is None and matches[other] is not None:
+                matches[key] = next(class_id for class_id in class_names if class_id != matches[other])
+    if matches['front'] is None or matches['rear'] is None or matches['front'] == matches['rear']:
+        return front, rear
+    return matches['front'], matches['rear']
+
+def clip_category(clip_dir):
+    """'nocrash' for clips under Data-NoCrash/ or named *nocrash*, 'crash' otherwise."""
+    parts = os.path.normpath(clip_dir).lower().split(os.sep)
+    return 'nocrash' if any('nocrash' in part for part in parts) else 'crash'
+
+def discover_clips(roots=DATA_ROOTS):
+    """Find every <root>/*-yolo/labels/<split> directory."""
+    clips = []
+    for root in roots:
+        if not os.path.isdir(root):
+            continue
+        for name in sorted(os.listdir(root), key=natural_sort_key):
+            clip_dir = os.path.join(root, name)
+            labels_dir = os.path.join(clip_dir, 'labels')
+            if not name.endswith(CLIP_SUFFIX) or not os.path.isdir(labels_dir):
+                continue
+            for split in sorted(os.listdir(labels_dir)):
+                label_dir = os.path.join(labels_dir, split)
+                if os.path.isdir(label_dir) and not split.endswith(CACHE_SUFFIX):
+                    clips.append({
+                        'clip_id': name,
+                        'split': split,
+                        'category': clip_category(clip_dir),
+                        'class_names': read_class_names(clip_dir),
+                        'source': label_dir
+                    })
+    return clips
+
+def discover_archive_clips(roots=DATA_ROOTS):
+    """Find every *-yolo zip/tar archive one level below the roots (e.g. Data/Data_zip/)."""
+    clips = []
+    for root in roots:
+        if not os.path.isdir(root):
+            continue
+        for sub in sorted(os.listdir(root)):
+            archive_dir = os.path.join(root, sub)
+            if not os.path.isdir(archive_dir):
+                continue
+            for name in sorted(os.listdir(archive_dir), key=natural_sort_key):
+                for ext in ARCHIVE_EXTENSIONS:
+                    if name.lower().endswith(ext) and name[:-len(ext)].endswith(CLIP_SUFFIX):
+                        clips.append({
+                            'clip_id': name[:-len(ext)],
+                            'split': None,
+                            'category': clip_category(os.path.join(root, name)),
+                            'class_names': None,
+                            'source': os.path.join(archive_dir, name)
+                        })
+                        break
+    return clips
+
+def ingest_clip(clip, use_cache=True, fit_method='moments'):
+    """Parse one clip (directory or archive) and tag its rows. Runs inside a worker process."""
+    start = time.perf_counter()
+    if use_cache:
+        labels, ellipses = load_labels(clip['source'])
+    else:
+        labels = read_label_source(clip['source'])
+        ellipses = None
+    # The cache stores vertex-moment fits; other methods refit the cached polygons
+    if ellipses is None or fit_method != 'moments':
+        ellipses = fit_ellipses(labels, fit_method)
+
+    # Archives carry their own split and data.yaml
+    split = labels.get('split', clip['split'])
+    class_names = labels.get('class_names', clip['class_names']) or {}
+
+    df = ellipse_frame(labels, ellipses)
+    df.insert(0, 'clip_id', clip['clip_id'])
+    df.insert(1, 'split', split)
+    df.insert(2, 'category', clip['category'])
+    df['class_name'] = df['class_id'].map(class_names).fillna('')
+
+    timing = {
+        'clip_id': clip['clip_id'],
+        'files': len(labels['files']),
+        'polygons': len(df),
+        'seconds': time.perf_counter() - start,
+        'pid': os.getpid()
+    }
+    return df, timing
+
+def ingest_dataset(clips, workers=None, use_cache=True, fit_method='moments'):
+    """Parse all clips in a process pool and return (combined DataFrame, per-clip timings)."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(ingest_clip, clips, [use_cache] * len(clips), [fit_method] * len(clips)))
+
+    frames = [df for df, _ in results]
+    timings = pd.DataFrame([timing for _, timing in results])
+    dataset = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    for column in ('clip_id', 'split', 'category', 'class_name'):
+        if column in dataset:
+            dataset[column] = dataset[column].astype('category')
+    return dataset, timings
+
+def print_timing_report(timings, wall_time, straggler_factor=2.0):
+    """Print per-clip parse times, slowest first, flagging clips well above the median."""
+    if timings.empty:
+        print("No clips found")
+        return
+    median = np.median(timings['seconds'])
+    busy = timings['seconds'].sum()
+
+    print("\n=== Per-clip Timing ===")
+    for _, row in timings.sort_values('seconds', ascending=False).iterrows():
+        flag = '  <- straggler' if row['seconds'] > straggler_factor * median else ''
+        print(f"{row['clip_id']:<24} {row['files']:>6} files {row['polygons']:>7} polygons "
+              f"{row['seconds'] * 1000:>9.1f} ms (pid {row['pid']}){flag}")
+    print(f"Wall time: {wall_time:.2f} s, summed clip time: {busy:.2f} s "
+          f"(parallel speedup {busy / wall_time:.1f}x)")
+    print("=======================")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build one ML dataset from every YOLOv8 clip export.')
+    parser.add_argument('roots', type=str, nargs='*', default=DATA_ROOTS,
+                       help='Directories containing *-yolo clip exports (default: Data Data-NoCrash)')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: all cores)')
+    parser.add_argument('--output', type=str, default='ellipse_dataset',
+                       help='Output filename (without extension unless --csv-only)')
+    parser.add_argument('--csv-only', action='store_true', help='Save only CSV format')
+    parser.add_argument('--no-cache', action='store_true', help='Always re-parse the label files')
+    parser.add_argument('--archives', action='store_true',
+                       help='Read the zipped exports (e.g. Data/Data_zip/*-yolo.zip) instead of extracted folders')
+    parser.add_argument('--fit-method', type=str, default='moments', choices=FIT_METHODS, help=FIT_METHOD_HELP)
+
+    args = parser.parse_args()
+
+    clips = discover_archive_clips(args.roots) if args.archives else discover_clips(args.roots)
+    start = time.perf_counter()
+    dataset, timings = ingest_dataset(clips, args.workers, use_cache=not args.no_cache,
+                                       fit_method=args.fit_method)
+    wall_time = time.perf_counter() - start
+
+    print_timing_report(timings, wall_time)
+    save_dataset(dataset, args.output, csv_only=args.csv_only)
+
+    print("\nDataset Summary:")
+    print(f"Clips: {len(clips)}")
+    print(f"Total records: {len(dataset)}")
+    if len(dataset):
+        print(dataset.groupby(['category', 'class_name'], observed=True).size())
@@ -0,0 +1,182 @@
+import os
+import time
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from concurrent.futures import ProcessPoolExecutor
+from label_cache import process_directory
+from track_filter import apply_filters
+from track_grid import common_frames
+from plot_decimation import DecimatedLine
+from batch_ingest import wheel_classes
+
+FIGURE_FORMATS = ('png', 'svg', 'pdf')
+WHEELS = (('Front', 'turquoise'), ('Rear', 'red'))  # drawn for the (front, rear) class ids of each clip
+DIFF_COLORS = ('green', 'orange')
+
+_template = None  # one per worker process
+
+
+class FigureTemplate:
+    """
+    The visualize_filtered9 panel layout built once: axes, titles, legends
+    and one decimated line artist per wheel and panel. render() only swaps
+    the line data and rescales, so a worker never rebuilds a figure.
+    """
+
+    def __init__(self, show_raw=False, absolute_diff=True, font_size=16):
+        matplotlib.rcParams.update({'font.size': font_size})
+        self.figure = Figure(figsize=(18, 12), layout='constrained')
+        FigureCanvasAgg(self.figure)
+        axes = self.figure.subplots(2, 3)
+        self.x_axis, self.y_axis, self.ratio_axis = axes[0]
+        self.x_diff_axis, self.y_diff_axis, self.angle_axis = axes[1]
+        self.show_raw = show_raw
+        self.absolute_diff = absolute_diff
+
+        panels = {
+            'x_pos': (self.x_axis, '$x$ Position', '$x$ position (pixels)'),
+            'y_pos': (self.y_axis, '$y$ Position', '$y$ position (pixels)'),
+            'ratio': (self.ratio_axis, 'Major/Minor Axis Ratio', 'Ratio (major/minor)'),
+            'angles': (self.angle_axis, 'Angle', 'Angle (degrees)'),
+        }
+        self.lines = {}
+        for key, (ax, title, ylabel) in panels.items():
+            ax.set_title(title, fontweight='bold')
+            ax.set_ylabel(ylabel)
+            ax.grid(True)
+            for wheel, (name, color) in enumerate(WHEELS):
+                if show_raw:
+                    line, = ax.plot([], [], '-', color=color, alpha=0.3, label=f'{name} wheel raw')
+                    self.lines[key, wheel, 'raw'] = DecimatedLine(ax, line, [], [])
+                line, = ax.plot([], [], '-', color=color, linewidth=2, label=f'{name} wheel filtered')
+                self.lines[key, wheel, 'filtered'] = DecimatedLine(ax, line, [], [])
+        self.y_axis.invert_yaxis()
+        self.ratio_axis.axhline(1.0, color='gray', linestyle='--', alpha=0.5)
+        self.angle_axis.set_xlabel('Frame number')
+        for ax in (self.x_axis, self.ratio_axis):
+            ax.legend()
+
+        self.diff_lines = {}
+        self.missing = {}
+        for key, ax, axis, color in (('x_difference', self.x_diff_axis, 'x', DIFF_COLORS[0]),
+                                     ('y_difference', self.y_diff_axis, 'y', DIFF_COLORS[1])):
+            line, = ax.plot([], [], '-', color=color, label=f'${axis}$ Difference')
+            self.diff_lines[key] = DecimatedLine(ax, line, [], [])
+            ax.set_title(f'${axis}$ Distance', fontweight='bold')
+            ax.set_xlabel('Frame number')
+            ax.set_ylabel(f'${axis}$ Distance (pixels)')
+            ax.legend()
+            ax.grid(True)
+            if not absolute_diff:
+                ax.axhline(0, color='black', linestyle='--', alpha=0.5)
+            self.missing[key] = ax.text(0.5, 0.5, 'Not enough ellipses for difference calculation',
+                                        ha='center', va='center', transform=ax.transAxes, visible=False)
+        self.title = self.figure.suptitle('')
+
+    def render(self, title, tracking_data, filtered_data, wheels=(0, 1)):
+        """Load one clip's data into the artists; wheels are its (front, rear) class ids."""
+        for (key, wheel, kind), line in self.lines.items():
+            data = tracking_data if kind == 'raw' else filtered_data
+            class_id = wheels[wheel]
+            if class_id not in data:
+                line.set_data([], [])
+                continue
+            track = data[class_id]
+            if key == 'ratio':
+                values = np.asarray(track['major_axes']) / np.asarray(track['minor_axes'])
+            else:
+                values = track[key]
+            line.set_data(track['frames'], values)
+
+        differences = calculate_differences(filtered_data, self.absolute_diff, *wheels)
+        for key, line in self.diff_lines.items():
+            if differences is None:
+                line.set_data([], [])
+            else:
+                line.set_data(differences['frames'], differences[key])
+            self.missing[key].set_visible(differences is None)
+
+        for ax in self.figure.axes:
+            ax.relim()
+            ax.autoscale_view()
+        self.title.set_text(title)
+
+def calculate_differences(filtered_data, absolute=True, front=0, rear=1):
+    """Front minus rear x and (inverted) y positions on the frames where both wheels were seen."""
+    if front not in filtered_data or rear not in filtered_data:
+        return None
+    frames, i0, i1 = common_frames(filtered_data, front, rear)
+    if len(frames) == 0:
+        return None
+    x_diff = np.asarray(filtered_data[front]['x_pos'][i0]) - np.asarray(filtered_data[rear]['x_pos'][i1])
+    y_diff = np.asarray(filtered_data[rear]['y_pos'][i1]) - np.asarray(filtered_data[front]['y_pos'][i0])
+    if absolute:
+        x_diff, y_diff = np.abs(x_diff), np.abs(y_diff)
+    return {'frames': frames, 'x_difference': x_diff, 'y_difference': y_diff}
+
+def init_worker(show_raw, absolute_diff):
+    global _template
+    _template = FigureTemplate(show_raw, absolute_diff)
+
+def render_clip(clip, output_dir, formats=('png',), cutoff=2.0, fs=30.0, dpi=100):
+    """Filter one clip and save its figure in every format. Runs inside a worker process."""
+    start = time.perf_counter()
+    tracking_data = process_directory(clip['source'])
+    filtered_data = apply_filters(tracking_data, cutoff, fs)
+    name = f"{clip['clip_id']}-{clip['split']}-lp"
+    _template.render(name, tracking_data, filtered_data, wheel_classes(clip['class_names']))
+    paths = []
+    for fmt in formats:
+        path = os.path.join(output_dir, f'{name}.{fmt}')
+        _template.figure.savefig(path, format=fmt, dpi=dpi)
+        paths.append(path)
+    return paths, time.perf_counter() - start, os.getpid()
+
+def render_clips(clips, output_dir, formats=('png',), cutoff=2.0, fs=30.0, dpi=100,
+                 show_raw=False, absolute_diff=True, workers=None):
+    """Render every clip in a process pool, one figure template per worker."""
+    os.makedirs(output_dir, exist_ok=True)
+    n = len(clips)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(show_raw, absolute_diff)) as pool:
+        return list(pool.map(render_clip, clips, [output_dir] * n, [formats] * n,
+                             [cutoff] * n, [fs] * n, [dpi] * n))
+
+
+if __name__ == "__main__":
+    import argparse
+    from batch_ingest import DATA_ROOTS, discover_clips
+
+    parser = argparse.ArgumentParser(description='Render the filtered analysis figure of every clip headlessly.')
+    parser.add_argument('roots', type=str, nargs='*', default=DATA_ROOTS,
+                       help='Directories containing *-yolo clip exports (default: Data Data-NoCrash)')
+    parser.add_argument('--output-dir', type=str, default='figures', help='Directory for the figures')
+    parser.add_argument('--formats', type=str, default='png',
+                       help=f"Comma-separated formats from {', '.join(FIGURE_FORMATS)}")
+    parser.add_argument('--cutoff', type=float, default=2.0, help='Lowpass filter cutoff frequency')
+    parser.add_argument('--fs', type=float, default=30.0, help='Sampling frequency')
+    parser.add_argument('--dpi', type=int, default=100, help='Raster resolution')
+    parser.add_argument('--raw', action='store_true', help='Show raw data along with filtered data')
+    parser.add_argument('--signed', action='store_true', help='Show signed differences instead of absolute')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: all cores)')
+
+    args = parser.parse_args()
+    formats = args.formats.split(',')
+    for fmt in formats:
+        if fmt not in FIGURE_FORMATS:
+            parser.error(f"unknown format '{fmt}', choose from {', '.join(FIGURE_FORMATS)}")
+
+    clips = discover_clips(args.roots)
+    start = time.perf_counter()
+    results = render_clips(clips, args.output_dir, formats, args.cutoff, args.fs, args.dpi,
+                           args.raw, not args.signed, args.workers)
+    wall_time = time.perf_counter() - start
+
+    busy = sum(seconds for _, seconds, _ in results)
+    for paths, seconds, pid in results:
+        print(f"{seconds * 1000:>8.1f} ms (pid {pid}) {', '.join(paths)}")
+    print(f"{len(results)} clips rendered in {wall_time:.2f} s "
+          f"(summed render time {busy:.2f} s, {len({pid for _, _, pid in results})} workers)")
@@ -0,0 +1,198 @@
+import numpy as np
+from track_grid import resample_tracks
+
+DETECTOR_FEATURES = ('distance', 'slope', 'axis_ratio')
+
+
+def pair_features(centers, axes):
+    """
+    Per-frame features of a wheel pair without history: inter-wheel distance
+    and mean minor/major axis ratio. centers and axes are (..., 2 wheels, 2)
+    with axes as (major, minor).
+    """
+    distance = np.hypot(*np.moveaxis(centers[..., 0, :] - centers[..., 1, :], -1, 0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.mean(axes[..., 1] / axes[..., 0], axis=-1)
+    return distance, ratio
+
+class RollingStats:
+    """
+    Rolling mean, variance and max over the last `window` samples of
+    (streams, features) values, kept in a ring buffer. Mean and variance use
+    a sliding Welford update, so each push is O(1); the max is only rescanned
+    for the streams whose current maximum just left the window.
+    """
+    __slots__ = ('window', 'buffer', 'count', 'head', 'mean', 'm2', 'max')
+
+    def __init__(self, streams, features, window=30):
+        self.window = window
+        self.buffer = np.full((streams, window, features), -np.inf)
+        self.count = np.zeros(streams, dtype=np.int64)
+        self.head = np.zeros(streams, dtype=np.int64)
+        self.mean = np.zeros((streams, features))
+        self.m2 = np.zeros((streams, features))
+        self.max = np.full((streams, features), -np.inf)
+
+    def variance(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.count[:, None] > 1, self.m2 / (self.count[:, None] - 1), np.nan)
+
+    def push(self, streams, values):
+        """Add one sample (features,) to each of the given streams."""
+        slot = self.head[streams]
+        old = self.buffer[streams, slot]
+        full = self.count[streams] == self.window
+        self.buffer[streams, slot] = values
+        self.head[streams] = (slot + 1) % self.window
+
+        # Growing window: plain Welford; full window: replace the oldest sample
+        n = np.where(full, self.window, self.count[streams] + 1)[:, None]
+        mean = self.mean[streams]
+        old = np.where(full[:, None], old, 0.0)
+        delta = np.where(full[:, None], values - old, values - mean)
+        new_mean = mean + delta / n
+        self.m2[streams] += np.where(full[:, None],
+                                     delta * (values - new_mean + old - mean),
+                                     delta * (values - new_mean))
+        self.m2[streams] = np.maximum(self.m2[streams], 0.0)
+        self.mean[streams] = new_mean
+        self.count[streams] = n[:, 0]
+
+        current = self.max[streams]
+        evicted = full[:, None] & (old >= current) & (values < current)
+        current = np.maximum(current, values)
+        rescan = np.flatnonzero(evicted.any(axis=1))
+        if len(rescan):
+            current[rescan] = self.buffer[streams[rescan]].max(axis=1)
+        self.max[streams] = current
+
+    def reset(self, streams):
+        self.buffer[streams] = -np.inf
+        self.count[streams] = 0
+        self.head[streams] = 0
+        self.mean[streams] = 0.0
+        self.m2[streams] = 0.0
+        self.max[streams] = -np.inf
+
+class CrashDetector:
+    """
+    Online crash-onset detector for many concurrent wheel-pair streams.
+
+    Each frame of a stream gives the two wheel centers and axes; the
+    detector derives inter-wheel distance, its slope per frame and the
+    axis ratio, and compares them with the rolling statistics of the
+    previous `window` frames. A crash onset is raised when any feature
+    deviates by more than `threshold` standard deviations (and beyond the
+    rolling max for upward jumps); a stream then stays quiet for `holdoff` frames.
+    """
+
+    def __init__(self, streams, window=30, threshold=6.0, min_samples=15, holdoff=30, min_std=1e-3):
+        self.stats = RollingStats(streams, len(DETECTOR_FEATURES), window)
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.holdoff = holdoff
+        self.min_std = min_std
+        self.last_frame = np.full(streams, -1, dtype=np.int64)
+        self.last_distance = np.full(streams, np.nan)
+        self.quiet_until = np.full(streams, -1, dtype=np.int64)
+
+    def update(self, streams, frames, centers, axes):
+        """
+        Feed one frame to each of the given streams (all arrays indexed
+        alike; centers and axes are (len(streams), 2, 2)). Returns a list
+        of event dicts: stream, frame, feature, value, zscore.
+        """
+        streams = np.asarray(streams)
+        frames = np.asarray(frames)
+        distance, ratio = pair_features(centers, axes)
+        gap = frames - self.last_frame[streams]
+        slope = np.where(self.last_frame[streams] >= 0,
+                         (distance - self.last_distance[streams]) / np.maximum(gap, 1), 0.0)
+        self.last_frame[streams] = frames
+        self.last_distance[streams] = distance
+        values = np.column_stack((distance, slope, ratio))
+        finite = np.isfinite(values).all(axis=1)
+        streams, frames, values = streams[finite], frames[finite], values[finite]
+
+        stats = self.stats
+        std = np.maximum(np.sqrt(stats.variance()[streams]), self.min_std)
+        zscore = (values - stats.mean[streams]) / std
+        ready = (stats.count[streams] >= self.min_samples) & (frames > self.quiet_until[streams])
+        outlier = ready[:, None] & (np.abs(zscore) > self.threshold)
+        outlier &= (zscore < 0) | (values > stats.max[streams])
+
+        events = []
+        for i in np.flatnonzero(outlier.any(axis=1)):
+            f = int(np.argmax(np.where(outlier[i], np.abs(zscore[i]), -1)))
+            events.append({
+                'stream': int(streams[i]),
+                'frame': int(frames[i]),
+                'feature': DETECTOR_FEATURES[f],
+                'value': float(values[i, f]),
+                'zscore': float(zscore[i, f]),
+            })
+            self.quiet_until[streams[i]] = frames[i] + self.holdoff
+        stats.push(streams, values)
+        return events
+
+def pair_stream(tracking_data, front=0, rear=1):
+    """
+    The frames where both wheels were seen, in order, with their centers
+    and axes: (frames, centers (n, 2, 2), axes (n, 2, 2)).
+    """
+    grid = resample_tracks(tracking_data, max_gap=0, class_ids=[front, rear])
+    both = grid['observed'].all(axis=1)
+    values = grid['values'][both]
+    return grid['frames'][both], values[:, :, 0:2], values[:, :, 2:4]
+
+def screen_streams(pairs, **options):
+    """
+    Run one detector over many (frames, centers, axes) streams at once,
+    interleaving them one sample per stream per step as if they arrived
+    live. Returns the events per stream.
+    """
+    detector = CrashDetector(len(pairs), **options)
+    events = [[] for _ in pairs]
+    longest = max((len(frames) for frames, _, _ in pairs), default=0)
+    for step in range(longest):
+        streams = [s for s, (frames, _, _) in enumerate(pairs) if step < len(frames)]
+        for event in detector.update(streams,
+                                     [pairs[s][0][step] for s in streams],
+                                     np.stack([pairs[s][1][step] for s in streams]),
+                                     np.stack([pairs[s][2][step] for s in streams])):
+            events[event['stream']].append(event)
+    return events
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from batch_ingest import DATA_ROOTS, discover_clips, wheel_classes
+    from label_cache import process_directory
+
+    parser = argparse.ArgumentParser(description='Screen every clip for crash onsets with an online detector.')
+    parser.add_argument('roots', type=str, nargs='*', default=DATA_ROOTS,
+                       help='Directories containing *-yolo clip exports (default: Data Data-NoCrash)')
+    parser.add_argument('--window', type=int, default=30, help='Rolling window in frames')
+    parser.add_argument('--threshold', type=float, default=6.0, help='Z-score that raises an event')
+    parser.add_argument('--holdoff', type=int, default=30, help='Frames without events after an event')
+    parser.add_argument('--copies', type=int, default=1, help='Replicate every clip to simulate more streams')
+
+    args = parser.parse_args()
+
+    clips = discover_clips(args.roots)
+    pairs = [pair_stream(process_directory(clip['source']), *wheel_classes(clip['class_names']))
+             for clip in clips] * args.copies
+
+    start = time.perf_counter()
+    events = screen_streams(pairs, window=args.window, threshold=args.threshold, holdoff=args.holdoff)
+    elapsed = time.perf_counter() - start
+    samples = sum(len(frames) for frames, _, _ in pairs)
+    print(f"{len(pairs)} streams, {samples} frames in {elapsed:.2f} s "
+          f"({elapsed / max(samples, 1) * 1e6:.1f} us per frame)")
+
+    print(f"\n{'clip':<20} {'category':<9} {'first onset':>12}  events")
+    for clip, stream_events in zip(clips, events):
+        onsets = ', '.join(f"{e['frame']}:{e['feature']}({e['zscore']:+.1f})" for e in stream_events[:4])
+        first = stream_events[0]['frame'] if stream_events else '-'
+        print(f"{clip['clip_id']:<20} {clip['category']:<9} {first:>12}  {onsets}")
@@ -0,0 +1,199 @@
+import os
+import queue
+import shutil
+import threading
+import pyarrow as pa
+import pyarrow.parquet as pq
+from ellipse_fit import fit_ellipses
+from stream_pipeline import label_batches
+from yolo2df import ellipse_frame
+
+FORMATS = ('parquet', 'jsonl', 'csv')
+PARTITION = 'clip_id'
+
+
+def clip_record_batches(clips, batch_files=256, fit_method='moments', executor=None):
+    """
+    Parse and fit every clip in fixed-size groups of label files, yielding
+    (clip_id, pyarrow.RecordBatch) with the yolo2df columns plus split and category.
+    A ransac fit runs its per-frame chunks in `executor` when one is given.
+    """
+    for clip in clips:
+        for labels in label_batches(clip['source'], batch_files):
+            df = ellipse_frame(labels, fit_ellipses(labels, fit_method, executor))
+            df.insert(0, 'split', clip['split'])
+            df.insert(1, 'category', clip['category'])
+            yield clip['clip_id'], pa.RecordBatch.from_pandas(df, preserve_index=False)
+
+class ParquetSink:
+    """
+    Hive-partitioned Parquet output: <root>/clip_id=<id>/part-<n>.parquet.
+    Batches are buffered up to row_group_rows per row group; a partition's
+    file is closed as soon as the next partition starts, so only one file
+    and one row group are ever held open.
+    """
+
+    def __init__(self, root, row_group_rows=65536):
+        self.root = root
+        self.row_group_rows = row_group_rows
+        self.partition = None
+        self.parts = {}
+        self.writer = None
+        self.pending = []
+        self.pending_rows = 0
+
+    def flush(self):
+        if self.pending:
+            self.writer.write_table(pa.Table.from_batches(self.pending), row_group_size=self.row_group_rows)
+            self.pending, self.pending_rows = [], 0
+
+    def close(self):
+        if self.writer is not None:
+            self.flush()
+            self.writer.close()
+            self.writer = None
+
+    def write(self, partition, batch):
+        if partition != self.partition:
+            self.close()
+            directory = os.path.join(self.root, f'{PARTITION}={partition}')
+            os.makedirs(directory, exist_ok=True)
+            part = self.parts.get(partition, 0)
+            self.writer = pq.ParquetWriter(os.path.join(directory, f'part-{part}.parquet'), batch.schema)
+            self.parts[partition] = part + 1
+            self.partition = partition
+        self.pending.append(batch)
+        self.pending_rows += batch.num_rows
+        if self.pending_rows >= self.row_group_rows:
+            self.flush()
+
+class TextSink:
+    """JSON Lines or CSV output, one batch appended at a time with the partition as the first column."""
+
+    def __init__(self, path, fmt):
+        self.file = open(path, 'w')
+        self.fmt = fmt
+        self.header = True
+
+    def write(self, partition, batch):
+        df = batch.to_pandas()
+        df.insert(0, PARTITION, partition)
+        if self.fmt == 'jsonl':
+            # lines=True already ends every record with a newline (and gives a lone one for no rows)
+            if len(df):
+                self.file.write(df.to_json(orient='records', lines=True))
+        else:
+            df.to_csv(self.file, index=False, header=self.header)
+            self.header = False
+
+    def close(self):
+        self.file.close()
+
+def open_sinks(output, formats, row_group_rows=65536):
+    """Create one sink per format under the output prefix (Parquet goes to a directory)."""
+    sinks = {}
+    for fmt in formats:
+        if fmt == 'parquet':
+            root = output + '.parquet'
+            # Replaces an earlier run, or the single file written by yolo2df.save_dataset
+            if os.path.isdir(root):
+                shutil.rmtree(root)
+            elif os.path.exists(root):
+                os.remove(root)
+            sinks[fmt] = ParquetSink(root, row_group_rows)
+        elif fmt in ('jsonl', 'csv'):
+            sinks[fmt] = TextSink(f'{output}.{fmt}', fmt)
+        else:
+            raise ValueError(f"Unknown format '{fmt}', choose from {', '.join(FORMATS)}")
+    return sinks
+
+def sink_worker(sink, batches, errors):
+    """Drain one queue into one sink until the None sentinel."""
+    try:
+        while True:
+            item = batches.get()
+            if item is None:
+                break
+            sink.write(*item)
+    except Exception as error:
+        errors.append(error)
+        # Keep draining so the producer never blocks on a dead writer
+        while batches.get() is not None:
+            pass
+    finally:
+        sink.close()
+
+def write_stream(batches, output, formats=('parquet', 'jsonl'), queue_size=4, row_group_rows=65536):
+    """
+    Write (partition, RecordBatch) pairs to every format concurrently.
+
+    Each format has its own writer thread fed through a bounded queue, so
+    parsing continues while the previous batches are encoded, and at most
+    queue_size batches per format are in flight. Returns the rows written.
+    """
+    sinks = open_sinks(output, formats, row_group_rows)
+    queues = {fmt: queue.Queue(maxsize=queue_size) for fmt in sinks}
+    errors = []
+    threads = [threading.Thread(target=sink_worker, args=(sinks[fmt], queues[fmt], errors), daemon=True)
+               for fmt in sinks]
+    for thread in threads:
+        thread.start()
+
+    rows = 0
+    try:
+        for partition, batch in batches:
+            for q in queues.values():
+                q.put((partition, batch))
+            rows += batch.num_rows
+            if errors:
+                break
+    finally:
+        for q in queues.values():
+            q.put(None)
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+    import resource
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+    from contextlib import nullcontext
+    from batch_ingest import DATA_ROOTS, discover_clips
+    from ellipse_fit import FIT_METHOD_HELP, FIT_METHODS
+
+    parser = argparse.ArgumentParser(description='Stream every clip into partitioned Parquet and JSON Lines while parsing.')
+    parser.add_argument('roots', type=str, nargs='*', default=DATA_ROOTS,
+                       help='Directories containing *-yolo clip exports (default: Data Data-NoCrash)')
+    parser.add_argument('--output', type=str, default='ellipse_dataset', help='Output prefix (no extension)')
+    parser.add_argument('--formats', type=str, default='parquet,jsonl',
+                       help=f"Comma-separated output formats from {', '.join(FORMATS)}")
+    parser.add_argument('--batch-files', type=int, default=256, help='Label files per record batch')
+    parser.add_argument('--row-group-rows', type=int, default=65536, help='Rows per Parquet row group')
+    parser.add_argument('--fit-method', type=str, default='moments', choices=FIT_METHODS, help=FIT_METHOD_HELP)
+    parser.add_argument('--fit-workers', type=int, default=None,
+                       help='Processes for the ransac fit (default: all cores, 1 fits inline)')
+
+    args = parser.parse_args()
+
+    clips = discover_clips(args.roots)
+    start = time.perf_counter()
+    use_pool = args.fit_method == 'ransac' and args.fit_workers != 1
+    with (ProcessPoolExecutor(args.fit_workers) if use_pool else nullcontext()) as executor:
+        rows = write_stream(clip_record_batches(clips, args.batch_files, args.fit_method, executor),
+                            args.output, args.formats.split(','), row_group_rows=args.row_group_rows)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    print(f"{rows} rows from {len(clips)} clips written in {elapsed:.2f} s (peak RSS {peak:.0f} MB)")
+    for fmt in args.formats.split(','):
+        path = f'{args.output}.{fmt}'
+        if os.path.isdir(path):
+            size = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+        else:
+            size = os.path.getsize(path)
+        print(f"- {path} ({size / 1024:.0f} KiB)")
@@ -1,99 +1,14 @@
-import os
 import numpy as np
 import matplotlib.pyplot as plt
-import math
 import argparse
-import re
 import pandas as pd
-from collections import defaultdict
-from scipy.signal import butter, filtfilt
+from label_cache import process_directory
+from track_filter import apply_filters
+from wide_format import pivot_tracks, wide_columns, write_wide
 
 plt.rcParams['figure.constrained_layout.use'] = True
 plt.rcParams.update({'font.size': 16})
 
-
-def butter_lowpass(cutoff, fs, order=5):
-    """Design a Butterworth lowpass filter."""
-    nyq = 0.5 * fs
-    normal_cutoff = cutoff / nyq
-    b, a = butter(order, normal_cutoff, btype='low', analog=False)
-    return b, a
-
-def lowpass_filter(data, cutoff=2.0, fs=30.0, order=5):
-    """Apply lowpass filter to data."""
-    b, a = butter_lowpass(cutoff, fs, order=order)
-    y = filtfilt(b, a, data)
-    return y
-
-def natural_sort_key(s):
-    """Natural sorting for filenames."""
-    return [int(text) if text.isdigit() else text.lower() for text in re.split('([0-9]+)', s)]
-
-
-def readEllipse(file_path):
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
-
-    ellipses = []
-
-    for line in lines:
-        parts = list(map(float, line.strip().split()))
-
-        class_id = int(parts[0])
-        points = np.array(parts[1:]).reshape(-1, 2)
-        center = np.mean(points, axis=0)
-        centered_points = points - center
-        cov = np.cov(centered_points.T)
-        eigenvalues, eigenvectors = np.linalg.eig(cov)
-        major_axis = 2 * math.sqrt(max(eigenvalues))
-        minor_axis = 2 * math.sqrt(min(eigenvalues))
-
-        ellipses.append({
-            'class_id': class_id,
-            'center': center,
-            'major_axis': major_axis,
-            'minor_axis': minor_axis,
-        })
-
-    return ellipses
-    
-def process_directory(directory_path):
-    """Process all .txt files in directory."""
-    files = [f for f in os.listdir(directory_path) if f.endswith('.txt')]
-    files.sort()#key=natural_sort_key)
-    
-    tracking_data = defaultdict(lambda: {
-        'x_pos': [], 'y_pos': [], 'major_axes': [], 'minor_axes': [], 'frames': []
-    })
-    
-    for frame_idx, filename in enumerate(files):
-        file_path = os.path.join(directory_path, filename)
-        for ellipse in readEllipse(file_path):
-            class_id = ellipse['class_id']
-            tracking_data[class_id]['x_pos'].append(ellipse['center'][0])
-            tracking_data[class_id]['y_pos'].append(ellipse['center'][1])
-            tracking_data[class_id]['major_axes'].append(ellipse['major_axis'])
-            tracking_data[class_id]['minor_axes'].append(ellipse['minor_axis'])
-            tracking_data[class_id]['frames'].append(frame_idx)
-    
-    return tracking_data
-
-
-def apply_filters(tracking_data, cutoff=2.0, fs=30.0):
-    """Apply lowpass filters to all tracking data."""
-    filtered_data = {}
-    for class_id, data in tracking_data.items():
-        filtered = {
-            'x_pos': lowpass_filter(data['x_pos'], cutoff, fs),
-            'y_pos': lowpass_filter(data['y_pos'], cutoff, fs),
-            'major_axes': lowpass_filter(data['major_axes'], cutoff, fs),
-            'minor_axes': lowpass_filter(data['minor_axes'], cutoff, fs),
-            'frames': data['frames']
-        }
-        filtered_data[class_id] = filtered
-    return filtered_data
-
-
 def plot_data(tracking_data, filtered_data, show_raw=False, absolute_diff=True):
     """Plot data with specified options."""
     plt.figure(figsize=(18, 12))  # Adjusted figure size
@@ -148,11 +63,11 @@ def plot_data(tracking_data, filtered_data, show_raw=False, absolute_diff=True):
 
         # Calculate ratio
         if show_raw:
-            ratio_raw = np.array(data['major_axes']) / np.array(data['minor_axes'])
+            ratio_raw = np.asarray(data['major_axes']) / np.asarray(data['minor_axes'])
             ax3.plot(data['frames'], ratio_raw, '-', color=ellipse_colors[class_id], 
                     alpha=raw_alpha, label=f'{class_name} wheel ellipse ratio')
         
-        ratio_filtered = np.array(filtered_data[class_id]['major_axes']) / np.array(filtered_data[class_id]['minor_axes'])
+        ratio_filtered = np.asarray(filtered_data[class_id]['major_axes']) / np.asarray(filtered_data[class_id]['minor_axes'])
         ax3.plot(filtered_data[class_id]['frames'], ratio_filtered, '-', 
                 color=ellipse_colors[class_id], linewidth=2, label=f'{class_name} wheel ellipse ratio')
     ax3.set_title('Major/Minor Axis Ratio', fontweight='bold')
@@ -225,78 +140,18 @@ def create_4column_csv(tracking_data, filtered_data, output_file):
         print("Need at least 2 ellipses to create 4-column output")
         return
     
-    # Get all available frames from both ellipses
-    all_frames = set()
-    for class_id in [0, 1]:
-        if class_id in tracking_data:
-            all_frames.update(tracking_data[class_id]['frames'])
-    
-    all_frames = sorted(all_frames)
-    
-    # Create dictionaries for quick lookup by frame
-    ellipse0_data = {}
-    ellipse1_data = {}
-    
-    # Populate ellipse 0 data
-    if 0 in tracking_data:
-        for i, frame in enumerate(tracking_data[0]['frames']):
-            ellipse0_data[frame] = {
-                'x': tracking_data[0]['x_pos'][i],
-                'y': tracking_data[0]['y_pos'][i]
-            }
-    
-    # Populate ellipse 1 data
-    if 1 in tracking_data:
-        for i, frame in enumerate(tracking_data[1]['frames']):
-            ellipse1_data[frame] = {
-                'x': tracking_data[1]['x_pos'][i],
-                'y': tracking_data[1]['y_pos'][i]
-            }
-    
-    # Create the 5-column data structure
-    data = []
-    for frame in all_frames:
-        # Get ellipse 0 data or use NaN if missing
-        if frame in ellipse0_data:
-            ellipse0_x = ellipse0_data[frame]['x']
-            ellipse0_y = ellipse0_data[frame]['y']
-        else:
-            ellipse0_x = np.nan
-            ellipse0_y = np.nan
-        
-        # Get ellipse 1 data or use NaN if missing
-        if frame in ellipse1_data:
-            ellipse1_x = ellipse1_data[frame]['x']
-            ellipse1_y = ellipse1_data[frame]['y']
-        else:
-            ellipse1_x = np.nan
-            ellipse1_y = np.nan
-        
-        row = [
-            frame,          # Feature 1 time
-            ellipse0_x,     # Feature 1 x
-            ellipse0_y,     # Feature 1 y
-            ellipse1_x,     # Feature 2 x
-            ellipse1_y      # Feature 2 y
-        ]
-        data.append(row)
-    
-    # Create DataFrame and save as CSV
-    df = pd.DataFrame(data, columns=[
-        'Frame', 
-        'Feature1_x', 
-        'Feature1_y', 
-        'Feature2_x', 
-        'Feature2_y'
-    ])
+    # Scatter both wheels onto the frames where at least one was seen
+    pivot = pivot_tracks(tracking_data, track_ids=[0, 1])
+    write_wide(pivot, output_file)
+    df = pd.DataFrame(pivot['values'].reshape(len(pivot['frames']), 4), columns=wide_columns(2))
+    df.insert(0, 'Frame', pivot['frames'])
     
-    df.to_csv(output_file, index=False)
     print(f"5-column CSV saved to: {output_file}")
     print(f"Total rows: {len(df)}")
     print(f"Columns: {', '.join(df.columns)}")
-    print(f"Frames with ellipse 0 data: {len(ellipse0_data)}")
-    print(f"Frames with ellipse 1 data: {len(ellipse1_data)}")
-    print(f"Total unique frames: {len(all_frames)}")
+    print(f"Frames with ellipse 0 data: {pivot['observed'][:, 0].sum()}")
+    print(f"Frames with ellipse 1 data: {pivot['observed'][:, 1].sum()}")
+    print(f"Total unique frames: {len(pivot['frames'])}")
     print("\nFirst 10 rows:")
     print(df.head(10))
     
@@ -0,0 +1,430 @@
+import numpy as np
+from label_ingest import fit_ellipses as fit_vertex_moments
+
+FIT_METHODS = ('moments', 'area', 'direct', 'ransac', 'geometric')
+FIT_DESCRIPTIONS = {
+    'moments': 'vertex moments',
+    'area': 'polygon area moments',
+    'direct': 'direct least squares',
+    'ransac': 'direct least squares on RANSAC inliers',
+    'geometric': 'orthogonal-distance refinement',
+}
+# --fit-method help of every CLI, built from FIT_METHODS so it lists every choice
+FIT_METHOD_HELP = 'Ellipse fit: ' + ', '.join(f'{m} ({FIT_DESCRIPTIONS[m]})' for m in FIT_METHODS)
+# Constraint matrix 4ac - b^2 = 1 inverted, as in Halir & Flusser (1998)
+C1_INV = np.array([[0.0, 0.0, 0.5], [0.0, -1.0, 0.0], [0.5, 0.0, 0.0]])
+
+
+def polygon_index(labels):
+    """Per-vertex polygon index plus polygon start offsets and vertex counts."""
+    offsets = labels['offsets']
+    counts = np.diff(offsets)
+    return np.repeat(np.arange(len(counts)), counts), offsets[:-1], counts
+
+def empty_fit():
+    return {key: np.zeros(0) for key in ('center_x', 'center_y', 'major_axis', 'minor_axis', 'angle')}
+
+def fit_area_moments(labels):
+    """
+    Fit the ellipse with the same area moments as the filled polygon (Green's
+    theorem over the edges), so uneven vertex spacing does not bias it.
+    Axes are full lengths: a filled ellipse has variance (semi-axis)^2 / 4.
+    """
+    if len(labels['offsets']) < 2:
+        return empty_fit()
+    poly, starts, counts = polygon_index(labels)
+    points = labels['points']
+    # Next vertex of each vertex, wrapping around within its polygon
+    nxt = np.arange(len(points)) + 1
+    nxt[starts + counts - 1] = starts
+
+    # Shift each polygon near the origin to keep the sums well conditioned
+    origin = points[starts]
+    x0, y0 = (points - origin[poly]).T
+    x1, y1 = (points[nxt] - origin[poly]).T
+    cross = x0 * y1 - x1 * y0
+
+    area = 0.5 * np.add.reduceat(cross, starts)
+    sx = np.add.reduceat((x0 + x1) * cross, starts) / (6 * area)
+    sy = np.add.reduceat((y0 + y1) * cross, starts) / (6 * area)
+    ixx = np.add.reduceat((x0 * x0 + x0 * x1 + x1 * x1) * cross, starts) / (12 * area)
+    iyy = np.add.reduceat((y0 * y0 + y0 * y1 + y1 * y1) * cross, starts) / (12 * area)
+    ixy = np.add.reduceat((x0 * y1 + 2 * x0 * y0 + 2 * x1 * y1 + x1 * y0) * cross, starts) / (24 * area)
+
+    mu_xx = ixx - sx * sx
+    mu_yy = iyy - sy * sy
+    mu_xy = ixy - sx * sy
+    half_trace = 0.5 * (mu_xx + mu_yy)
+    radius = np.hypot(0.5 * (mu_xx - mu_yy), mu_xy)
+
+    return {
+        'center_x': origin[:, 0] + sx,
+        'center_y': origin[:, 1] + sy,
+        'major_axis': 4 * np.sqrt(half_trace + radius),
+        'minor_axis': 4 * np.sqrt(np.maximum(half_trace - radius, 0.0)),
+        'angle': np.degrees(0.5 * np.arctan2(2 * mu_xy, mu_xx - mu_yy)),
+    }
+
+def conic_to_ellipse(conic):
+    """Centers, full axes and major-axis angle (degrees) of conics A x^2 + B xy + C y^2 + D x + E y + F = 0."""
+    # Scale so the quadratic part is positive definite, whatever the eigenvector sign
+    a, b, c, d, e, f = (conic * np.sign(conic[:, 0] + conic[:, 2])[:, None]).T
+    den = b * b - 4 * a * c
+    cx = (2 * c * d - b * e) / den
+    cy = (2 * a * e - b * d) / den
+    # Value of the conic at the center, so the ellipse is q(x - center) = -f_c
+    f_c = a * cx * cx + b * cx * cy + c * cy * cy + d * cx + e * cy + f
+    half_trace = 0.5 * (a + c)
+    radius = np.hypot(0.5 * (a - c), 0.5 * b)
+    lam_small = half_trace - radius
+    lam_large = half_trace + radius
+    # The major axis lies along the eigenvector of the smaller eigenvalue
+    angle = np.degrees(0.5 * np.arctan2(b, a - c)) + 90.0
+    angle = np.where(angle > 90.0, angle - 180.0, angle)
+    return {
+        'center_x': cx,
+        'center_y': cy,
+        'major_axis': 2 * np.sqrt(np.abs(f_c / lam_small)),
+        'minor_axis': 2 * np.sqrt(np.abs(f_c / lam_large)),
+        'angle': angle,
+    }
+
+def normalized_design(points, poly, starts, counts):
+    """
+    Center and scale every polygon to unit RMS radius and build the conic
+    design rows (x^2, xy, y^2, x, y, 1). Returns (mean, scale, design).
+    """
+    mean = np.add.reduceat(points, starts, axis=0) / counts[:, None]
+    centered = points - mean[poly]
+    scale = np.sqrt(np.add.reduceat((centered ** 2).sum(axis=1), starts) / counts)
+    scale[scale == 0] = 1.0
+    x, y = (centered / scale[poly, None]).T
+    return mean, scale, np.column_stack((x * x, x * y, y * y, x, y, np.ones_like(x)))
+
+def denormalize(ellipse, mean, scale):
+    """Map ellipses fitted in normalized_design coordinates back to the input units."""
+    ellipse['center_x'] = mean[:, 0] + scale * ellipse['center_x']
+    ellipse['center_y'] = mean[:, 1] + scale * ellipse['center_y']
+    ellipse['major_axis'] *= scale
+    ellipse['minor_axis'] *= scale
+    return ellipse
+
+def fit_direct(labels):
+    """
+    Fitzgibbon's direct least-squares ellipse fit (numerically stable form of
+    Halir & Flusser) for every polygon at once; same model as
+    cv2.fitEllipseDirect. Each polygon is centered and scaled first.
+    """
+    if len(labels['offsets']) < 2:
+        return empty_fit()
+    poly, starts, counts = polygon_index(labels)
+    mean, scale, design = normalized_design(labels['points'], poly, starts, counts)
+    scatter = np.add.reduceat(design[:, :, None] * design[:, None, :], starts)
+    s1 = scatter[:, :3, :3]
+    s2 = scatter[:, :3, 3:]
+    s3 = scatter[:, 3:, 3:]
+    t = -np.linalg.solve(s3, np.swapaxes(s2, 1, 2))
+    m = C1_INV @ (s1 + s2 @ t)
+
+    eigenvalues, eigenvectors = np.linalg.eig(m)
+    eigenvectors = eigenvectors.real
+    cond = 4 * eigenvectors[:, 0, :] * eigenvectors[:, 2, :] - eigenvectors[:, 1, :] ** 2
+    # Exactly one eigenvector satisfies the ellipse constraint; take the best one
+    pick = np.argmax(np.where(cond > 0, cond, -np.inf), axis=1)
+    a1 = eigenvectors[np.arange(len(pick)), :, pick]
+    a2 = (t @ a1[:, :, None])[:, :, 0]
+
+    return denormalize(conic_to_ellipse(np.hstack((a1, a2))), mean, scale)
+
+def ransac_inliers(design, starts, counts, rng, hypotheses, threshold):
+    """
+    Inlier mask of the best 5-point ellipse hypothesis of every polygon, and
+    its support. Polygons are padded to the longest one so that scoring all
+    hypotheses against all vertices is three batched matrix products.
+    """
+    slots = np.arange(counts.max())
+    present = slots < counts[:, None]
+    padded = design[np.minimum(starts[:, None] + slots, len(design) - 1)]
+
+    # Stratified minimal subsets: five distinct vertices spread over the contour
+    n = counts[:, None, None]
+    bounds = np.arange(6) * n // 5
+    width = bounds[..., 1:] - bounds[..., :-1]
+    rotation = (rng.random((len(counts), hypotheses, 1)) * n).astype(np.int64)
+    offset = (rng.random((len(counts), hypotheses, 5)) * width).astype(np.int64)
+    sample = (bounds[..., :-1] + offset + rotation) % n
+    subsets = np.take_along_axis(padded, sample.reshape(len(counts), -1, 1), axis=1)
+    subsets = subsets.reshape(len(counts), hypotheses, 5, 6)
+    # The centroid is inside every wheel ellipse, so the constant term can be fixed to -1
+    systems = subsets[..., :5]
+    # Repeated vertices in the labels make some systems singular: solve a dummy and reject them
+    singular = np.abs(np.linalg.det(systems)) < 1e-12
+    systems[singular] = np.eye(5)
+    conics = np.linalg.solve(systems, -subsets[..., 5:])[..., 0]
+    a, b, c, d, e = np.moveaxis(conics, -1, 0)
+    valid = ~singular & (4 * a * c - b * b > 0)
+
+    # Gradient-normalized algebraic distance of every vertex to every hypothesis
+    residual = padded[..., :5] @ np.swapaxes(conics, 1, 2) + 1.0
+    x, y = padded[..., 3:4], padded[..., 4:5]
+    grad_x = 2 * x * a[:, None, :] + y * b[:, None, :] + d[:, None, :]
+    grad_y = x * b[:, None, :] + 2 * y * c[:, None, :] + e[:, None, :]
+    inlier = (residual * residual < threshold ** 2 * (grad_x * grad_x + grad_y * grad_y)) & present[..., None]
+
+    support = np.where(valid, inlier.sum(axis=1), -1)
+    best = np.argmax(support, axis=1)
+    keep = np.take_along_axis(inlier, best[:, None, None], axis=2)[..., 0]
+    return keep[present], support[np.arange(len(best)), best]
+
+def fit_ransac(labels, hypotheses=16, threshold=0.05, min_inliers=6, seed=0, block=1024):
+    """
+    RANSAC ellipse fit for polygons clipped by the rider or the ground.
+
+    Every polygon gets `hypotheses` conics through 5 of its vertices (one
+    batched 5x5 solve), all hypotheses are scored against all of the polygon's
+    vertices with the gradient-normalized algebraic distance, and the vertices
+    within `threshold` (in units of the polygon's RMS radius) of the best
+    ellipse are refitted with fit_direct. Polygons with fewer than min_inliers
+    inliers keep the plain direct fit. Works `block` polygons at a time.
+    """
+    if len(labels['offsets']) < 2:
+        return empty_fit()
+    poly, starts, counts = polygon_index(labels)
+    _, _, design = normalized_design(labels['points'], poly, starts, counts)
+    rng = np.random.default_rng(seed)
+
+    keep = np.ones(len(poly), dtype=bool)
+    for p0 in range(0, len(counts), block):
+        p1 = min(p0 + block, len(counts))
+        q0, q1 = labels['offsets'][p0], labels['offsets'][p1]
+        block_keep, support = ransac_inliers(design[q0:q1], starts[p0:p1] - q0, counts[p0:p1],
+                                             rng, hypotheses, threshold)
+        # Too little support: fall back to all vertices
+        keep[q0:q1] = block_keep | np.repeat(support < min_inliers, counts[p0:p1])
+
+    kept_offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(np.add.reduceat(keep, starts), out=kept_offsets[1:])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ellipse = fit_direct({'offsets': kept_offsets, 'points': labels['points'][keep]})
+    # Inliers that do not pin down an ellipse (e.g. mostly the straight cut): use every vertex
+    failed = ~(np.isfinite(ellipse['major_axis']) & np.isfinite(ellipse['minor_axis']))
+    if failed.any():
+        fallback = fit_direct(labels)
+        for key in ellipse:
+            ellipse[key][failed] = fallback[key][failed]
+    return ellipse
+
+def polygon_chunks(labels, chunk_files=256):
+    """Split packed labels into chunks of whole frames (polygons only, no file index)."""
+    bounds = labels.get('file_poly_start')
+    n = len(labels['offsets']) - 1
+    if bounds is None:
+        bounds = np.arange(n + 1)
+    cuts = np.unique(np.append(bounds[::chunk_files], n))
+    for p0, p1 in zip(cuts[:-1], cuts[1:]):
+        q0, q1 = labels['offsets'][p0], labels['offsets'][p1]
+        yield {
+            'offsets': labels['offsets'][p0:p1 + 1] - q0,
+            'points': np.ascontiguousarray(labels['points'][q0:q1]),
+        }
+
+def fit_ransac_parallel(labels, workers=None, chunk_files=64, seed=0, executor=None, **options):
+    """
+    fit_ransac over chunks of frames as separate jobs: in `executor` when
+    given, inline when workers is 1, otherwise in a process pool of `workers`
+    made for this call. Each chunk has its own seed, so the result does not
+    depend on where the chunks run.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from functools import partial
+
+    chunks = list(polygon_chunks(labels, chunk_files))
+    if not chunks:
+        return empty_fit()
+    seeds = [seed + i for i in range(len(chunks))]
+    job = partial(fit_chunk, **options)
+    if executor is not None:
+        fits = list(executor.map(job, chunks, seeds))
+    elif workers == 1:
+        fits = list(map(job, chunks, seeds))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            fits = list(pool.map(job, chunks, seeds))
+    return {key: np.concatenate([fit[key] for fit in fits]) for key in fits[0]}
+
+def fit_chunk(chunk, seed, **options):
+    return fit_ransac(chunk, seed=seed, **options)
+
+def fit_ellipses(labels, method='moments', executor=None):
+    """
+    Fit every polygon with one of FIT_METHODS (with an executor, the ransac
+    fit runs its per-frame chunks there instead of inline):
+    'moments' - vertex covariance (legacy, axes = 2 * sqrt(eigenvalue)),
+    'area'    - filled-polygon area moments,
+    'direct'  - Fitzgibbon direct least squares,
+    'ransac'  - direct least squares on the RANSAC inliers (clipped wheels),
+    'geometric' - orthogonal-distance Gauss-Newton seeded with the direct fit
+                (ellipse_refine.refine_direct).
+    """
+    if method == 'moments':
+        return fit_vertex_moments(labels)
+    if method == 'area':
+        return fit_area_moments(labels)
+    if method == 'direct':
+        return fit_direct(labels)
+    if method == 'ransac':
+        return fit_ransac_parallel(labels, workers=1, executor=executor)
+    if method == 'geometric':
+        from ellipse_refine import refine_direct
+        return refine_direct(labels)
+    raise ValueError(f"Unknown fit method '{method}', choose from {', '.join(FIT_METHODS)}")
+
+def synthetic_polygons(n_polygons, min_points=12, max_points=60, noise=0.01, occlusion=0.0, seed=0):
+    """
+    Random ellipses sampled as YOLO-like polygons: unevenly spaced vertices with
+    a little noise. With occlusion > 0 up to that fraction of each contour is
+    cut off by a straight edge, like a wheel hidden behind the rider.
+    Returns (labels, truth) where truth uses full axis lengths.
+    """
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(min_points, max_points + 1, n_polygons)
+    offsets = np.zeros(n_polygons + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    poly = np.repeat(np.arange(n_polygons), counts)
+
+    truth = {
+        'center_x': rng.uniform(0.2, 0.8, n_polygons),
+        'center_y': rng.uniform(0.2, 0.8, n_polygons),
+        'major_axis': rng.uniform(0.04, 0.2, n_polygons),
+        'angle': rng.uniform(-90, 90, n_polygons),
+    }
+    truth['minor_axis'] = truth['major_axis'] * rng.uniform(0.3, 1.0, n_polygons)
+
+    # Sorted random parameters give irregular spacing, like a simplified mask contour
+    t = rng.uniform(0, 2 * np.pi, len(poly))
+    t = t[np.lexsort((t, poly))]
+    a = truth['major_axis'][poly] / 2
+    b = truth['minor_axis'][poly] / 2
+    theta = np.radians(truth['angle'][poly])
+    u, v = a * np.cos(t), b * np.sin(t)
+    if occlusion > 0:
+        # Vertices inside the hidden arc move onto the chord joining its ends
+        t0 = rng.uniform(0, 2 * np.pi, n_polygons)[poly]
+        span = rng.uniform(0, 2 * np.pi * occlusion, n_polygons)[poly]
+        s = (t - t0) % (2 * np.pi) / span
+        hidden = s < 1
+        t1 = t0 + span
+        u = np.where(hidden, a * ((1 - s) * np.cos(t0) + s * np.cos(t1)), u)
+        v = np.where(hidden, b * ((1 - s) * np.sin(t0) + s * np.sin(t1)), v)
+    u = u + rng.normal(0, noise, len(t)) * a
+    v = v + rng.normal(0, noise, len(t)) * a
+    points = np.column_stack((
+        truth['center_x'][poly] + u * np.cos(theta) - v * np.sin(theta),
+        truth['center_y'][poly] + u * np.sin(theta) + v * np.cos(theta),
+    ))
+    labels = {
+        'class_id': np.zeros(n_polygons, dtype=np.int32),
+        'file_idx': np.arange(n_polygons, dtype=np.int32),
+        'offsets': offsets,
+        'points': points,
+    }
+    return labels, truth
+
+def fit_errors(fit, truth):
+    """Median absolute errors of a fit against known ellipses (axes relative, angle in degrees)."""
+    center = np.hypot(fit['center_x'] - truth['center_x'], fit['center_y'] - truth['center_y'])
+    angle = np.abs((fit['angle'] - truth['angle'] + 90) % 180 - 90)
+    round_enough = truth['minor_axis'] < 0.9 * truth['major_axis']
+    return {
+        'center': np.median(center / truth['major_axis']),
+        'major': np.median(np.abs(fit['major_axis'] / truth['major_axis'] - 1)),
+        'minor': np.median(np.abs(fit['minor_axis'] / truth['minor_axis'] - 1)),
+        'angle': np.median(angle[round_enough]),
+    }
+
+def compare_methods(labels, truth=None, repeats=3):
+    """Time every method on the same polygons and, with known truth, measure its accuracy."""
+    import time
+
+    results = {}
+    for method in FIT_METHODS:
+        best = np.inf
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fit = fit_ellipses(labels, method)
+            best = min(best, time.perf_counter() - start)
+        results[method] = {'seconds': best, 'fit': fit}
+        if truth is not None:
+            results[method].update(fit_errors(fit, truth))
+    return results
+
+def opencv_agreement(labels, fit, direct=True):
+    """Median differences to cv2.fitEllipseDirect (or cv2.fitEllipse), one polygon at a time."""
+    import cv2
+
+    fitter = cv2.fitEllipseDirect if direct else cv2.fitEllipse
+    offsets = labels['offsets']
+    ref = np.array([
+        [*c, *sorted(ax, reverse=True), angle + (90 if ax[0] < ax[1] else 0)]
+        for (c, ax, angle) in (fitter(labels['points'][offsets[i]:offsets[i + 1]].astype(np.float32))
+                               for i in range(len(offsets) - 1))
+    ])
+    ref_angle = (ref[:, 4] + 90) % 180 - 90
+    return {
+        'center': np.median(np.hypot(fit['center_x'] - ref[:, 0], fit['center_y'] - ref[:, 1])),
+        'major': np.median(np.abs(fit['major_axis'] / ref[:, 2] - 1)),
+        'minor': np.median(np.abs(fit['minor_axis'] / ref[:, 3] - 1)),
+        'angle': np.median(np.abs((fit['angle'] - ref_angle + 90) % 180 - 90)),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from label_cache import load_labels
+
+    parser = argparse.ArgumentParser(description='Compare ellipse fitting methods for speed and accuracy.')
+    parser.add_argument('directory', type=str, nargs='?', default=None,
+                       help='Optional label directory to time and to check against OpenCV (in pixels)')
+    parser.add_argument('--polygons', type=int, default=20000, help='Number of synthetic polygons')
+    parser.add_argument('--noise', type=float, default=0.01, help='Vertex noise relative to the semi-major axis')
+    parser.add_argument('--occlusion', type=float, default=0.3,
+                       help='Largest fraction of each synthetic contour hidden by a straight edge')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes for the parallel RANSAC run')
+    parser.add_argument('--width', type=float, default=1280, help='Image width for coordinate scaling')
+    parser.add_argument('--height', type=float, default=720, help='Image height for coordinate scaling')
+
+    args = parser.parse_args()
+
+    for occlusion in (0.0, args.occlusion):
+        labels, truth = synthetic_polygons(args.polygons, noise=args.noise, occlusion=occlusion)
+        print(f"\n=== Synthetic: {args.polygons} polygons, noise {args.noise}, occlusion up to {occlusion} ===")
+        print(f"{'method':<8} {'polygons/s':>12} {'center':>8} {'major':>8} {'minor':>8} {'angle':>8}")
+        for method, r in compare_methods(labels, truth).items():
+            print(f"{method:<8} {args.polygons / r['seconds']:>12.0f} {r['center']:>8.4f} "
+                  f"{r['major']:>8.4f} {r['minor']:>8.4f} {r['angle']:>7.2f}°")
+    print("(center relative to the major axis, axes as relative error, angle in degrees)")
+
+    start = time.perf_counter()
+    fit_ransac_parallel(labels, args.workers)
+    print(f"ransac, process pool: {args.polygons / (time.perf_counter() - start):.0f} polygons/s")
+
+    if args.directory:
+        labels, _ = load_labels(args.directory)
+        labels = dict(labels, points=labels['points'] * (args.width, args.height))
+        n = len(labels['class_id'])
+        print(f"\n=== {args.directory}: {n} polygons ===")
+        results = compare_methods(labels)
+        for method, r in results.items():
+            print(f"{method:<8} {n / r['seconds']:>12.0f} polygons/s")
+        try:
+            for direct in (True, False):
+                name = 'cv2.fitEllipseDirect' if direct else 'cv2.fitEllipse'
+                start = time.perf_counter()
+                agreement = opencv_agreement(labels, results['direct']['fit'], direct)
+                print(f"{name}: {n / (time.perf_counter() - start):.0f} polygons/s, one call per polygon")
+                print(f"  direct vs {name}: center {agreement['center']:.3f} px, "
+                      f"major {agreement['major']:.4f}, minor {agreement['minor']:.4f}, "
+                      f"angle {agreement['angle']:.3f}°")
+        except ImportError:
+            print("OpenCV not installed, skipping the cv2 comparison")
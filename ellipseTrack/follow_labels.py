@@ -0,0 +1,189 @@
+import os
+import time
+import numpy as np
+from label_ingest import list_label_files, frame_numbers, pack_label_text, index_files
+from stream_pipeline import fit_stage, filter_stage, feature_stage, append_csv, summarize, SIGNAL_FIELDS
+from track_store import TrackStore
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # not Linux, or inotify_simple not installed: poll instead
+    INotify = None
+
+
+def poll_new_files(directory_path, seen, pending):
+    """
+    One polling pass: return label files that are new and whose size did not
+    change since the previous pass (so half-written files are not read).
+    """
+    for filename in list_label_files(directory_path):
+        if filename not in seen and filename not in pending:
+            pending[filename] = None
+    return stable_files(directory_path, pending)
+
+def stable_files(directory_path, pending):
+    """
+    Pending files whose size is unchanged since the previous check; they
+    leave pending. The others get their current size recorded.
+    """
+    ready = []
+    for filename, size in list(pending.items()):
+        try:
+            current = os.path.getsize(os.path.join(directory_path, filename))
+        except OSError:
+            del pending[filename]  # removed (or renamed) before it was finished
+            continue
+        if current == size:
+            ready.append(filename)
+            del pending[filename]
+        else:
+            pending[filename] = current
+    return ready
+
+def frame_sorted(files):
+    """Label files in frame-number order, so the causal filters see frames in sequence."""
+    files = list(files)
+    return [files[i] for i in np.argsort(frame_numbers(files), kind='stable')]
+
+def release_in_order(held, pending):
+    """
+    Take the finished files in `held` that no pending file precedes by frame
+    number, in frame order, so a file closed early never overtakes an older
+    one still waiting for its size check.
+    """
+    if not held:
+        return []
+    files = frame_sorted(held)
+    if pending:
+        first_pending = frame_numbers(list(pending)).min()
+        files = [f for f, frame in zip(files, frame_numbers(files)) if frame < first_pending]
+    held.difference_update(files)
+    return files
+
+def watch_new_files(directory_path, poll_interval=0.5, idle_exit=None, use_inotify=True):
+    """
+    Yield lists of label files, in frame order, as they are finished,
+    starting with the files already present. Uses inotify (close-after-write)
+    when available and polling otherwise. Files inotify did not see closed
+    (already present, or created before the watch started) are only yielded
+    once their size is stable over one poll interval, like polled files, and
+    finished files are held back until every pending file with a lower frame
+    number has been released, so frames are yielded in order across batches.
+    Stops after idle_exit seconds without new files.
+    """
+    seen = set()
+    pending = {}
+    held = set()
+    poll_new_files(directory_path, seen, pending)  # record the sizes of the files already present
+    last_new = last_check = time.monotonic()
+
+    inotify = None
+    if use_inotify and INotify is not None:
+        inotify = INotify()
+        inotify.add_watch(directory_path, flags.CLOSE_WRITE | flags.MOVED_TO)
+        # Files created between the listing above and add_watch wait for a stable size too
+        for filename in list_label_files(directory_path):
+            pending.setdefault(filename, None)
+
+    try:
+        while idle_exit is None or time.monotonic() - last_new < idle_exit:
+            if inotify is not None:
+                events = inotify.read(timeout=int(poll_interval * 1000))
+                closed = {event.name for event in events if event.name.endswith('.txt')} - seen
+                for filename in closed:
+                    pending.pop(filename, None)
+                new = closed
+                # Size checks at least poll_interval apart, however often events arrive
+                if pending and time.monotonic() - last_check >= poll_interval:
+                    new |= set(stable_files(directory_path, pending))
+                    last_check = time.monotonic()
+            else:
+                time.sleep(poll_interval)
+                new = set(poll_new_files(directory_path, seen, pending))
+            if new:
+                seen |= new
+                held |= new
+                last_new = time.monotonic()
+            files = release_in_order(held, pending)
+            if files:
+                yield files
+        if held:
+            # Idle exit: nothing else will finish, release what is left
+            yield frame_sorted(held)
+    finally:
+        if inotify is not None:
+            inotify.close()
+
+def follow_batches(directory_path, img_width=1.0, img_height=1.0, **watch_options):
+    """Packed labels for every group of new files, parsing each file exactly once."""
+    for files in watch_new_files(directory_path, **watch_options):
+        chunks = []
+        for filename in files:
+            with open(os.path.join(directory_path, filename), 'rb') as f:
+                chunks.append(f.read())
+        labels = pack_label_text(chunks)
+        labels['points'] *= (img_width, img_height)
+        yield index_files(labels, files)
+
+def store_stage(batches, store):
+    """Append every ELLIPSE_DTYPE batch to a TrackStore and pass it on unchanged."""
+    for records in batches:
+        values = np.stack([records[field] for field in SIGNAL_FIELDS])
+        store.extend(records['class_id'], records['frame'], values)
+        yield records
+
+def print_status(raw_data, filtered_data, feature_stats):
+    """Print the current per-track and feature summary."""
+    print(f"\n=== Follow Status ({time.strftime('%H:%M:%S')}) ===")
+    for class_id, track in raw_data.items():
+        frames = track['frames']
+        latest = filtered_data[class_id]
+        print(f"Class {class_id}: {len(track)} ellipses, frames {frames[0]}-{frames[-1]}, "
+              f"filtered position ({latest['x_pos'][-1]:.4f}, {latest['y_pos'][-1]:.4f})")
+    for name, s in feature_stats.items():
+        print(f"{name:<14} mean={s['sum'] / s['count']:.4f} min={s['min']:.4f} max={s['max']:.4f}")
+    print("=================================")
+
+
+if __name__ == "__main__":
+    import argparse
+    from batch_ingest import source_class_names, wheel_classes
+
+    parser = argparse.ArgumentParser(description='Follow a YOLOv8 label directory while predict is still writing it.')
+    parser.add_argument('directory', type=str, help='Directory receiving YOLOv8 .txt files')
+    parser.add_argument('--cutoff', type=float, default=2.0, help='Lowpass filter cutoff frequency')
+    parser.add_argument('--fs', type=float, default=30.0, help='Sampling frequency')
+    parser.add_argument('--output', type=str, default='ellipse_filtered.csv', help='Filtered CSV, appended as frames arrive')
+    parser.add_argument('--refresh', type=float, default=5.0, help='Seconds between status refreshes')
+    parser.add_argument('--poll', type=float, default=0.5, help='Polling interval in seconds')
+    parser.add_argument('--idle-exit', type=float, default=None, help='Stop after this many seconds without new files')
+    parser.add_argument('--no-inotify', action='store_true', help='Always poll instead of using inotify')
+
+    args = parser.parse_args()
+
+    if os.path.exists(args.output):
+        os.remove(args.output)
+
+    raw_data = TrackStore()
+    filtered_data = TrackStore()
+    stream = follow_batches(args.directory, poll_interval=args.poll, idle_exit=args.idle_exit,
+                            use_inotify=not args.no_inotify)
+    stream = store_stage(fit_stage(stream), raw_data)
+    stream = store_stage(filter_stage(stream, args.cutoff, args.fs), filtered_data)
+
+    # <clip>/labels/<split>: the clip's data.yaml names the wheels
+    wheels = wheel_classes(source_class_names(args.directory))
+    feature_stats = {}
+    last_refresh = 0.0
+    try:
+        for records in stream:
+            append_csv(args.output, records)
+            summarize(feature_stage([records], *wheels), feature_stats)
+            if time.monotonic() - last_refresh >= args.refresh:
+                print_status(raw_data, filtered_data, feature_stats)
+                last_refresh = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+
+    print_status(raw_data, filtered_data, feature_stats)
+    print(f"Filtered CSV saved to: {args.output}")
@@ -0,0 +1,120 @@
+import os
+import numpy as np
+from label_ingest import list_label_files, frame_numbers, pack_label_text, index_files, fit_ellipses
+from label_cache import cache_path, load_labels
+from label_archive import is_label_archive, read_archive_labels
+from batch_ingest import DATA_ROOTS, discover_clips
+
+
+def frame_bounds(file_frame, start, stop):
+    """File range [i0, i1) holding frames start..stop (inclusive); file_frame must be sorted."""
+    i0 = int(np.searchsorted(file_frame, start, side='left'))
+    i1 = int(np.searchsorted(file_frame, stop, side='right'))
+    return i0, i1
+
+def select_frames(labels, ellipses, start, stop):
+    """
+    Cut frames start..stop out of already loaded labels and ellipses.
+
+    Only contiguous slices are taken, so on a memory-mapped cache this reads
+    just the bytes of the requested frames.
+    """
+    i0, i1 = frame_bounds(labels['file_frame'], start, stop)
+    p0, p1 = int(labels['file_poly_start'][i0]), int(labels['file_poly_start'][i1])
+    q0, q1 = int(labels['offsets'][p0]), int(labels['offsets'][p1])
+
+    selected = {
+        'class_id': labels['class_id'][p0:p1],
+        'file_idx': labels['file_idx'][p0:p1] - i0,
+        'offsets': labels['offsets'][p0:p1 + 1] - q0,
+        'points': labels['points'][q0:q1],
+        'files': labels['files'][i0:i1],
+        'file_frame': labels['file_frame'][i0:i1],
+        'file_poly_start': labels['file_poly_start'][i0:i1 + 1] - p0
+    }
+    return selected, {name: values[p0:p1] for name, values in ellipses.items()}
+
+def read_frame_range(source, start, stop, img_width=1.0, img_height=1.0):
+    """
+    Read frames start..stop (inclusive, true frame numbers) of a label
+    directory or archive, touching only the labels of those frames.
+
+    A directory with a label cache is served from the cache; otherwise only
+    the files whose names fall in the range are opened.
+    """
+    def in_range(filename):
+        frame = frame_numbers([filename])[0]
+        return start <= frame <= stop
+
+    if is_label_archive(source):
+        labels = read_archive_labels(source, img_width, img_height, select=in_range)
+        return labels, fit_ellipses(labels)
+
+    if os.path.exists(os.path.join(cache_path(source), 'manifest.json')):
+        labels, ellipses = select_frames(*load_labels(source), start, stop)
+        if img_width != 1.0 or img_height != 1.0:
+            labels = dict(labels, points=labels['points'] * (img_width, img_height))
+            ellipses = fit_ellipses(labels)
+        return labels, ellipses
+
+    files = list_label_files(source)
+    i0, i1 = frame_bounds(frame_numbers(files), start, stop)
+    chunks = []
+    for filename in files[i0:i1]:
+        with open(os.path.join(source, filename), 'rb') as f:
+            chunks.append(f.read())
+    labels = pack_label_text(chunks)
+    labels['points'] *= (img_width, img_height)
+    index_files(labels, files[i0:i1])
+    return labels, fit_ellipses(labels)
+
+def find_clip(clip, roots=DATA_ROOTS):
+    """
+    Resolve a clip id such as '7-ytcrash-yolo' (or a unique prefix such as
+    '7') to its label directory. Raises ValueError listing the candidates
+    when the id matches more than one label directory.
+    """
+    clips = discover_clips(roots)
+    matches = [c['source'] for c in clips if c['clip_id'] == clip]
+    if not matches:
+        matches = [c['source'] for c in clips if c['clip_id'].split('-')[0] == clip]
+    if len(matches) > 1:
+        raise ValueError(f"Clip id '{clip}' is ambiguous, use one of: {', '.join(matches)}")
+    return matches[0] if matches else None
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Read a frame range of one clip using the frame index.')
+    parser.add_argument('source', type=str,
+                       help='Label directory, archive, or clip id (e.g. 7 or 7-ytcrash-yolo)')
+    parser.add_argument('start', type=int, help='First frame number (from the filenames)')
+    parser.add_argument('stop', type=int, help='Last frame number, inclusive')
+    parser.add_argument('--roots', type=str, nargs='+', default=DATA_ROOTS,
+                       help='Where to look up clip ids (default: Data Data-NoCrash)')
+
+    args = parser.parse_args()
+
+    source = args.source
+    if not os.path.exists(source):
+        try:
+            source = find_clip(source, args.roots)
+        except ValueError as e:
+            parser.error(str(e))
+        if source is None:
+            parser.error(f"No clip or path named {args.source}")
+
+    start = time.perf_counter()
+    labels, ellipses = read_frame_range(source, args.start, args.stop)
+    elapsed = time.perf_counter() - start
+
+    frames = labels['file_frame']
+    print(f"Source: {source}")
+    if len(frames):
+        print(f"Frames: {frames[0]}-{frames[-1]} ({len(frames)} label files)")
+    else:
+        print("Frames: none in range")
+    print(f"Polygons: {len(labels['class_id'])}")
+    print(f"Elapsed: {elapsed * 1000:.1f} ms")
@@ -0,0 +1,130 @@
+import os
+import re
+import tarfile
+import zipfile
+import yaml
+from label_ingest import natural_sort_key, pack_label_text, index_files, read_label_directory
+
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+LABEL_MEMBER = re.compile(r'(?:^|/)labels/([^/]+)/([^/]+\.txt)$')
+
+
+def is_label_archive(path):
+    """True for zip/tar files that may hold a YOLO export."""
+    return os.path.isfile(path) and path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+def iter_archive_members(archive_path):
+    """Yield (member name, bytes reader) in archive order, without extracting to disk."""
+    if archive_path.lower().endswith('.zip'):
+        with zipfile.ZipFile(archive_path) as zf:
+            for info in zf.infolist():
+                if not info.is_dir():
+                    yield info.filename, lambda info=info: zf.read(info)
+    else:
+        # Stream mode reads the (possibly compressed) tar front to back once
+        with tarfile.open(archive_path, 'r|*') as tf:
+            for member in tf:
+                if member.isfile():
+                    yield member.name, lambda member=member: tf.extractfile(member).read()
+
+def iter_label_members(archive_path, split=None):
+    """
+    Yield (filename, bytes) of one split's label members in natural order,
+    decompressing one member at a time. Uses random access, so a compressed
+    tar is indexed once up front.
+    """
+    if archive_path.lower().endswith('.zip'):
+        archive = zipfile.ZipFile(archive_path)
+        entries = [(info.filename, info) for info in archive.infolist() if not info.is_dir()]
+        read = archive.read
+    else:
+        archive = tarfile.open(archive_path, 'r:*')
+        entries = [(member.name, member) for member in archive.getmembers() if member.isfile()]
+        read = lambda member: archive.extractfile(member).read()
+
+    with archive:
+        selected = {}
+        for name, entry in entries:
+            match = LABEL_MEMBER.search(name)
+            if match:
+                selected.setdefault(match.group(1), []).append((match.group(2), entry))
+        if not selected:
+            return
+        members = selected.get(split if split is not None else sorted(selected)[0], [])
+        for filename, entry in sorted(members, key=lambda m: natural_sort_key(m[0])):
+            yield filename, read(entry)
+
+def read_archive_members(archive_path, split=None, select=None):
+    """
+    Read the label members of one split plus data.yaml from an archive.
+
+    Returns (split, filenames, chunks, data_yaml) with files in natural order.
+    When split is None the first split found (in sorted order) is used.
+    Members whose filename fails select(filename) are skipped without being
+    decompressed.
+    """
+    members = {}
+    data_yaml = None
+    for name, read in iter_archive_members(archive_path):
+        if os.path.basename(name) == 'data.yaml':
+            data_yaml = read()
+            continue
+        match = LABEL_MEMBER.search(name)
+        if (match and (split is None or match.group(1) == split)
+                and (select is None or select(match.group(2)))):
+            members.setdefault(match.group(1), {})[match.group(2)] = read()
+
+    if not members:
+        return split, [], [], data_yaml
+    if split is None:
+        split = sorted(members)[0]
+    split_members = members.get(split, {})
+    files = sorted(split_members, key=natural_sort_key)
+    return split, files, [split_members[f] for f in files], data_yaml
+
+def parse_class_names(data_yaml):
+    """Class names from the contents of a data.yaml file."""
+    if not data_yaml:
+        return {}
+    names = (yaml.safe_load(data_yaml) or {}).get('names', {})
+    if isinstance(names, list):
+        names = dict(enumerate(names))
+    return {int(k): str(v).strip() for k, v in names.items()}
+
+def read_archive_labels(archive_path, img_width=1.0, img_height=1.0, split=None, select=None):
+    """Archive counterpart of label_ingest.read_label_directory."""
+    split, files, chunks, data_yaml = read_archive_members(archive_path, split, select)
+    labels = pack_label_text(chunks)
+    labels['points'] *= (img_width, img_height)
+    index_files(labels, files)
+    labels['split'] = split
+    labels['class_names'] = parse_class_names(data_yaml)
+    return labels
+
+def read_label_source(path, img_width=1.0, img_height=1.0):
+    """Read a label directory or a zip/tar archive through the same ingestion path."""
+    if is_label_archive(path):
+        return read_archive_labels(path, img_width, img_height)
+    return read_label_directory(path, img_width, img_height)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+
+    parser = argparse.ArgumentParser(description='List the YOLOv8 label exports held in zip/tar archives.')
+    parser.add_argument('archives', type=str, nargs='+', help='Zip or tar archives of YOLO exports')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: all cores)')
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(read_archive_labels, args.archives))
+    elapsed = time.perf_counter() - start
+
+    for archive, labels in zip(args.archives, results):
+        print(f"{archive}: split={labels['split']} files={len(labels['files'])} "
+              f"polygons={len(labels['class_id'])} classes={labels['class_names']}")
+    print(f"Elapsed: {elapsed * 1000:.1f} ms")
@@ -0,0 +1,217 @@
+import os
+import json
+import shutil
+import numpy as np
+from label_ingest import list_label_files, pack_label_text, index_files, fit_ellipses
+from track_store import TrackStore
+from label_archive import is_label_archive, read_archive_labels
+
+CACHE_SUFFIX = '.ellipse-cache'
+CACHE_VERSION = 2
+LABEL_COLUMNS = ('class_id', 'file_idx', 'offsets', 'points')
+FILE_COLUMNS = ('file_frame', 'file_poly_start')  # per-file frame index
+ELLIPSE_COLUMNS = ('center_x', 'center_y', 'cov_xx', 'cov_yy', 'cov_xy',
+                   'major_axis', 'minor_axis', 'angle')
+
+
+def cache_path(directory_path):
+    """
+    Cache directory kept next to a label directory (labels/train ->
+    labels/train.ellipse-cache; labels/train.cache is Ultralytics' own cache file).
+    """
+    return os.path.normpath(directory_path) + CACHE_SUFFIX
+
+def stat_label_files(directory_path):
+    """Return label filenames with their mtime (ns) and size."""
+    files = list_label_files(directory_path)
+    stats = [os.stat(os.path.join(directory_path, f)) for f in files]
+    mtime_ns = np.array([s.st_mtime_ns for s in stats], dtype=np.int64)
+    size = np.array([s.st_size for s in stats], dtype=np.int64)
+    return files, mtime_ns, size
+
+def read_cache(cache_dir):
+    """Load a cache written by write_cache, memory-mapping every column. Returns None if unusable."""
+    manifest_file = os.path.join(cache_dir, 'manifest.json')
+    try:
+        with open(manifest_file, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != CACHE_VERSION:
+            return None
+        columns = {}
+        for name in LABEL_COLUMNS + FILE_COLUMNS + ELLIPSE_COLUMNS:
+            columns[name] = np.load(os.path.join(cache_dir, name + '.npy'), mmap_mode='r')
+    except (OSError, ValueError, KeyError):
+        return None
+
+    n_polygons = len(columns['class_id'])
+    if (len(columns['offsets']) != n_polygons + 1
+            or any(len(columns[name]) != n_polygons for name in ELLIPSE_COLUMNS)
+            or len(manifest['files']) != len(manifest['mtime_ns'])
+            or len(columns['file_frame']) != len(manifest['files'])
+            or len(columns['file_poly_start']) != len(manifest['files']) + 1):
+        return None
+
+    labels = {name: columns[name] for name in LABEL_COLUMNS + FILE_COLUMNS}
+    labels['files'] = manifest['files']
+    ellipses = {name: columns[name] for name in ELLIPSE_COLUMNS}
+    return labels, ellipses, np.array(manifest['mtime_ns'], dtype=np.int64), np.array(manifest['size'], dtype=np.int64)
+
+def write_cache(cache_dir, labels, ellipses, mtime_ns, size):
+    """Write one .npy file per column plus a manifest holding per-file mtime and size."""
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest_file = os.path.join(cache_dir, 'manifest.json')
+    if os.path.exists(manifest_file):
+        os.remove(manifest_file)  # an interrupted write must not look valid
+
+    columns = {name: labels[name] for name in LABEL_COLUMNS + FILE_COLUMNS}
+    columns.update({name: ellipses[name] for name in ELLIPSE_COLUMNS})
+    for name, values in columns.items():
+        tmp_file = os.path.join(cache_dir, name + '.tmp.npy')
+        np.save(tmp_file, np.ascontiguousarray(values))
+        os.replace(tmp_file, os.path.join(cache_dir, name + '.npy'))
+
+    manifest = {
+        'version': CACHE_VERSION,
+        'files': list(labels['files']),
+        'mtime_ns': mtime_ns.tolist(),
+        'size': size.tolist()
+    }
+    with open(manifest_file + '.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(manifest_file + '.tmp', manifest_file)
+
+def clear_cache(directory_path):
+    """Remove the cache of a label directory."""
+    shutil.rmtree(cache_path(directory_path), ignore_errors=True)
+
+def merge_polygons(sources, ellipses_list, poly_rank, files):
+    """
+    Concatenate several packed label sets and keep the polygons with rank >= 0,
+    ordered by rank. Points are gathered with one ragged index, not per polygon.
+    """
+    offsets = []
+    shift = 0
+    for source in sources:
+        offsets.append(source['offsets'][:-1] + shift)
+        shift += len(source['points'])
+    src_starts = np.concatenate(offsets)
+    src_counts = np.concatenate([np.diff(source['offsets']) for source in sources])
+
+    keep = np.flatnonzero(poly_rank >= 0)
+    order = keep[np.argsort(poly_rank[keep], kind='stable')]
+    counts = src_counts[order]
+    new_offsets = np.zeros(len(order) + 1, dtype=np.int64)
+    np.cumsum(counts, out=new_offsets[1:])
+    point_idx = np.repeat(src_starts[order] - new_offsets[:-1], counts) + np.arange(new_offsets[-1])
+
+    merged = {
+        'class_id': np.concatenate([source['class_id'] for source in sources])[order],
+        'file_idx': poly_rank[order].astype(np.int32),
+        'offsets': new_offsets,
+        'points': np.concatenate([source['points'] for source in sources])[point_idx]
+    }
+    index_files(merged, files)
+    merged_ellipses = {name: np.concatenate([e[name] for e in ellipses_list])[order]
+                       for name in ELLIPSE_COLUMNS}
+    return merged, merged_ellipses
+
+def load_labels(directory_path, verbose=False):
+    """
+    Return (labels, ellipses) for a label directory in normalized coordinates,
+    re-parsing only the files whose mtime or size changed since the last run.
+    Archives are streamed as they are and not cached.
+    """
+    if is_label_archive(directory_path):
+        labels = read_archive_labels(directory_path)
+        return labels, fit_ellipses(labels)
+
+    cache_dir = cache_path(directory_path)
+    files, mtime_ns, size = stat_label_files(directory_path)
+    cached = read_cache(cache_dir)
+
+    reuse = {}
+    if cached is not None:
+        cached_labels, cached_ellipses, cached_mtime, cached_size = cached
+        for j, filename in enumerate(cached_labels['files']):
+            reuse[filename] = (j, cached_mtime[j], cached_size[j])
+
+    # Map every current file onto a cached file or onto the list of files to parse
+    src_of_file = np.empty(len(files), dtype=np.int64)
+    to_parse = []
+    for i, filename in enumerate(files):
+        hit = reuse.get(filename)
+        if hit is not None and hit[1] == mtime_ns[i] and hit[2] == size[i]:
+            src_of_file[i] = hit[0]
+        else:
+            src_of_file[i] = -1 - len(to_parse)
+            to_parse.append(filename)
+
+    n_cached_files = len(reuse)
+    if (cached is not None and not to_parse and n_cached_files == len(files)
+            and np.array_equal(src_of_file, np.arange(len(files)))):
+        if verbose:
+            print(f"Cache: reused {len(files)} files from {cache_dir}")
+        cached_labels['files'] = files
+        return cached_labels, cached_ellipses
+
+    chunks = []
+    for filename in to_parse:
+        with open(os.path.join(directory_path, filename), 'rb') as f:
+            chunks.append(f.read())
+    parsed = pack_label_text(chunks)
+    parsed_ellipses = fit_ellipses(parsed)
+
+    if cached is None:
+        cached_labels = pack_label_text([])
+        cached_ellipses = fit_ellipses(cached_labels)
+    src_of_file[src_of_file < 0] = n_cached_files - 1 - src_of_file[src_of_file < 0]
+
+    # Rank of every source file in the current listing (-1 if deleted)
+    file_rank = np.full(n_cached_files + len(to_parse), -1, dtype=np.int64)
+    file_rank[src_of_file] = np.arange(len(files))
+    poly_src_file = np.concatenate((cached_labels['file_idx'], parsed['file_idx'] + n_cached_files))
+    labels, ellipses = merge_polygons([cached_labels, parsed], [cached_ellipses, parsed_ellipses],
+                                      file_rank[poly_src_file], files)
+
+    try:
+        write_cache(cache_dir, labels, ellipses, mtime_ns, size)
+    except OSError as e:
+        print(f"Could not write label cache {cache_dir}: {e}")
+
+    if verbose:
+        print(f"Cache: reused {len(files) - len(to_parse)} files, parsed {len(to_parse)} files")
+    return labels, ellipses
+
+def load_directory(directory_path, img_width=1.0, img_height=1.0, verbose=False):
+    """Cached equivalent of label_ingest.read_label_directory followed by fit_ellipses."""
+    labels, ellipses = load_labels(directory_path, verbose=verbose)
+    if img_width != 1.0 or img_height != 1.0:
+        labels = dict(labels, points=labels['points'] * (img_width, img_height))
+        ellipses = fit_ellipses(labels)
+    return labels, ellipses
+
+def process_directory(directory_path, img_width=1.0, img_height=1.0):
+    """Process all .txt files in directory, reusing the label cache."""
+    labels, ellipses = load_directory(directory_path, img_width, img_height)
+    return TrackStore.from_ellipses(labels['class_id'], labels['file_frame'][labels['file_idx']], ellipses)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Build or refresh the label cache of YOLOv8 label directories.')
+    parser.add_argument('directories', type=str, nargs='+', help='Directories containing YOLOv8 .txt files')
+    parser.add_argument('--clear', action='store_true', help='Remove the cache instead of building it')
+
+    args = parser.parse_args()
+
+    for directory in args.directories:
+        if args.clear:
+            clear_cache(directory)
+            print(f"Removed {cache_path(directory)}")
+            continue
+        start = time.perf_counter()
+        labels, _ = load_labels(directory, verbose=True)
+        elapsed = time.perf_counter() - start
+        print(f"{directory}: {len(labels['class_id'])} polygons in {elapsed * 1000:.1f} ms")
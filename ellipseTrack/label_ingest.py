@@ -0,0 +1,202 @@
+import os
+import re
+import numpy as np
+from track_store import TrackStore
+
+MIN_POLYGON_TOKENS = 11  # class_id + at least 5 points
+FRAME_NUMBER = re.compile(r'(\d+)\D*$')  # last number in the name: frame_000006.txt -> 6
+
+
+def natural_sort_key(s):
+    """Natural sorting for filenames."""
+    return [int(text) if text.isdigit() else text.lower() for text in re.split('([0-9]+)', s)]
+
+def list_label_files(directory_path):
+    """Return the .txt label files of a directory in natural order."""
+    files = [f for f in os.listdir(directory_path) if f.endswith('.txt')]
+    files.sort(key=natural_sort_key)
+    return files
+
+def frame_numbers(files):
+    """True frame numbers parsed from label filenames (position in the list if a name has none)."""
+    frames = np.arange(len(files), dtype=np.int64)
+    for i, filename in enumerate(files):
+        match = FRAME_NUMBER.search(filename)
+        if match:
+            frames[i] = int(match.group(1))
+    return frames
+
+def index_files(labels, files):
+    """
+    Attach the per-file frame index to packed labels: 'file_frame' holds the
+    frame number of every file and file i owns polygons
+    file_poly_start[i]:file_poly_start[i + 1].
+    """
+    labels['files'] = files
+    labels['file_frame'] = frame_numbers(files)
+    labels['file_poly_start'] = np.searchsorted(labels['file_idx'], np.arange(len(files) + 1)).astype(np.int64)
+    return labels
+
+def pack_label_text(chunks):
+    """
+    Pack the raw bytes of several YOLOv8 label files into flat arrays.
+
+    Every polygon line becomes one entry of 'class_id' and 'file_idx', and its
+    vertices are stored contiguously in 'points' (N x 2). Polygon i owns
+    points[offsets[i]:offsets[i + 1]]. Lines with fewer than 5 points or an
+    odd number of coordinates are dropped, as in parse_yolov8_segmentation.
+    """
+    lines_per_file = np.array([chunk.count(b'\n') + 1 for chunk in chunks], dtype=np.int64)
+    data = b'\n'.join(chunks)
+    empty = {
+        'class_id': np.zeros(0, dtype=np.int32),
+        'file_idx': np.zeros(0, dtype=np.int32),
+        'offsets': np.zeros(1, dtype=np.int64),
+        'points': np.zeros((0, 2), dtype=np.float64),
+    }
+    if not data.strip():
+        return empty
+
+    # Tokenise the whole buffer at once: a token starts on every non-blank
+    # byte that follows a blank one, and belongs to the line counted so far.
+    buf = np.frombuffer(data, dtype=np.uint8)
+    is_newline = buf == ord('\n')
+    is_blank = is_newline | (buf == ord(' ')) | (buf == ord('\t')) | (buf == ord('\r'))
+    starts = ~is_blank
+    starts[1:] &= is_blank[:-1]
+    token_line = np.cumsum(is_newline)[starts]
+    values = np.array(data.split(), dtype=np.float64)
+
+    n_lines = int(lines_per_file.sum())
+    tokens_per_line = np.bincount(token_line, minlength=n_lines)
+    valid = (tokens_per_line >= MIN_POLYGON_TOKENS) & (tokens_per_line % 2 == 1)
+    if not valid.any():
+        return empty
+
+    first_token = np.ones(len(values), dtype=bool)
+    first_token[1:] = token_line[1:] != token_line[:-1]
+    keep = valid[token_line]
+
+    line_file = np.repeat(np.arange(len(chunks), dtype=np.int32), lines_per_file)
+    points_per_line = (tokens_per_line[valid] - 1) // 2
+    offsets = np.zeros(len(points_per_line) + 1, dtype=np.int64)
+    np.cumsum(points_per_line, out=offsets[1:])
+
+    return {
+        'class_id': values[keep & first_token].astype(np.int32),
+        'file_idx': line_file[valid],
+        'offsets': offsets,
+        'points': values[keep & ~first_token].reshape(-1, 2),
+    }
+
+def read_label_directory(directory_path, img_width=1.0, img_height=1.0):
+    """Read every .txt label file of a directory in one pass."""
+    files = list_label_files(directory_path)
+    chunks = []
+    for filename in files:
+        with open(os.path.join(directory_path, filename), 'rb') as f:
+            chunks.append(f.read())
+
+    labels = pack_label_text(chunks)
+    labels['points'] *= (img_width, img_height)
+    return index_files(labels, files)
+
+def fit_ellipses(labels):
+    """
+    Fit the covariance ellipse of every polygon in one batched call.
+
+    Matches parse_yolov8_segmentation (vertex mean, np.cov with N - 1,
+    axes = 2 * sqrt(eigenvalue)) but solves the 2x2 eigenproblem in closed
+    form. The angle is that of the major axis, in degrees within (-90, 90].
+    """
+    offsets = labels['offsets']
+    points = labels['points']
+    counts = np.diff(offsets)
+    if len(counts) == 0:
+        return {key: np.zeros(0) for key in (
+            'center_x', 'center_y', 'cov_xx', 'cov_yy', 'cov_xy',
+            'major_axis', 'minor_axis', 'angle')}
+
+    starts = offsets[:-1]
+    center = np.add.reduceat(points, starts, axis=0) / counts[:, None]
+    centered = points - np.repeat(center, counts, axis=0)
+    cov_xx = np.add.reduceat(centered[:, 0] * centered[:, 0], starts) / (counts - 1)
+    cov_yy = np.add.reduceat(centered[:, 1] * centered[:, 1], starts) / (counts - 1)
+    cov_xy = np.add.reduceat(centered[:, 0] * centered[:, 1], starts) / (counts - 1)
+
+    half_trace = 0.5 * (cov_xx + cov_yy)
+    radius = np.hypot(0.5 * (cov_xx - cov_yy), cov_xy)
+    major_eig = half_trace + radius
+    minor_eig = np.maximum(half_trace - radius, 0.0)
+
+    return {
+        'center_x': center[:, 0],
+        'center_y': center[:, 1],
+        'cov_xx': cov_xx,
+        'cov_yy': cov_yy,
+        'cov_xy': cov_xy,
+        'major_axis': 2 * np.sqrt(major_eig),
+        'minor_axis': 2 * np.sqrt(minor_eig),
+        'angle': np.degrees(0.5 * np.arctan2(2 * cov_xy, cov_xx - cov_yy)),
+    }
+
+def iter_file_ellipses(labels, ellipses):
+    """Yield (filename, ellipses) per label file, in the parse_yolov8_segmentation format."""
+    bounds = labels['file_poly_start']
+    for file_idx, filename in enumerate(labels['files']):
+        file_ellipses = []
+        for i in range(bounds[file_idx], bounds[file_idx + 1]):
+            file_ellipses.append({
+                'class_id': int(labels['class_id'][i]),
+                'center': np.array([ellipses['center_x'][i], ellipses['center_y'][i]]),
+                'major_axis': ellipses['major_axis'][i],
+                'minor_axis': ellipses['minor_axis'][i],
+                'angle': ellipses['angle'][i]
+            })
+        yield filename, file_ellipses
+
+def group_by_class(labels, ellipses):
+    """Split batched ellipses into the per-class tracking_data layout used by the plotting scripts."""
+    tracking_data = {}
+    class_ids = labels['class_id']
+    frames = labels['file_frame'][labels['file_idx']]
+    for class_id in np.unique(class_ids):
+        mask = class_ids == class_id
+        tracking_data[int(class_id)] = {
+            'x_pos': ellipses['center_x'][mask],
+            'y_pos': ellipses['center_y'][mask],
+            'major_axes': ellipses['major_axis'][mask],
+            'minor_axes': ellipses['minor_axis'][mask],
+            'angles': ellipses['angle'][mask],
+            'frames': frames[mask]
+        }
+    return tracking_data
+
+def process_directory(directory_path, img_width=1.0, img_height=1.0):
+    """Process all .txt files in directory into a TrackStore."""
+    labels = read_label_directory(directory_path, img_width, img_height)
+    return TrackStore.from_ellipses(labels['class_id'], labels['file_frame'][labels['file_idx']],
+                                    fit_ellipses(labels))
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Parse a YOLOv8 label directory and fit all ellipses in one pass.')
+    parser.add_argument('directory', type=str, help='Directory containing YOLOv8 .txt files')
+    parser.add_argument('--width', type=float, default=1.0, help='Image width for coordinate scaling')
+    parser.add_argument('--height', type=float, default=1.0, help='Image height for coordinate scaling')
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    labels = read_label_directory(args.directory, args.width, args.height)
+    ellipses = fit_ellipses(labels)
+    elapsed = time.perf_counter() - start
+
+    print(f"Files: {len(labels['files'])}")
+    print(f"Polygons: {len(labels['class_id'])}")
+    print(f"Points: {len(labels['points'])}")
+    print(f"Classes found: {sorted(np.unique(labels['class_id']).tolist())}")
+    print(f"Elapsed: {elapsed * 1000:.1f} ms")
@@ -0,0 +1,266 @@
+import os
+import queue
+import threading
+import time
+import cv2
+import numpy as np
+from batch_ingest import CLIP_SUFFIX, wheel_classes
+from crash_detector import pair_stream, screen_streams
+from track_store import TrackStore
+from video_viewer import frame_polygons, load_overlay
+
+# BGR versions of video_viewer.WHEEL_COLORS
+WHEEL_BGR = ((208, 224, 64), (0, 0, 255), (0, 255, 255), (255, 0, 255))
+CRASH_BGR = (0, 140, 255)
+SHIFT = 4  # fractional bits of the cv2 drawing coordinates
+ONE = 1 << SHIFT
+
+
+class OverlayPainter:
+    """
+    Draws one clip's overlay onto frame buffers in place: polygon outlines,
+    fitted ellipses with their major and minor axes, a trail of the last
+    `trail` centers per wheel, and a banner for `marker_frames` frames after
+    every crash onset found by crash_detector on the (front, rear) wheel
+    classes. Everything that does not
+    depend on the frame (integer coordinates, trails, onsets) is computed
+    once here, so draw() only slices and calls cv2.
+    """
+
+    def __init__(self, labels, ellipses, trail=30, marker_frames=45, wheels=(0, 1), **detector_options):
+        self.labels = labels
+        self.trail = trail
+        self.marker_frames = marker_frames
+        self.class_id = np.asarray(labels['class_id'])
+        self.offsets = np.asarray(labels['offsets'])
+        self.points = np.round(np.asarray(labels['points']) * ONE).astype(np.int32)
+
+        cx, cy = np.asarray(ellipses['center_x']), np.asarray(ellipses['center_y'])
+        major, minor = np.asarray(ellipses['major_axis']) / 2, np.asarray(ellipses['minor_axis']) / 2
+        angle = np.radians(ellipses['angle'])
+        cos, sin = np.cos(angle), np.sin(angle)
+        fixed = lambda v: np.round(np.nan_to_num(v) * ONE).astype(np.int64)
+        self.centers = np.column_stack((fixed(cx), fixed(cy)))
+        self.half_axes = np.column_stack((fixed(major), fixed(minor)))
+        self.angles = np.nan_to_num(np.asarray(ellipses['angle'], dtype=np.float64))
+        # Axis segments (polygons, 2 axes, 2 ends, xy)
+        self.axis_ends = np.stack([
+            np.stack([np.column_stack((fixed(cx - dx), fixed(cy - dy))),
+                      np.column_stack((fixed(cx + dx), fixed(cy + dy)))], axis=1)
+            for dx, dy in ((major * cos, major * sin), (-minor * sin, minor * cos))
+        ], axis=1).astype(np.int32)
+        self.fitted = np.isfinite(cx) & np.isfinite(major) & np.isfinite(minor)
+
+        poly_frames = np.asarray(labels['file_frame'])[labels['file_idx']]
+        tracking_data = TrackStore.from_ellipses(self.class_id, poly_frames, ellipses)
+        self.trails = {}
+        for class_id, track in tracking_data.items():
+            keep = np.isfinite(track['x_pos']) & np.isfinite(track['y_pos'])
+            frames = np.asarray(track['frames'])[keep]
+            order = np.argsort(frames, kind='stable')
+            self.trails[class_id] = (frames[order], np.column_stack((fixed(track['x_pos'][keep][order]),
+                                                                     fixed(track['y_pos'][keep][order]))).astype(np.int32))
+        self.onsets = []
+        if wheels[0] in tracking_data and wheels[1] in tracking_data:
+            self.onsets = screen_streams([pair_stream(tracking_data, *wheels)], **detector_options)[0]
+
+    def draw(self, frame, label_frame):
+        """Draw the overlay of one true frame number onto frame (BGR, modified in place)."""
+        p0, p1 = frame_polygons(self.labels, label_frame)
+        for poly in range(p0, p1):
+            color = WHEEL_BGR[int(self.class_id[poly]) % len(WHEEL_BGR)]
+            outline = self.points[self.offsets[poly]:self.offsets[poly + 1]]
+            cv2.polylines(frame, [outline], True, color, 1, cv2.LINE_AA, SHIFT)
+            if not self.fitted[poly]:
+                continue
+            cv2.ellipse(frame, self.centers[poly], self.half_axes[poly], self.angles[poly], 0, 360,
+                        color, 2, cv2.LINE_AA, SHIFT)
+            cv2.polylines(frame, list(self.axis_ends[poly]), False, color, 1, cv2.LINE_AA, SHIFT)
+
+        for class_id, (frames, centers) in self.trails.items():
+            i0 = np.searchsorted(frames, label_frame - self.trail, side='left')
+            i1 = np.searchsorted(frames, label_frame, side='right')
+            if i1 - i0 > 1:
+                cv2.polylines(frame, [centers[i0:i1]], False, WHEEL_BGR[class_id % len(WHEEL_BGR)], 2,
+                              cv2.LINE_AA, SHIFT)
+
+        for event in self.onsets:
+            if event['frame'] <= label_frame < event['frame'] + self.marker_frames:
+                height, width = frame.shape[:2]
+                cv2.rectangle(frame, (0, 0), (width - 1, height - 1), CRASH_BGR, 8)
+                cv2.putText(frame, f"CRASH ONSET frame {event['frame']} ({event['feature']} {event['zscore']:+.1f})",
+                            (20, height - 24), cv2.FONT_HERSHEY_SIMPLEX, 1.0, CRASH_BGR, 2, cv2.LINE_AA)
+        for color, thickness in (((0, 0, 0), 5), ((255, 255, 255), 2)):
+            cv2.putText(frame, f'frame {label_frame}', (12, 32), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, thickness,
+                        cv2.LINE_AA)
+        return frame
+
+def clip_video(clip, video_dirs=('.',)):
+    """
+    Source video of a discovered clip, e.g. Data/5-ytcrash-yolo -> 005-ytcrash.mp4
+    (or 5-ytcrash.mp4) in one of video_dirs; None when there is none.
+    """
+    name = clip['clip_id'][:-len(CLIP_SUFFIX)] if clip['clip_id'].endswith(CLIP_SUFFIX) else clip['clip_id']
+    number, _, rest = name.partition('-')
+    names = [f'{name}.mp4']
+    if number.isdigit():
+        names.append(f'{int(number):03d}-{rest}.mp4')
+    for directory in video_dirs:
+        for candidate in names:
+            path = os.path.join(directory, candidate)
+            if os.path.isfile(path):
+                return path
+    return None
+
+def stage_worker(work, inbox, outbox, errors):
+    """Apply work to every item of inbox until the None sentinel, passing results (and the sentinel) on."""
+    try:
+        while True:
+            item = inbox.get()
+            if item is None:
+                break
+            result = work(item)
+            if outbox is not None:
+                outbox.put(result)
+    except Exception as error:
+        errors.append(error)
+        # Keep draining so the decoder never blocks on a dead stage
+        while inbox.get() is not None:
+            pass
+    finally:
+        if outbox is not None:
+            outbox.put(None)
+
+def decode_frames(video, count, size):
+    """(index, BGR frame) of every video frame, or blank frames of size (width, height) when video is None."""
+    if video is None:
+        for index in range(count):
+            yield index, np.zeros((size[1], size[0], 3), np.uint8)
+        return
+    capture = cv2.VideoCapture(video)
+    try:
+        for index in range(count):
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield index, frame
+    finally:
+        capture.release()
+
+def render_overlay(labels_dir, output, video=None, frame_offset=0, size=(1280, 720), fps=30.0, trail=30,
+                   queue_size=8, fourcc='mp4v', wheels=(0, 1), **detector_options):
+    """
+    Render one clip's overlay video through three stages connected by
+    bounded queues: decoding (the calling thread), drawing in place and
+    encoding (one thread each). OpenCV releases the GIL while it decodes,
+    draws and encodes, so the stages overlap, and at most queue_size frames
+    wait between two of them. Without a video the overlay is drawn on a
+    blank canvas of `size` covering label frames frame_offset..last.
+    Returns frames rendered, elapsed seconds and the clip duration in seconds.
+    """
+    start = time.perf_counter()
+    if video is not None:
+        capture = cv2.VideoCapture(video)
+        if not capture.isOpened():
+            raise OSError(f"Cannot open video {video}")
+        size = (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        fps = capture.get(cv2.CAP_PROP_FPS) or fps
+        count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        capture.release()
+    labels, ellipses = load_overlay(labels_dir, *size)
+    painter = OverlayPainter(labels, ellipses, trail, wheels=wheels, **detector_options)
+    if video is None:
+        count = int(labels['file_frame'][-1]) - frame_offset + 1 if len(labels['file_frame']) else 0
+
+    writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+    if not writer.isOpened():
+        raise OSError(f"Cannot write video {output} with codec {fourcc}")
+    written = [0]
+
+    def draw(item):
+        index, frame = item
+        return painter.draw(frame, index + frame_offset)
+
+    def encode(frame):
+        writer.write(frame)
+        written[0] += 1
+
+    decoded, drawn = queue.Queue(maxsize=queue_size), queue.Queue(maxsize=queue_size)
+    errors = []
+    threads = [threading.Thread(target=stage_worker, args=(draw, decoded, drawn, errors), daemon=True),
+               threading.Thread(target=stage_worker, args=(encode, drawn, None, errors), daemon=True)]
+    for thread in threads:
+        thread.start()
+    try:
+        for item in decode_frames(video, count, size):
+            decoded.put(item)
+            if errors:
+                break
+    finally:
+        decoded.put(None)
+        for thread in threads:
+            thread.join()
+        writer.release()
+    if errors:
+        raise errors[0]
+    return written[0], time.perf_counter() - start, written[0] / fps
+
+def render_clip(clip, output_dir, video_dirs=('.',), **options):
+    """Render one discovered clip to <output_dir>/<clip_id>-<split>.mp4, over its video when one is found."""
+    video = clip_video(clip, video_dirs)
+    output = os.path.join(output_dir, f"{clip['clip_id']}-{clip['split']}.mp4")
+    return (output, video) + render_overlay(clip['source'], output, video, wheels=wheel_classes(clip['class_names']),
+                                            **options)
+
+
+if __name__ == "__main__":
+    import argparse
+    from concurrent.futures import ProcessPoolExecutor
+    from batch_ingest import DATA_ROOTS, discover_clips, read_class_names
+
+    parser = argparse.ArgumentParser(description='Render annotated overlay videos of the fitted ellipses, '
+                                                 'tracks and crash onsets.')
+    parser.add_argument('roots', type=str, nargs='*', default=DATA_ROOTS,
+                       help='Directories containing *-yolo clip exports (default: Data Data-NoCrash)')
+    parser.add_argument('--labels', type=str, default=None,
+                       help='Render only this directory of YOLOv8 .txt files instead of every clip')
+    parser.add_argument('--video', type=str, default=None, help='Source video for --labels (default: blank canvas)')
+    parser.add_argument('--video-dirs', type=str, default='.',
+                       help='Comma-separated directories searched for clip videos in batch mode')
+    parser.add_argument('--output', type=str, default='overlay.mp4', help='Output video for --labels')
+    parser.add_argument('--output-dir', type=str, default='overlays', help='Output directory in batch mode')
+    parser.add_argument('--frame-offset', type=int, default=0, help='Label frame number of video frame 0')
+    parser.add_argument('--width', type=int, default=1280, help='Blank canvas width')
+    parser.add_argument('--height', type=int, default=720, help='Blank canvas height')
+    parser.add_argument('--fps', type=float, default=30.0, help='Frame rate of blank canvas renders')
+    parser.add_argument('--trail', type=int, default=30, help='Frames of center history drawn per wheel')
+    parser.add_argument('--queue-size', type=int, default=8, help='Frames buffered between two stages')
+    parser.add_argument('--fourcc', type=str, default='mp4v', help='Output codec')
+    parser.add_argument('--workers', type=int, default=1, help='Clips rendered at once in batch mode')
+
+    args = parser.parse_args()
+    options = dict(frame_offset=args.frame_offset, size=(args.width, args.height), fps=args.fps, trail=args.trail,
+                   queue_size=args.queue_size, fourcc=args.fourcc)
+
+    if args.labels:
+        # <clip>/labels/<split>: the clip's data.yaml names the wheels
+        clip_dir = os.path.dirname(os.path.dirname(os.path.normpath(args.labels)))
+        frames, seconds, duration = render_overlay(args.labels, args.output, args.video,
+                                                   wheels=wheel_classes(read_class_names(clip_dir)), **options)
+        print(f"{frames} frames saved to {args.output} in {seconds:.2f} s "
+              f"({frames / max(seconds, 1e-9):.0f} fps, {duration / max(seconds, 1e-9):.1f}x real time)")
+    else:
+        clips = discover_clips(args.roots)
+        os.makedirs(args.output_dir, exist_ok=True)
+        video_dirs = args.video_dirs.split(',')
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = [pool.submit(render_clip, clip, args.output_dir, video_dirs, **options) for clip in clips]
+            results = [future.result() for future in futures]
+        wall_time = time.perf_counter() - start
+        for output, video, frames, seconds, duration in results:
+            print(f"{frames:>6} frames {seconds:>7.2f} s {duration / max(seconds, 1e-9):>6.1f}x  {output}"
+                  f"  ({video or 'blank canvas'})")
+        total = sum(duration for *_, duration in results)
+        print(f"{len(results)} clips, {total:.1f} s of video rendered in {wall_time:.2f} s "
+              f"({total / max(wall_time, 1e-9):.1f}x real time)")
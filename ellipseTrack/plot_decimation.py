@@ -0,0 +1,120 @@
+import numpy as np
+
+
+def minmax_decimate(x, y, x0=None, x1=None, columns=1000):
+    """
+    Reduce a sorted series to the samples a line plot can show in `columns`
+    pixel columns between x0 and x1: the first, minimum, maximum and last
+    sample of every column (M4). Extremes are real samples, so peaks stay
+    exact. One sample beyond each side of the range is kept so the line
+    runs to the axes edge. Returns (x, y), the input itself when it is already small.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(x) == 0:
+        return x, y
+    x0 = x[0] if x0 is None else x0
+    x1 = x[-1] if x1 is None else x1
+    i0 = max(int(np.searchsorted(x, x0, side='left')) - 1, 0)
+    i1 = min(int(np.searchsorted(x, x1, side='right')) + 1, len(x))
+    if i1 - i0 <= 4 * columns:
+        return x[i0:i1], y[i0:i1]
+
+    xs, ys = x[i0:i1], y[i0:i1]
+    # Column of every sample; samples outside [x0, x1] go to the end columns
+    width = (x1 - x0) / columns if x1 > x0 else 1.0
+    column = np.clip(((xs - x0) / width).astype(np.int64), 0, columns - 1)
+    starts = np.flatnonzero(np.diff(column, prepend=-1))
+    stops = np.append(starts[1:], len(xs))
+
+    # Per-column extremes, then the first sample that reaches each of them
+    low = np.fmin.reduceat(ys, starts)
+    high = np.fmax.reduceat(ys, starts)
+    bins = np.repeat(np.arange(len(starts)), stops - starts)
+    keep = np.zeros(len(xs), dtype=bool)
+    keep[starts] = keep[stops - 1] = True
+    for extreme in (low, high):
+        hits = np.flatnonzero(ys == extreme[bins])
+        first = hits[np.diff(bins[hits], prepend=-1) != 0]
+        keep[first] = True
+    return xs[keep], ys[keep]
+
+class DecimatedLine:
+    """
+    A Line2D fed through minmax_decimate. The full arrays are kept here and
+    the drawn subset is recomputed whenever the x limits or the figure size
+    change, so zooming in brings back every sample of the visible range.
+    """
+
+    def __init__(self, ax, line, x, y):
+        self.ax = ax
+        self.line = line
+        self.set_data(x, y)
+        ax.callbacks.connect('xlim_changed', self.update)
+        if ax.figure.canvas is not None:
+            ax.figure.canvas.mpl_connect('resize_event', self.update)
+
+    def columns(self):
+        return max(int(self.ax.bbox.width), 1)
+
+    def set_data(self, x, y):
+        """Replace the full series; the drawn subset covers all of it until the limits change."""
+        self.x = np.asarray(x)
+        self.y = np.asarray(y)
+        # The subset keeps both ends and every column's extremes, so relim() still sees the full extent
+        self.line.set_data(*minmax_decimate(self.x, self.y, columns=self.columns()))
+
+    def update(self, *_):
+        # Called while the limits change; the canvas redraws afterwards anyway
+        x0, x1 = sorted(self.ax.get_xlim())
+        self.line.set_data(*minmax_decimate(self.x, self.y, x0, x1, self.columns()))
+
+def plot_decimated(ax, x, y, *args, **kwargs):
+    """Drop-in for ax.plot(x, y, ...) of one long series; returns the Line2D."""
+    line, = ax.plot([], [], *args, **kwargs)
+    line.decimated = DecimatedLine(ax, line, x, y)
+    # set_data does not touch the data limits: add the full extent so autoscaling sees it
+    xy = np.column_stack((line.decimated.x, line.decimated.y)).astype(float)
+    ax.update_datalim(xy[np.isfinite(xy).all(axis=1)])
+    ax.autoscale_view()
+    return line
+
+
+if __name__ == "__main__":
+    import argparse
+    import io
+    import time
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    parser = argparse.ArgumentParser(description='Check min/max decimation on a long synthetic track.')
+    parser.add_argument('--frames', type=int, default=200000, help='Samples in the synthetic series')
+
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = np.arange(args.frames)
+    signal = np.cumsum(rng.normal(size=args.frames)) * 0.01
+    spike = args.frames * 2 // 3
+    signal[spike] += 50.0  # one-frame crash spike
+
+    start = time.perf_counter()
+    x, y = minmax_decimate(frames, signal, columns=1800)
+    elapsed = time.perf_counter() - start
+    print(f"{args.frames} samples -> {len(x)} in {elapsed * 1000:.1f} ms, "
+          f"spike kept exactly: {signal[spike] in y and spike in x}")
+
+    for label, plot in (('full', lambda ax: ax.plot(frames, signal)),
+                        ('decimated', lambda ax: plot_decimated(ax, frames, signal))):
+        fig, ax = plt.subplots(figsize=(18, 4))
+        plot(ax)
+        start = time.perf_counter()
+        svg = io.BytesIO()
+        fig.savefig(svg, format='svg')
+        elapsed = time.perf_counter() - start
+        ax.set_xlim(spike - 500, spike + 500)
+        zoomed = len(ax.lines[0].get_xdata())
+        print(f"{label:>9}: SVG {len(svg.getvalue()) / 1024:.0f} KiB in {elapsed * 1000:.0f} ms, "
+              f"{zoomed} points drawn after zooming to 1000 frames")
+        plt.close(fig)
@@ -1,56 +1,9 @@
-import os
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.patches import Ellipse
 import math
-
-def parse_yolov8_segmentation(file_path, img_width=1.0, img_height=1.0):
-    """
-    Parse YOLOv8 segmentation data from a text file and extract ellipse parameters.
-    YOLOv8 segmentation format: class x1 y1 x2 y2 ... xn yn (normalized coordinates)
-    For ellipses, we assume the points represent a polygon approximation of the ellipse.
-    """
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
-    
-    ellipses = []
-    for line in lines:
-        parts = list(map(float, line.strip().split()))
-        class_id = int(parts[0])
-        points = np.array(parts[1:]).reshape(-1, 2)
-        
-        # Convert normalized coordinates to absolute coordinates
-        points[:, 0] *= img_width
-        points[:, 1] *= img_height
-        
-        # Calculate ellipse parameters from the polygon points
-        if len(points) >= 5:  # Need at least 5 points to fit an ellipse
-            center = np.mean(points, axis=0)
-            centered_points = points - center
-            
-            # Calculate covariance matrix
-            cov = np.cov(centered_points.T)
-            
-            # Get eigenvalues and eigenvectors
-            eigenvalues, eigenvectors = np.linalg.eig(cov)
-            
-            # Calculate major and minor axes (2 * sqrt(eigenvalues))
-            # We multiply by 2 because eigenvalues are variances of the coordinates
-            major_axis = 2 * math.sqrt(max(eigenvalues))
-            minor_axis = 2 * math.sqrt(min(eigenvalues))
-            
-            # Calculate angle (in degrees)
-            angle = math.degrees(math.atan2(eigenvectors[1, 0], eigenvectors[0, 0]))
-            
-            ellipses.append({
-                'class_id': class_id,
-                'center': center,
-                'major_axis': major_axis,
-                'minor_axis': minor_axis,
-                'angle': angle
-            })
-    
-    return ellipses
+from label_ingest import iter_file_ellipses
+from label_cache import load_directory
 
 def plot_ellipses(ellipses, title="Ellipses Visualization"):
     """
@@ -114,15 +67,12 @@ def process_directory(directory_path, img_width=1.0, img_height=1.0):
     """
     Process all .txt files in a directory and plot the ellipses.
     """
-    for filename in os.listdir(directory_path):
-        if filename.endswith('.txt'):
-            file_path = os.path.join(directory_path, filename)
-            ellipses = parse_yolov8_segmentation(file_path, img_width, img_height)
-            
-            if ellipses:
-                plot_ellipses(ellipses, title=f"Ellipses from {filename}")
-            else:
-                print(f"No ellipses found in {filename}")
+    labels, ellipses = load_directory(directory_path, img_width, img_height)
+    for filename, file_ellipses in iter_file_ellipses(labels, ellipses):
+        if file_ellipses:
+            plot_ellipses(file_ellipses, title=f"Ellipses from {filename}")
+        else:
+            print(f"No ellipses found in {filename}")
 
 # Example usage
 if __name__ == "__main__":
@@ -1,97 +1,26 @@
-import os
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.patches import Ellipse
-import math
-import re
-
-def natural_sort_key(s):
-    """
-    Key function for natural sorting of filenames.
-    """
-    return [int(text) if text.isdigit() else text.lower() for text in re.split('([0-9]+)', s)]
-
-def parse_yolov8_segmentation(file_path, img_width=1.0, img_height=1.0):
-    """
-    Parse YOLOv8 segmentation data from a text file and extract ellipse parameters.
-    Returns a list of ellipses (one for each object in the file).
-    """
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
-    
-    ellipses = []
-    for line in lines:
-        parts = list(map(float, line.strip().split()))
-        if len(parts) < 11:  # Need at least 5 points (5*2=10) + class_id
-            continue
-            
-        class_id = int(parts[0])
-        points = np.array(parts[1:]).reshape(-1, 2)
-        
-        # Convert normalized coordinates to absolute coordinates
-        points[:, 0] *= img_width
-        points[:, 1] *= img_height
-        
-        # Calculate ellipse parameters from the polygon points
-        center = np.mean(points, axis=0)
-        centered_points = points - center
-        
-        # Calculate covariance matrix
-        cov = np.cov(centered_points.T)
-        
-        # Get eigenvalues and eigenvectors
-        eigenvalues, eigenvectors = np.linalg.eig(cov)
-        
-        # Calculate major and minor axes (2 * sqrt(eigenvalues))
-        major_axis = 2 * math.sqrt(max(eigenvalues))
-        minor_axis = 2 * math.sqrt(min(eigenvalues))
-        
-        # Calculate angle (in degrees)
-        angle = math.degrees(math.atan2(eigenvectors[1, 0], eigenvectors[0, 0]))
-        
-        ellipses.append({
-            'class_id': class_id,
-            'center': center,
-            'major_axis': major_axis,
-            'minor_axis': minor_axis,
-            'angle': angle
-        })
-    
-    return ellipses
+from label_ingest import group_by_class
+from label_cache import load_directory
 
 def process_directory(directory_path, img_width=1.0, img_height=1.0):
     """
     Process all .txt files in a directory and collect ellipse data over time.
     Returns a dictionary with tracking data for each ellipse class.
     """
-    # Get sorted list of files
-    files = [f for f in os.listdir(directory_path) if f.endswith('.txt')]
-    files.sort(key=natural_sort_key)
+    labels, ellipses = load_directory(directory_path, img_width, img_height)
     
     # Dictionary to store tracking data for each class
     tracking_data = {}
-    
-    for frame_idx, filename in enumerate(files):
-        file_path = os.path.join(directory_path, filename)
-        ellipses = parse_yolov8_segmentation(file_path, img_width, img_height)
-        
-        for ellipse in ellipses:
-            class_id = ellipse['class_id']
-            
-            if class_id not in tracking_data:
-                tracking_data[class_id] = {
-                    'centers': [],
-                    'major_axes': [],
-                    'minor_axes': [],
-                    'angles': [],
-                    'frames': []
-                }
-            
-            tracking_data[class_id]['centers'].append(ellipse['center'])
-            tracking_data[class_id]['major_axes'].append(ellipse['major_axis'])
-            tracking_data[class_id]['minor_axes'].append(ellipse['minor_axis'])
-            tracking_data[class_id]['angles'].append(ellipse['angle'])
-            tracking_data[class_id]['frames'].append(frame_idx)
+    for class_id, data in group_by_class(labels, ellipses).items():
+        tracking_data[class_id] = {
+            'centers': np.column_stack((data['x_pos'], data['y_pos'])),
+            'major_axes': data['major_axes'],
+            'minor_axes': data['minor_axes'],
+            'angles': data['angles'],
+            'frames': data['frames']
+        }
     
     return tracking_data
 
@@ -1,87 +1,16 @@
-import os
-import numpy as np
 import matplotlib.pyplot as plt
-import math
-import re
 from collections import defaultdict
-from scipy.optimize import least_squares
-
-def natural_sort_key(s):
-    """Key function for natural sorting of filenames."""
-    return [int(text) if text.isdigit() else text.lower() for text in re.split('([0-9]+)', s)]
+from ellipse_fit import fit_ellipses
+from label_ingest import group_by_class
+from label_cache import load_directory
+from wheel_pose import WHEEL_DIAMETER, camera_matrix, wheel_poses
 
 # Constants for real-world conversion
-WHEEL_DIAMETER = 28.0  # inches
 PIXELS_PER_INCH = 100.0  # This needs calibration for your specific setup
-BASELINE_DISTANCE = WHEEL_DIAMETER * math.pi  # Circumference as baseline (adjust as needed)
-
-def triangulate_position(centers, baseline=BASELINE_DISTANCE):
-    """
-    Triangulate real-world positions using two ellipse centers as stereo pair.
-    Assumes centers are from two cameras with known baseline distance.
-    """
-    if len(centers) != 2:
-        return None
-    
-    # Convert pixel coordinates to normalized coordinates
-    x1, y1 = centers[0]
-    x2, y2 = centers[1]
-    
-    # Simple stereo triangulation (replace with your actual camera calibration)
-    z = (baseline * PIXELS_PER_INCH) / (x1 - x2 + 1e-6)  # Avoid division by zero
-    x = (x1 + x2) / 2 / PIXELS_PER_INCH
-    y = (y1 + y2) / 2 / PIXELS_PER_INCH
-    
-    return x, y, z
 
-def parse_yolov8_segmentation(file_path, img_width=1.0, img_height=1.0):
-    """Parse YOLOv8 segmentation data and extract ellipse parameters."""
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
-    
-    ellipses = []
-    for line in lines:
-        parts = list(map(float, line.strip().split()))
-        if len(parts) < 11:  # Need at least 5 points (5*2=10) + class_id
-            continue
-            
-        class_id = int(parts[0])
-        points = np.array(parts[1:]).reshape(-1, 2)
-        
-        # Convert normalized coordinates to absolute coordinates
-        points[:, 0] *= img_width
-        points[:, 1] *= img_height
-        
-        # Calculate ellipse parameters
-        center = np.mean(points, axis=0)
-        centered_points = points - center
-        cov = np.cov(centered_points.T)
-        eigenvalues, eigenvectors = np.linalg.eig(cov)
-        major_axis = 2 * math.sqrt(max(eigenvalues))
-        minor_axis = 2 * math.sqrt(min(eigenvalues))
-        angle = math.degrees(math.atan2(eigenvectors[1, 0], eigenvectors[0, 0]))
-        
-        # Convert axes to inches
-        major_axis_in = major_axis / PIXELS_PER_INCH
-        minor_axis_in = minor_axis / PIXELS_PER_INCH
-        
-        ellipses.append({
-            'class_id': class_id,
-            'center': center,
-            'center_in': (center[0]/PIXELS_PER_INCH, center[1]/PIXELS_PER_INCH),
-            'major_axis': major_axis,
-            'minor_axis': minor_axis,
-            'major_axis_in': major_axis_in,
-            'minor_axis_in': minor_axis_in,
-            'angle': angle
-        })
-    
-    return ellipses
-
-def process_directory(directory_path, img_width=1.0, img_height=1.0):
+def process_directory(directory_path, img_width=1.0, img_height=1.0, focal=None):
     """Process all .txt files and collect ellipse data over time."""
-    files = [f for f in os.listdir(directory_path) if f.endswith('.txt')]
-    files.sort(key=natural_sort_key)
+    labels, ellipses = load_directory(directory_path, img_width, img_height)
     
     tracking_data = defaultdict(lambda: {
         'x_pos': [], 'y_pos': [], 'x_pos_in': [], 'y_pos_in': [],
@@ -89,31 +18,27 @@ def process_directory(directory_path, img_width=1.0, img_height=1.0):
         'angles': [], 'frames': [], 'real_pos': []
     })
     
-    for frame_idx, filename in enumerate(files):
-        file_path = os.path.join(directory_path, filename)
-        ellipses = parse_yolov8_segmentation(file_path, img_width, img_height)
-        
-        # Store individual ellipse data
-        for ellipse in ellipses:
-            class_id = ellipse['class_id']
-            tracking_data[class_id]['x_pos'].append(ellipse['center'][0])
-            tracking_data[class_id]['y_pos'].append(ellipse['center'][1])
-            tracking_data[class_id]['x_pos_in'].append(ellipse['center_in'][0])
-            tracking_data[class_id]['y_pos_in'].append(ellipse['center_in'][1])
-            tracking_data[class_id]['major_axes'].append(ellipse['major_axis'])
-            tracking_data[class_id]['minor_axes'].append(ellipse['minor_axis'])
-            tracking_data[class_id]['major_axes_in'].append(ellipse['major_axis_in'])
-            tracking_data[class_id]['minor_axes_in'].append(ellipse['minor_axis_in'])
-            tracking_data[class_id]['angles'].append(ellipse['angle'])
-            tracking_data[class_id]['frames'].append(frame_idx)
-        
-        # Perform triangulation if we have exactly two ellipses (stereo pair)
-        if len(ellipses) == 2:
-            centers = [e['center'] for e in ellipses]
-            real_pos = triangulate_position(centers)
-            if real_pos:
-                for i, ellipse in enumerate(ellipses):
-                    tracking_data[ellipse['class_id']]['real_pos'].append(real_pos)
+    # Store individual ellipse data, converting lengths to inches in one go
+    for class_id, data in group_by_class(labels, ellipses).items():
+        tracking_data[class_id].update({
+            'x_pos': data['x_pos'],
+            'y_pos': data['y_pos'],
+            'x_pos_in': data['x_pos'] / PIXELS_PER_INCH,
+            'y_pos_in': data['y_pos'] / PIXELS_PER_INCH,
+            'major_axes': data['major_axes'],
+            'minor_axes': data['minor_axes'],
+            'major_axes_in': data['major_axes'] / PIXELS_PER_INCH,
+            'minor_axes_in': data['minor_axes'] / PIXELS_PER_INCH,
+            'angles': data['angles'],
+            'frames': data['frames']
+        })
+    
+    # Metric wheel centers from each ellipse and the known wheel diameter;
+    # the conics need true-axis fits in pixel coordinates
+    poses = wheel_poses(labels, fit_ellipses(labels, 'direct'),
+                        camera_matrix(img_width, img_height, focal), WHEEL_DIAMETER)
+    for class_id in tracking_data:
+        tracking_data[class_id]['real_pos'] = poses['center'][poses['class_id'] == class_id]
     
     return tracking_data
 
@@ -141,13 +66,11 @@ def plot_trajectories(tracking_data):
         ax2.plot(data['frames'], data['y_pos'], '-', color=color, label=f'Ellipse {class_id}')
         
         # Real-world coordinates (if available)
-        if data['real_pos']:
-            real_x = [pos[0] for pos in data['real_pos']]
-            real_y = [pos[1] for pos in data['real_pos']]
-            real_z = [pos[2] for pos in data['real_pos']]
-            ax3.plot(data['frames'][:len(real_x)], real_x, '-', color=color, label=f'X {class_id}')
-            ax3.plot(data['frames'][:len(real_y)], real_y, '--', color=color, label=f'Y {class_id}')
-            ax3.plot(data['frames'][:len(real_z)], real_z, ':', color=color, label=f'Z {class_id}')
+        if len(data['real_pos']):
+            real_x, real_y, real_z = data['real_pos'].T
+            ax3.plot(data['frames'], real_x, '-', color=color, label=f'X {class_id}')
+            ax3.plot(data['frames'], real_y, '--', color=color, label=f'Y {class_id}')
+            ax3.plot(data['frames'], real_z, ':', color=color, label=f'Z {class_id}')
         
         # Characteristics
         ax5.plot(data['frames'], data['major_axes_in'], '-', color=color, label=f'Major {class_id}')
@@ -192,6 +115,8 @@ if __name__ == "__main__":
     parser.add_argument('directory', type=str, help='Directory containing YOLOv8 .txt files')
     parser.add_argument('--width', type=float, default=1.0, help='Image width for coordinate scaling')
     parser.add_argument('--height', type=float, default=1.0, help='Image height for coordinate scaling')
+    parser.add_argument('--focal', type=float, default=None,
+                       help='Focal length in pixels for the metric wheel poses (default: image width)')
     parser.add_argument('--pixels_per_inch', type=float, default=100.0, 
                        help='Calibration factor: pixels per inch in the image')
     
@@ -200,5 +125,5 @@ if __name__ == "__main__":
     # Update constants based on arguments
     PIXELS_PER_INCH = args.pixels_per_inch
     
-    tracking_data = process_directory(args.directory, args.width, args.height)
+    tracking_data = process_directory(args.directory, args.width, args.height, args.focal)
     plot_trajectories(tracking_data)
@@ -0,0 +1,188 @@
+import os
+import numpy as np
+from label_ingest import list_label_files, pack_label_text, index_files
+from ellipse_fit import FIT_METHOD_HELP, FIT_METHODS, fit_ellipses
+from label_archive import is_label_archive, iter_label_members
+from track_filter import StreamingLowpass
+
+ELLIPSE_DTYPE = np.dtype([
+    ('frame', np.int64), ('class_id', np.int32),
+    ('center_x', np.float64), ('center_y', np.float64),
+    ('major_axis', np.float64), ('minor_axis', np.float64), ('angle', np.float64)
+])
+SIGNAL_FIELDS = ('center_x', 'center_y', 'major_axis', 'minor_axis', 'angle')
+FEATURE_DTYPE = np.dtype([
+    ('frame', np.int64),
+    ('x_difference', np.float64), ('y_difference', np.float64),
+    ('front_ratio', np.float64), ('rear_ratio', np.float64)
+])
+
+
+def label_batches(source, batch_files=256, img_width=1.0, img_height=1.0):
+    """Yield packed labels for consecutive groups of batch_files label files (directory or archive)."""
+    def pack(files, chunks):
+        labels = pack_label_text(chunks)
+        labels['points'] *= (img_width, img_height)
+        return index_files(labels, files)
+
+    files, chunks = [], []
+    if is_label_archive(source):
+        for filename, data in iter_label_members(source):
+            files.append(filename)
+            chunks.append(data)
+            if len(files) == batch_files:
+                yield pack(files, chunks)
+                files, chunks = [], []
+    else:
+        for filename in list_label_files(source):
+            with open(os.path.join(source, filename), 'rb') as f:
+                files.append(filename)
+                chunks.append(f.read())
+            if len(files) == batch_files:
+                yield pack(files, chunks)
+                files, chunks = [], []
+    if files:
+        yield pack(files, chunks)
+
+def fit_stage(batches, method='moments', executor=None):
+    """Packed labels -> ELLIPSE_DTYPE record batches, fitted with one of ellipse_fit.FIT_METHODS."""
+    for labels in batches:
+        ellipses = fit_ellipses(labels, method, executor)
+        records = np.empty(len(labels['class_id']), dtype=ELLIPSE_DTYPE)
+        records['frame'] = labels['file_frame'][labels['file_idx']]
+        records['class_id'] = labels['class_id']
+        for field in SIGNAL_FIELDS:
+            records[field] = ellipses[field]
+        yield records
+
+def filter_stage(batches, cutoff=2.0, fs=30.0, order=5):
+    """
+    Causal Butterworth lowpass per class, carrying the filter state from one
+    batch to the next so memory does not depend on the clip length.
+    """
+    filters = {}
+    for records in batches:
+        filtered = records.copy()
+        for class_id in np.unique(records['class_id']):
+            mask = records['class_id'] == class_id
+            if class_id not in filters:
+                filters[class_id] = StreamingLowpass(cutoff, fs, order)
+            out = filters[class_id].update(np.column_stack([records[field][mask] for field in SIGNAL_FIELDS]))
+            for i, field in enumerate(SIGNAL_FIELDS):
+                filtered[field][mask] = out[:, i]
+        yield filtered
+
+def feature_stage(batches, front=0, rear=1):
+    """Per-frame differences between the front and rear wheel plus their axis ratios."""
+    for records in batches:
+        front_rows = records[records['class_id'] == front]
+        rear_rows = records[records['class_id'] == rear]
+        frames, i, j = np.intersect1d(front_rows['frame'], rear_rows['frame'], return_indices=True)
+        front_rows, rear_rows = front_rows[i], rear_rows[j]
+
+        features = np.empty(len(frames), dtype=FEATURE_DTYPE)
+        features['frame'] = frames
+        features['x_difference'] = front_rows['center_x'] - rear_rows['center_x']
+        features['y_difference'] = rear_rows['center_y'] - front_rows['center_y']  # Inverted subtraction
+        features['front_ratio'] = front_rows['major_axis'] / front_rows['minor_axis']
+        features['rear_ratio'] = rear_rows['major_axis'] / rear_rows['minor_axis']
+        yield features
+
+STAGES = {
+    'fit': fit_stage,
+    'filter': filter_stage,
+    'features': feature_stage
+}
+
+def build_pipeline(source, stages, batch_files=256, cutoff=2.0, fs=30.0, img_width=1.0, img_height=1.0,
+                   fit_method='moments', executor=None, wheels=(0, 1)):
+    """
+    Chain the label source with the named stages, e.g. ['fit', 'filter', 'features'].
+    A ransac fit runs its per-frame chunks in `executor` when one is given;
+    the features stage compares the (front, rear) class ids in `wheels`.
+    """
+    if not stages or stages[0] != 'fit':
+        raise ValueError("The first stage must be 'fit'")
+    stream = label_batches(source, batch_files, img_width, img_height)
+    for name in stages:
+        if name not in STAGES:
+            raise ValueError(f"Unknown stage '{name}', choose from {', '.join(STAGES)}")
+        if name == 'fit':
+            stream = fit_stage(stream, fit_method, executor)
+        elif name == 'filter':
+            stream = filter_stage(stream, cutoff, fs)
+        else:
+            stream = feature_stage(stream, *wheels)
+    return stream
+
+def append_csv(output_file, records):
+    """Append one batch to a CSV, writing the header if the file is new."""
+    new_file = not os.path.exists(output_file) or os.path.getsize(output_file) == 0
+    with open(output_file, 'a') as f:
+        if new_file:
+            f.write(','.join(records.dtype.names) + '\n')
+        fmt = ['%d' if records.dtype[name].kind == 'i' else '%.6f' for name in records.dtype.names]
+        np.savetxt(f, records, fmt=fmt, delimiter=',')
+
+def write_csv(batches, output_file):
+    """Write every batch to one CSV file; returns the number of rows written."""
+    if os.path.exists(output_file):
+        os.remove(output_file)
+    rows = 0
+    for batch in batches:
+        append_csv(output_file, batch)
+        rows += len(batch)
+    return rows
+
+def summarize(batches, stats=None):
+    """Running count, mean, min and max of every float column, in constant memory."""
+    stats = {} if stats is None else stats
+    for batch in batches:
+        for name in batch.dtype.names:
+            if batch.dtype[name].kind != 'f' or len(batch) == 0:
+                continue
+            values = batch[name]
+            s = stats.setdefault(name, {'count': 0, 'sum': 0.0, 'min': np.inf, 'max': -np.inf})
+            s['count'] += len(values)
+            s['sum'] += values.sum()
+            s['min'] = min(s['min'], values.min())
+            s['max'] = max(s['max'], values.max())
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    from concurrent.futures import ProcessPoolExecutor
+    from contextlib import nullcontext
+    from batch_ingest import source_class_names, wheel_classes
+
+    parser = argparse.ArgumentParser(description='Stream a label directory through fit/filter/feature stages in fixed-size batches.')
+    parser.add_argument('source', type=str, help='Directory (or zip/tar archive) containing YOLOv8 .txt files')
+    parser.add_argument('--stages', type=str, default='fit,filter,features',
+                       help='Comma-separated stages to run, in order (default: fit,filter,features)')
+    parser.add_argument('--batch-files', type=int, default=256, help='Label files per batch')
+    parser.add_argument('--cutoff', type=float, default=2.0, help='Lowpass filter cutoff frequency')
+    parser.add_argument('--fs', type=float, default=30.0, help='Sampling frequency')
+    parser.add_argument('--width', type=float, default=1.0, help='Image width for coordinate scaling')
+    parser.add_argument('--height', type=float, default=1.0, help='Image height for coordinate scaling')
+    parser.add_argument('--fit-method', type=str, default='moments', choices=FIT_METHODS, help=FIT_METHOD_HELP)
+    parser.add_argument('--fit-workers', type=int, default=None,
+                       help='Processes for the ransac fit (default: all cores, 1 fits inline)')
+    parser.add_argument('--output', type=str, default=None, help='Write the last stage to this CSV instead of summarizing it')
+
+    args = parser.parse_args()
+
+    use_pool = args.fit_method == 'ransac' and args.fit_workers != 1
+    with (ProcessPoolExecutor(args.fit_workers) if use_pool else nullcontext()) as executor:
+        stream = build_pipeline(args.source, args.stages.split(','), args.batch_files,
+                                args.cutoff, args.fs, args.width, args.height, args.fit_method, executor,
+                                wheel_classes(source_class_names(args.source)))
+        if args.output:
+            rows = write_csv(stream, args.output)
+            print(f"{rows} rows saved to: {args.output}")
+        else:
+            print("\n=== Stream Summary ===")
+            for name, s in summarize(stream).items():
+                print(f"{name:<14} n={s['count']:<8} mean={s['sum'] / s['count']:.4f} "
+                      f"min={s['min']:.4f} max={s['max']:.4f}")
+            print("======================")
@@ -0,0 +1,30 @@
+import numpy as np
+from crash_detector import RollingStats
+
+
+def test_rolling_stats_match_brute_force():
+    rng = np.random.default_rng(0)
+    streams, features, window = 4, 3, 7
+    stats = RollingStats(streams, features, window)
+    history = [[] for _ in range(streams)]
+    for step in range(60):
+        # streams advance unevenly, as when a wheel is missing from some frames
+        pushed = np.flatnonzero(rng.random(streams) < 0.7)
+        if len(pushed) == 0:
+            continue
+        values = rng.normal(100.0, 5.0, (len(pushed), features))
+        stats.push(pushed, values)
+        for stream, value in zip(pushed, values):
+            history[stream].append(value)
+        variance = stats.variance()
+        for stream in range(streams):
+            recent = np.array(history[stream][-window:])
+            if len(recent) == 0:
+                continue
+            assert stats.count[stream] == len(recent)
+            np.testing.assert_allclose(stats.mean[stream], recent.mean(axis=0), rtol=1e-10)
+            np.testing.assert_array_equal(stats.max[stream], recent.max(axis=0))
+            if len(recent) > 1:
+                np.testing.assert_allclose(variance[stream], recent.var(axis=0, ddof=1), rtol=1e-8)
+            else:
+                assert np.isnan(variance[stream]).all()
@@ -0,0 +1,28 @@
+import json
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dataset_writer import write_stream
+
+
+def batches():
+    for clip_id, rows in (('a', 3), ('a', 2), ('b', 0), ('b', 4)):
+        yield clip_id, pa.RecordBatch.from_pydict({'frame': list(range(rows)), 'x': [0.5] * rows},
+                                                  schema=pa.schema([('frame', pa.int64()), ('x', pa.float64())]))
+
+def test_jsonl_has_one_record_per_line(tmp_path):
+    output = str(tmp_path / 'dataset')
+    assert write_stream(batches(), output, formats=('jsonl', 'csv', 'parquet')) == 9
+    with open(output + '.jsonl') as f:
+        text = f.read()
+    assert text.endswith('\n')
+    lines = text.split('\n')[:-1]
+    assert len(lines) == 9
+    records = [json.loads(line) for line in lines]
+    assert [r['clip_id'] for r in records] == ['a'] * 5 + ['b'] * 4
+
+def test_csv_and_parquet_row_counts(tmp_path):
+    output = str(tmp_path / 'dataset')
+    write_stream(batches(), output, formats=('csv', 'parquet'))
+    with open(output + '.csv') as f:
+        assert len(f.read().splitlines()) == 1 + 9
+    assert pq.read_table(output + '.parquet').num_rows == 9
@@ -0,0 +1,16 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from ellipse_fit import fit_ellipses, fit_ransac_parallel, synthetic_polygons
+
+
+def test_ransac_pool_matches_inline():
+    labels, _ = synthetic_polygons(300, occlusion=0.3)
+    inline = fit_ellipses(labels, 'ransac')
+    with ProcessPoolExecutor(2) as executor:
+        pooled = fit_ellipses(labels, 'ransac', executor)
+    spawned = fit_ransac_parallel(labels, workers=2)
+    assert inline.keys() == pooled.keys() == spawned.keys()
+    for key in inline:
+        assert len(inline[key]) == 300
+        np.testing.assert_array_equal(inline[key], pooled[key])
+        np.testing.assert_array_equal(inline[key], spawned[key])
@@ -0,0 +1,53 @@
+import os
+import threading
+import pytest
+import follow_labels
+from label_ingest import frame_numbers
+
+LINE = b'0 0.1 0.1 0.2 0.1 0.2 0.2 0.1 0.2\n'
+
+
+def write_label(directory, frame):
+    with open(os.path.join(directory, f'frame_{frame:06d}.txt'), 'wb') as f:
+        f.write(LINE)
+
+def followed_frames(directory, use_inotify):
+    frames = []
+    for files in follow_labels.watch_new_files(str(directory), poll_interval=0.3, idle_exit=1.0,
+                                               use_inotify=use_inotify):
+        frames.extend(frame_numbers(files).tolist())
+    return frames
+
+@pytest.mark.parametrize('use_inotify', [True, False])
+def test_new_files_wait_for_the_startup_backlog(tmp_path, use_inotify):
+    if use_inotify and follow_labels.INotify is None:
+        pytest.skip('inotify_simple not available')
+    for frame in range(10):
+        write_label(tmp_path, frame)
+    # Frames 10-13 are closed while 0-9 still wait for their size check
+    writer = threading.Timer(0.05, lambda: [write_label(tmp_path, frame) for frame in (12, 10, 13, 11)])
+    writer.start()
+    frames = followed_frames(tmp_path, use_inotify)
+    writer.join()
+    assert frames == list(range(14))
+
+def test_release_in_order_holds_files_behind_pending():
+    held = {'frame_000012.txt', 'frame_000003.txt'}
+    pending = {'frame_000005.txt': 10}
+    assert follow_labels.release_in_order(held, pending) == ['frame_000003.txt']
+    assert held == {'frame_000012.txt'}
+    pending.clear()
+    assert follow_labels.release_in_order(held, pending) == ['frame_000012.txt']
+    assert not held
+
+def test_half_written_file_is_not_released(tmp_path):
+    path = tmp_path / 'frame_000000.txt'
+    with open(path, 'wb') as f:
+        f.write(LINE[:10])
+        f.flush()
+        pending = {}
+        follow_labels.poll_new_files(str(tmp_path), set(), pending)
+        f.write(LINE[10:])
+        f.flush()
+        assert follow_labels.stable_files(str(tmp_path), pending) == []
+    assert follow_labels.stable_files(str(tmp_path), pending) == ['frame_000000.txt']
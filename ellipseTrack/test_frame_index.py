@@ -0,0 +1,23 @@
+import os
+import pytest
+from frame_index import find_clip
+
+
+@pytest.fixture
+def roots(tmp_path):
+    for root, clip, split in (('Data', '1-ytcrash-yolo', 'train'), ('Data-NoCrash', '1-yt-nocrash-yolo', 'train'),
+                              ('Data', '7-ytcrash-yolo', 'train')):
+        os.makedirs(tmp_path / root / clip / 'labels' / split)
+    return [str(tmp_path / 'Data'), str(tmp_path / 'Data-NoCrash')]
+
+def test_exact_clip_id(roots):
+    assert find_clip('1-yt-nocrash-yolo', roots).endswith(os.path.join('1-yt-nocrash-yolo', 'labels', 'train'))
+    assert find_clip('1-ytcrash-yolo', roots).endswith(os.path.join('1-ytcrash-yolo', 'labels', 'train'))
+
+def test_unique_prefix(roots):
+    assert find_clip('7', roots).endswith(os.path.join('7-ytcrash-yolo', 'labels', 'train'))
+    assert find_clip('4', roots) is None
+
+def test_ambiguous_prefix_lists_candidates(roots):
+    with pytest.raises(ValueError, match='1-ytcrash-yolo.*1-yt-nocrash-yolo'):
+        find_clip('1', roots)
@@ -0,0 +1,46 @@
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+from label_cache import process_directory
+from track_filter import apply_filters
+import visualize_filtered9
+from plot_decimation import plot_decimated
+
+CLIP = 'Data/5-ytcrash-yolo/labels/train'
+
+
+@pytest.fixture
+def clip_figure(monkeypatch):
+    monkeypatch.setattr(plt, 'show', lambda: None)
+    tracking_data = process_directory(CLIP)
+    filtered_data = apply_filters(tracking_data, 2.0, 30.0)
+    visualize_filtered9.plot_data(tracking_data, filtered_data)
+    figure = plt.gcf()
+    yield figure, filtered_data
+    plt.close(figure)
+
+def test_plot_decimated_autoscales():
+    fig, ax = plt.subplots()
+    x = np.arange(100000)
+    y = np.sin(x / 1000.0) * 5 + 10
+    plot_decimated(ax, x, y)
+    x0, x1 = ax.get_xlim()
+    y0, y1 = ax.get_ylim()
+    assert x0 <= 0 and x1 >= x[-1]
+    assert y0 <= y.min() and y1 >= y.max()
+    plt.close(fig)
+
+def test_visualize_filtered9_limits_cover_data(clip_figure):
+    figure, filtered_data = clip_figure
+    x_axis, y_axis = figure.axes[0], figure.axes[1]
+    frames = np.concatenate([np.asarray(track['frames']) for track in filtered_data.values()])
+    for ax, field in ((x_axis, 'x_pos'), (y_axis, 'y_pos')):
+        values = np.concatenate([np.asarray(track[field]) for track in filtered_data.values()])
+        x0, x1 = sorted(ax.get_xlim())
+        y0, y1 = sorted(ax.get_ylim())
+        assert x0 <= frames.min() and x1 >= frames.max()
+        assert y0 <= np.nanmin(values) and y1 >= np.nanmax(values)
+        # Not the empty-axes default
+        assert y1 - y0 < 10 * (np.nanmax(values) - np.nanmin(values))
@@ -0,0 +1,35 @@
+import numpy as np
+from batch_ingest import source_class_names, wheel_classes
+from stream_pipeline import ELLIPSE_DTYPE, feature_stage, build_pipeline
+
+
+def records(rows):
+    batch = np.zeros(len(rows), dtype=ELLIPSE_DTYPE)
+    for i, (frame, class_id, x, y, major) in enumerate(rows):
+        batch[i] = (frame, class_id, x, y, major, 1.0, 0.0)
+    return batch
+
+def test_feature_stage_follows_wheel_classes():
+    # class 1 is the front wheel, class 0 the rear
+    batch = records([(0, 1, 0.7, 0.4, 2.0), (0, 0, 0.2, 0.5, 3.0), (1, 0, 0.3, 0.5, 3.0)])
+    features, = feature_stage([batch], front=1, rear=0)
+    assert list(features['frame']) == [0]
+    np.testing.assert_allclose(features['x_difference'], [0.5])
+    np.testing.assert_allclose(features['y_difference'], [0.1])
+    np.testing.assert_allclose(features['front_ratio'], [2.0])
+    np.testing.assert_allclose(features['rear_ratio'], [3.0])
+
+def test_pipeline_reads_wheels_from_data_yaml(tmp_path):
+    clip = tmp_path / 'clip-yolo'
+    labels = clip / 'labels' / 'test'
+    labels.mkdir(parents=True)
+    (clip / 'data.yaml').write_text("names: ['Rear wheel', 'wheel']\n")
+    # rear wheel (class 0) on the left, front wheel (class 1) on the right
+    hexagon = np.column_stack([np.cos(np.arange(6) * np.pi / 3), np.sin(np.arange(6) * np.pi / 3)]) * 0.1
+    lines = [f"{class_id} {' '.join(f'{v:.6f}' for v in (hexagon + (x, 0.5)).ravel())}"
+             for class_id, x in ((0, 0.2), (1, 0.7))]
+    (labels / 'frame_000000.txt').write_text('\n'.join(lines) + '\n')
+    wheels = wheel_classes(source_class_names(str(labels)))
+    assert wheels == (1, 0)
+    features, = build_pipeline(str(labels), ['fit', 'features'], wheels=wheels)
+    np.testing.assert_allclose(features['x_difference'], [0.5])
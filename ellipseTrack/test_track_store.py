@@ -0,0 +1,11 @@
+import numpy as np
+from track_store import TRACK_FIELDS, Track
+
+
+def test_zero_capacity_grows():
+    track = Track(capacity=0)
+    track.append(3, 0.1, 0.2, 4.0, 2.0, 10.0)
+    track.extend(np.arange(4, 104), np.ones((len(TRACK_FIELDS), 100)))
+    assert len(track) == 101
+    assert list(track['frames'][:3]) == [3, 4, 5]
+    np.testing.assert_allclose(track['major_axes'][:2], [4.0, 1.0])
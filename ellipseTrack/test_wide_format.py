@@ -0,0 +1,33 @@
+import numpy as np
+from track_store import TRACK_FIELDS, TrackStore
+from wide_format import pivot_tracks, wide_columns
+
+
+def store_of(tracks):
+    store = TrackStore()
+    for track_id, (frames, x) in tracks.items():
+        values = np.zeros((len(TRACK_FIELDS), len(frames)))
+        values[0] = x
+        values[1] = np.asarray(x) + 0.5
+        store.extend(np.full(len(frames), track_id), np.asarray(frames), values)
+    return store
+
+def test_pivot_non_contiguous_ids():
+    store = store_of({5: ([0, 1, 3], [1.0, 2.0, 3.0]), 9: ([1, 2], [10.0, 20.0])})
+    pivot = pivot_tracks(store)
+    assert pivot['track_ids'] == [5, 9]
+    np.testing.assert_array_equal(pivot['frames'], [0, 1, 2, 3])
+    np.testing.assert_array_equal(pivot['values'][:, 0, 0], [1.0, 2.0, np.nan, 3.0])
+    np.testing.assert_array_equal(pivot['values'][:, 1, 0], [np.nan, 10.0, 20.0, np.nan])
+    np.testing.assert_array_equal(pivot['observed'], [[True, False], [True, True], [False, True], [True, False]])
+
+def test_pivot_reordered_and_partial_ids():
+    store = store_of({0: ([0, 1], [1.0, 2.0]), 1: ([0, 1], [10.0, 20.0]), 2: ([1], [100.0])})
+    pivot = pivot_tracks(store, track_ids=[2, 7, 0])
+    np.testing.assert_array_equal(pivot['values'][:, 0, 0], [np.nan, 100.0])
+    assert np.isnan(pivot['values'][:, 1]).all() and not pivot['observed'][:, 1].any()
+    np.testing.assert_array_equal(pivot['values'][:, 2, 0], [1.0, 2.0])
+    np.testing.assert_array_equal(pivot['values'][:, 2, 1], [1.5, 2.5])
+
+def test_wide_columns():
+    assert wide_columns(2) == ['Feature1_x', 'Feature1_y', 'Feature2_x', 'Feature2_y']
@@ -0,0 +1,21 @@
+import numpy as np
+from window_features import angle_rate, feature_names, window_statistics, pair_series, SERIES
+
+
+def test_angle_rate_across_the_wrap():
+    rates = angle_rate(np.array([88.0, 89.0, -89.0, -88.0]))
+    np.testing.assert_allclose(rates, [1.0, 1.5, 1.5, 1.0])
+
+def test_angle_rate_per_wheel_columns():
+    angles = np.column_stack(([-88.0, -89.0, 89.0, 88.0], [10.0, 12.0, 14.0, 16.0]))
+    np.testing.assert_allclose(angle_rate(angles), [[-1.0, 2.0], [-1.5, 2.0], [-1.5, 2.0], [-1.0, 2.0]])
+
+def test_window_statistics_shape():
+    rng = np.random.default_rng(0)
+    values = rng.random((100, 2, 5))
+    series = pair_series(values)
+    assert series.shape == (100, len(SERIES))
+    features, starts = window_statistics(series, 30, 5)
+    assert features.shape == (15, len(feature_names()))
+    np.testing.assert_array_equal(starts, np.arange(15) * 5)
+    np.testing.assert_allclose(features[0, 0], series[:30, 0].mean())
@@ -0,0 +1,79 @@
+from functools import lru_cache
+import numpy as np
+from scipy.signal import butter, sosfilt, sosfilt_zi, sosfiltfilt
+from track_grid import MAX_GAP, resample_tracks, contiguous_segments
+
+
+@lru_cache(maxsize=None)
+def design_lowpass(cutoff=2.0, fs=30.0, order=5):
+    """Butterworth lowpass as second-order sections, designed once per parameter set."""
+    return butter(order, cutoff / (0.5 * fs), btype='low', output='sos')
+
+class StreamingLowpass:
+    """
+    Causal Butterworth lowpass for one track. Feed it one frame (a row of
+    channels) or a chunk (rows = frames, columns = channels, e.g. x, y, major,
+    minor, angle); the filter state is carried between calls, so every frame
+    costs the same no matter how long the track is.
+    """
+    __slots__ = ('sos', 'zi')
+
+    def __init__(self, cutoff=2.0, fs=30.0, order=5):
+        self.sos = design_lowpass(cutoff, fs, order)
+        self.zi = None
+
+    def update(self, samples):
+        """Filter the next frame(s); returns an array shaped like samples."""
+        samples = np.asarray(samples, dtype=np.float64)
+        chunk = np.atleast_2d(samples)
+        if self.zi is None:
+            # Start in steady state at the first sample instead of ramping up from zero
+            self.zi = sosfilt_zi(self.sos)[:, :, None] * chunk[0]
+        out, self.zi = sosfilt(self.sos, chunk, axis=0, zi=self.zi)
+        return out.reshape(samples.shape)
+
+    def reset(self):
+        """Forget the state; the next sample starts a new steady state."""
+        self.zi = None
+
+def zero_phase_lowpass(signals, cutoff=2.0, fs=30.0, order=5):
+    """Forward-backward (filtfilt-style) lowpass of every column at once."""
+    sos = design_lowpass(cutoff, fs, order)
+    signals = np.asarray(signals, dtype=np.float64)
+    # Same default padding as filtfilt with (b, a), shortened for very short tracks
+    padlen = min(3 * (2 * len(sos) + 1 - min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum())),
+                 len(signals) - 1)
+    return sosfiltfilt(sos, signals, axis=0, padlen=max(padlen, 0))
+
+def filter_grid(grid, cutoff=2.0, fs=30.0, order=5):
+    """
+    Zero-phase lowpass of a resample_tracks grid, one contiguous valid
+    segment at a time so that filtering never runs across a long gap.
+    Segments that several tracks share are filtered in one call.
+    """
+    values, valid = grid['values'], grid['valid']
+    filtered = np.full_like(values, np.nan)
+    shared = {}
+    for t in range(valid.shape[1]):
+        for start, stop in zip(*contiguous_segments(valid[:, t])):
+            shared.setdefault((start, stop), []).append(t)
+    for (start, stop), tracks in shared.items():
+        block = values[start:stop, tracks].reshape(stop - start, -1)
+        filtered[start:stop, tracks] = zero_phase_lowpass(block, cutoff, fs, order).reshape(stop - start, len(tracks), -1)
+    return filtered
+
+def apply_filters(tracking_data, cutoff=2.0, fs=30.0, max_gap=MAX_GAP):
+    """
+    Apply lowpass filters to all tracking data. Tracks are put on the true
+    frame grid first: gaps up to max_gap frames are interpolated, longer
+    gaps split the track and each segment is filtered on its own.
+    The returned 'frames' include the interpolated frames.
+    """
+    grid = resample_tracks(tracking_data, max_gap)
+    filtered = filter_grid(grid, cutoff, fs)
+    filtered_data = {}
+    for t, class_id in enumerate(grid['class_ids']):
+        valid = grid['valid'][:, t]
+        filtered_data[class_id] = {field: filtered[valid, t, i] for i, field in enumerate(grid['fields'])}
+        filtered_data[class_id]['frames'] = grid['frames'][valid]
+    return filtered_data
@@ -0,0 +1,86 @@
+import numpy as np
+from track_store import TRACK_FIELDS
+
+MAX_GAP = 3  # Missing frames bridged by interpolation; longer gaps split a track into segments
+
+
+def frame_grid(tracking_data, class_ids=None):
+    """Every frame number from the first to the last frame seen in any of the tracks."""
+    class_ids = sorted(tracking_data) if class_ids is None else class_ids
+    frames = [tracking_data[c]['frames'] for c in class_ids if c in tracking_data and len(tracking_data[c]['frames'])]
+    if not frames:
+        return np.zeros(0, dtype=np.int64)
+    return np.arange(min(f.min() for f in frames), max(f.max() for f in frames) + 1, dtype=np.int64)
+
+def scatter_track(track, grid, fields=TRACK_FIELDS, dtype=np.float64):
+    """Place one track's samples on a sorted frame grid: (len(grid), len(fields)) with NaN where missing, plus the observed mask."""
+    values = np.full((len(grid), len(fields)), np.nan, dtype=dtype)
+    observed = np.zeros(len(grid), dtype=bool)
+    frames = np.asarray(track['frames'])
+    slots = np.searchsorted(grid, frames)
+    on_grid = slots < len(grid)
+    on_grid[on_grid] = grid[slots[on_grid]] == frames[on_grid]
+    slots = slots[on_grid]
+    for i, field in enumerate(fields):
+        values[slots, i] = np.asarray(track[field])[on_grid]
+    observed[slots] = True
+    return values, observed
+
+def fill_short_gaps(values, observed, max_gap=MAX_GAP):
+    """
+    Linearly interpolate runs of at most max_gap missing frames that have
+    observed frames on both sides. values is (frames, tracks, fields) and
+    observed (frames, tracks); returns (filled values, valid mask).
+    """
+    n = len(observed)
+    index = np.arange(n)[:, None]
+    previous = np.maximum.accumulate(np.where(observed, index, -1), axis=0)
+    following = np.minimum.accumulate(np.where(observed, index, n)[::-1], axis=0)[::-1]
+    fill = ~observed & (previous >= 0) & (following < n) & (following - previous - 1 <= max_gap)
+
+    filled = values.copy()
+    if fill.any():
+        p = np.clip(previous, 0, n - 1)[..., None]
+        f = np.clip(following, 0, n - 1)[..., None]
+        before = np.take_along_axis(values, np.broadcast_to(p, values.shape), axis=0)
+        after = np.take_along_axis(values, np.broadcast_to(f, values.shape), axis=0)
+        weight = ((index - previous) / np.maximum(following - previous, 1))[..., None]
+        interpolated = before + weight * (after - before)
+        filled[fill] = interpolated[fill]
+    return filled, observed | fill
+
+def contiguous_segments(valid):
+    """(starts, stops) of the runs of True in a 1-D mask."""
+    edges = np.diff(np.concatenate(([0], valid.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+def resample_tracks(tracking_data, max_gap=MAX_GAP, fields=TRACK_FIELDS, class_ids=None, grid=None,
+                    dtype=np.float64):
+    """
+    Put every track on the clip's true frame grid.
+
+    Returns a dict with 'frames' (grid), 'class_ids', 'values'
+    (frames, tracks, fields) with NaN outside the valid samples, 'observed'
+    (a label exists for that frame) and 'valid' (observed or an
+    interpolated short gap). Missing classes give all-NaN columns.
+    """
+    class_ids = sorted(tracking_data) if class_ids is None else list(class_ids)
+    grid = frame_grid(tracking_data, class_ids) if grid is None else np.asarray(grid)
+    values = np.full((len(grid), len(class_ids), len(fields)), np.nan, dtype=dtype)
+    observed = np.zeros((len(grid), len(class_ids)), dtype=bool)
+    for t, class_id in enumerate(class_ids):
+        if class_id in tracking_data:
+            values[:, t], observed[:, t] = scatter_track(tracking_data[class_id], grid, fields, dtype)
+    values, valid = fill_short_gaps(values, observed, max_gap)
+    return {
+        'frames': grid,
+        'class_ids': class_ids,
+        'fields': tuple(fields),
+        'values': values,
+        'observed': observed,
+        'valid': valid,
+    }
+
+def common_frames(tracks, first=0, second=1):
+    """Frames present in both tracks and the sample indices of each: (frames, i_first, i_second)."""
+    return np.intersect1d(tracks[first]['frames'], tracks[second]['frames'], return_indices=True)
@@ -0,0 +1,127 @@
+import numpy as np
+
+TRACK_FIELDS = ('x_pos', 'y_pos', 'major_axes', 'minor_axes', 'angles')
+INITIAL_CAPACITY = 64
+
+
+class Track:
+    """
+    Growable struct-of-arrays for one class: int32 frames plus one float32 row
+    per field in a single contiguous buffer. track['x_pos'] returns a view, so
+    the plotting and filtering code can index it like the old dict of lists.
+    """
+    __slots__ = ('_size', '_frames', '_values')
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        capacity = max(capacity, 1)  # _reserve grows by doubling
+        self._size = 0
+        self._frames = np.empty(capacity, dtype=np.int32)
+        self._values = np.empty((len(TRACK_FIELDS), capacity), dtype=np.float32)
+
+    def _reserve(self, needed):
+        capacity = len(self._frames)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        frames = np.empty(capacity, dtype=np.int32)
+        values = np.empty((len(TRACK_FIELDS), capacity), dtype=np.float32)
+        frames[:self._size] = self._frames[:self._size]
+        values[:, :self._size] = self._values[:, :self._size]
+        self._frames, self._values = frames, values
+
+    def append(self, frame, x_pos, y_pos, major_axis, minor_axis, angle):
+        """Add one sample."""
+        self._reserve(self._size + 1)
+        self._frames[self._size] = frame
+        self._values[:, self._size] = (x_pos, y_pos, major_axis, minor_axis, angle)
+        self._size += 1
+
+    def extend(self, frames, values):
+        """Add many samples; values is (len(TRACK_FIELDS), n) in TRACK_FIELDS order."""
+        n = len(frames)
+        self._reserve(self._size + n)
+        self._frames[self._size:self._size + n] = frames
+        self._values[:, self._size:self._size + n] = values
+        self._size += n
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, key):
+        if key == 'frames':
+            return self._frames[:self._size]
+        try:
+            return self._values[TRACK_FIELDS.index(key), :self._size]
+        except ValueError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        return key == 'frames' or key in TRACK_FIELDS
+
+    def keys(self):
+        return TRACK_FIELDS + ('frames',)
+
+    @property
+    def nbytes(self):
+        return self._frames.nbytes + self._values.nbytes
+
+
+class TrackStore:
+    """Tracks keyed by class_id, with the mapping interface of the old tracking_data dict."""
+    __slots__ = ('_tracks',)
+
+    def __init__(self):
+        self._tracks = {}
+
+    def track(self, class_id):
+        """Return the track of class_id, creating it if needed."""
+        class_id = int(class_id)
+        if class_id not in self._tracks:
+            self._tracks[class_id] = Track()
+        return self._tracks[class_id]
+
+    def append(self, class_id, frame, x_pos, y_pos, major_axis, minor_axis, angle):
+        """Add one ellipse."""
+        self.track(class_id).append(frame, x_pos, y_pos, major_axis, minor_axis, angle)
+
+    def extend(self, class_ids, frames, values):
+        """Add a batch of ellipses; values is (len(TRACK_FIELDS), n), one class split per call."""
+        class_ids = np.asarray(class_ids)
+        for class_id in np.unique(class_ids):
+            mask = class_ids == class_id
+            self.track(class_id).extend(frames[mask], values[:, mask])
+
+    @classmethod
+    def from_ellipses(cls, class_ids, frames, ellipses):
+        """Build a store from batched fits (label_ingest.fit_ellipses output)."""
+        store = cls()
+        values = np.stack([ellipses['center_x'], ellipses['center_y'], ellipses['major_axis'],
+                           ellipses['minor_axis'], ellipses['angle']])
+        store.extend(class_ids, frames, values)
+        return store
+
+    def __getitem__(self, class_id):
+        return self._tracks[class_id]
+
+    def __contains__(self, class_id):
+        return class_id in self._tracks
+
+    def __len__(self):
+        return len(self._tracks)
+
+    def __iter__(self):
+        return iter(sorted(self._tracks))
+
+    def keys(self):
+        return sorted(self._tracks)
+
+    def values(self):
+        return [self._tracks[k] for k in self.keys()]
+
+    def items(self):
+        return [(k, self._tracks[k]) for k in self.keys()]
+
+    @property
+    def nbytes(self):
+        return sum(track.nbytes for track in self._tracks.values())
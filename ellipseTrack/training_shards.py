@@ -0,0 +1,210 @@
+import os
+import json
+import shutil
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from label_cache import load_labels
+from track_grid import frame_grid, resample_tracks
+from track_store import TRACK_FIELDS, TrackStore
+
+SHARD_VERSION = 1
+SHARD_COLUMNS = ('features', 'observed', 'frame_poly', 'class_id', 'offsets', 'points')
+
+
+def clip_arrays(labels, ellipses, class_ids=(0, 1)):
+    """
+    Dense per-frame arrays of one clip, from its first to its last labelled frame:
+    features (frames, tracks, TRACK_FIELDS) float32 with NaN where a wheel is
+    missing, observed (frames, tracks), frame_poly (frames + 1) polygon ranges,
+    and the polygons as class_id, offsets and float16 points.
+    """
+    poly_frames = labels['file_frame'][labels['file_idx']]
+    tracking_data = TrackStore.from_ellipses(labels['class_id'], poly_frames, ellipses)
+    grid = frame_grid(tracking_data) if len(poly_frames) else np.zeros(0, dtype=np.int64)
+    tracks = resample_tracks(tracking_data, max_gap=0, class_ids=class_ids, grid=grid, dtype=np.float32)
+
+    order = np.argsort(poly_frames, kind='stable')
+    counts = np.diff(labels['offsets'])[order]
+    offsets = np.zeros(len(order) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    point_idx = np.repeat(np.asarray(labels['offsets'][:-1])[order] - offsets[:-1], counts) + np.arange(offsets[-1])
+    frame_poly = np.searchsorted(poly_frames[order], np.append(grid, grid[-1] + 1 if len(grid) else 0))
+    return {
+        'first_frame': int(grid[0]) if len(grid) else 0,
+        'features': tracks['values'],
+        'observed': tracks['observed'],
+        'frame_poly': frame_poly.astype(np.int64),
+        'class_id': np.asarray(labels['class_id'])[order].astype(np.int16),
+        'offsets': offsets,
+        'points': np.asarray(labels['points'])[point_idx].astype(np.float16),
+    }
+
+def concat_clips(parts):
+    """Join the arrays of consecutive clips into one shard, rebasing the polygon and point indices."""
+    poly_shift = np.cumsum([0] + [len(p['class_id']) for p in parts])
+    point_shift = np.cumsum([0] + [len(p['points']) for p in parts])
+    return {
+        'features': np.concatenate([p['features'] for p in parts]),
+        'observed': np.concatenate([p['observed'] for p in parts]),
+        'frame_poly': np.concatenate([p['frame_poly'][:-1] + s for p, s in zip(parts, poly_shift)]
+                                     + [[poly_shift[-1]]]),
+        'class_id': np.concatenate([p['class_id'] for p in parts]),
+        'offsets': np.concatenate([p['offsets'][:-1] + s for p, s in zip(parts, point_shift)]
+                                  + [[point_shift[-1]]]),
+        'points': np.concatenate([p['points'] for p in parts]),
+    }
+
+def export_shards(clips, output_dir, shard_frames=4096, class_ids=(0, 1)):
+    """
+    Pack every clip into shards of about shard_frames frames (clips are never
+    split, so a longer clip gets a shard of its own) plus manifest.json.
+    Returns the manifest.
+    """
+    if os.path.isdir(output_dir):
+        shutil.rmtree(output_dir)
+    os.makedirs(output_dir)
+    manifest = {
+        'version': SHARD_VERSION,
+        'shard_frames': shard_frames,
+        'class_ids': list(class_ids),
+        'fields': list(TRACK_FIELDS),
+        'shards': [],
+        'clips': {},
+    }
+
+    def flush(parts, entries):
+        shard = concat_clips(parts)
+        name = f'shard-{len(manifest["shards"]):05d}'
+        os.makedirs(os.path.join(output_dir, name))
+        for column in SHARD_COLUMNS:
+            np.save(os.path.join(output_dir, name, column + '.npy'), shard[column])
+        manifest['shards'].append({'name': name, 'frames': len(shard['features']),
+                                   'polygons': len(shard['class_id']), 'points': len(shard['points'])})
+        for key, entry in entries:
+            manifest['clips'][key] = dict(entry, shard=len(manifest['shards']) - 1)
+
+    parts, entries, rows = [], [], 0
+    for clip in clips:
+        arrays = clip_arrays(*load_labels(clip['source']), class_ids)
+        n = len(arrays['features'])
+        if parts and rows + n > shard_frames:
+            flush(parts, entries)
+            parts, entries, rows = [], [], 0
+        key = clip_key(clip['clip_id'], clip['split'])
+        entries.append((key, {'row': rows, 'frames': n, 'first_frame': arrays['first_frame'],
+                              'category': clip['category']}))
+        parts.append(arrays)
+        rows += n
+    if parts:
+        flush(parts, entries)
+
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+def clip_key(clip_id, split):
+    return f'{clip_id}/{split}'
+
+class ShardedDataset:
+    """
+    Read side of export_shards. Shards are memory-mapped on first use, so
+    constructing (or unpickling, in a dataloader worker) only reads the manifest.
+    Every accessor returns views into the memory maps.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        with open(os.path.join(root, 'manifest.json'), 'r') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('version') != SHARD_VERSION:
+            raise ValueError(f"{root}: unsupported shard version {self.manifest.get('version')}")
+        self.clips = self.manifest['clips']
+        self._shards = {}
+
+    def __getstate__(self):
+        # Workers re-open the memory maps themselves
+        return {'root': self.root, 'manifest': self.manifest, 'clips': self.clips, '_shards': {}}
+
+    def shard(self, index):
+        if index not in self._shards:
+            directory = os.path.join(self.root, self.manifest['shards'][index]['name'])
+            self._shards[index] = {column: np.load(os.path.join(directory, column + '.npy'), mmap_mode='r')
+                                   for column in SHARD_COLUMNS}
+        return self._shards[index]
+
+    def rows(self, clip):
+        """(shard arrays, first row, number of frames) of a clip key 'clip_id/split'."""
+        entry = self.clips[clip]
+        return self.shard(entry['shard']), entry['row'], entry['frames']
+
+    def clip_features(self, clip):
+        """(frames, tracks, fields) features and the observed mask of a whole clip."""
+        shard, row, n = self.rows(clip)
+        return shard['features'][row:row + n], shard['observed'][row:row + n]
+
+    def frame(self, clip, frame):
+        """
+        Features, observed mask and polygons (class_ids, list of float16
+        point arrays) of one true frame number, in O(1).
+        """
+        entry = self.clips[clip]
+        offset = frame - entry['first_frame']
+        if not 0 <= offset < entry['frames']:
+            raise KeyError(f"{clip} has no frame {frame}")
+        shard = self.shard(entry['shard'])
+        row = entry['row'] + offset
+        p0, p1 = shard['frame_poly'][row], shard['frame_poly'][row + 1]
+        offsets = shard['offsets'][p0:p1 + 1]
+        polygons = [shard['points'][start:stop] for start, stop in zip(offsets[:-1], offsets[1:])]
+        return shard['features'][row], shard['observed'][row], shard['class_id'][p0:p1], polygons
+
+    def windows(self, clip, length, step=1):
+        """Zero-copy sliding windows (windows, length, tracks, fields) over a clip's features."""
+        features, _ = self.clip_features(clip)
+        if len(features) < length:
+            return features[:0, None].repeat(length, axis=1)
+        return np.moveaxis(sliding_window_view(features, length, axis=0), -1, 1)[::step]
+
+    def window_index(self, length, step=1):
+        """(clip key, start frame) of every window of every clip, for samplers."""
+        return [(clip, entry['first_frame'] + start)
+                for clip, entry in self.clips.items()
+                for start in range(0, entry['frames'] - length + 1, step)]
+
+
+if __name__ == "__main__":
+    import argparse
+    import pickle
+    import time
+    from batch_ingest import DATA_ROOTS, discover_clips
+
+    parser = argparse.ArgumentParser(description='Export every clip to memory-mapped training shards.')
+    parser.add_argument('roots', type=str, nargs='*', default=DATA_ROOTS,
+                       help='Directories containing *-yolo clip exports (default: Data Data-NoCrash)')
+    parser.add_argument('--output', type=str, default='training_shards', help='Output directory')
+    parser.add_argument('--shard-frames', type=int, default=4096, help='Frames per shard')
+    parser.add_argument('--window', type=int, default=30, help='Window length for the loader check')
+
+    args = parser.parse_args()
+
+    clips = discover_clips(args.roots)
+    start = time.perf_counter()
+    manifest = export_shards(clips, args.output, args.shard_frames)
+    elapsed = time.perf_counter() - start
+    print(f"{len(manifest['clips'])} clips -> {len(manifest['shards'])} shards in {elapsed:.2f} s")
+
+    # Loader check: start-up cost, random frame access and windows
+    start = time.perf_counter()
+    dataset = pickle.loads(pickle.dumps(ShardedDataset(args.output)))
+    opened = time.perf_counter() - start
+    index = dataset.window_index(args.window)
+    rng = np.random.default_rng(0)
+    picks = rng.integers(len(index), size=min(10000, len(index) * 10)) if index else []
+    start = time.perf_counter()
+    for i in picks:
+        clip, frame = index[i]
+        dataset.frame(clip, frame)
+    access = (time.perf_counter() - start) / max(len(picks), 1)
+    windows = sum(len(dataset.windows(clip, args.window)) for clip in dataset.clips)
+    print(f"Loader opened in {opened * 1000:.2f} ms, {access * 1e6:.1f} us per random frame, "
+          f"{windows} windows of {args.window} frames")
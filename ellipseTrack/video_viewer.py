@@ -0,0 +1,302 @@
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+from ellipse_fit import fit_ellipses
+from frame_index import frame_bounds
+from label_cache import load_labels
+
+WHEEL_COLORS = ('turquoise', 'red', 'yellow', 'magenta')
+
+
+class FrameCache:
+    """
+    Decoded video frames (RGBA, which Matplotlib draws without a conversion)
+    in an LRU cache of `capacity` frames.
+
+    One decoder thread owns the cv2.VideoCapture. get() asks for a frame and
+    waits only if it is not cached; meanwhile the thread keeps decoding the
+    next `read_ahead` frames after the last request, sequentially, so
+    playback and forward scrubbing hit the cache. Frames are optionally
+    downscaled by `scale` once, at decode time.
+    """
+
+    def __init__(self, path, capacity=256, read_ahead=32, scale=1.0):
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise OSError(f"Cannot open video {path}")
+        self.count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self.width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.capacity = max(capacity, read_ahead + 1)
+        self.read_ahead = read_ahead
+        self.scale = scale
+        self.frames = OrderedDict()
+        self.condition = threading.Condition()
+        self.wanted = 0
+        self.position = 0  # next frame the capture returns without seeking
+        self.hits = self.misses = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self._decode_loop, daemon=True)
+        self.thread.start()
+
+    def get(self, index):
+        """RGBA frame `index` (clamped to the video), decoding it first if needed."""
+        index = min(max(int(index), 0), self.count - 1)
+        with self.condition:
+            self.wanted = index
+            if index in self.frames:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self.condition.notify_all()
+                while index not in self.frames:
+                    self.condition.wait()
+            self.frames.move_to_end(index)
+            return self.frames[index]
+
+    def _next_target(self):
+        stop = min(self.wanted + self.read_ahead + 1, self.count)
+        for index in range(self.wanted, stop):
+            if index not in self.frames:
+                return index
+        return None
+
+    def _decode_loop(self):
+        while True:
+            with self.condition:
+                target = self._next_target()
+                while target is None and not self.closed:
+                    self.condition.wait()
+                    target = self._next_target()
+                if self.closed:
+                    return
+            if target != self.position:
+                self.capture.set(cv2.CAP_PROP_POS_FRAMES, target)
+            ok, frame = self.capture.read()
+            if ok:
+                if self.scale != 1.0:
+                    frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA)
+            else:
+                # Unreadable frame (e.g. a wrong frame count): show black rather than block
+                frame = np.zeros((round(self.height * self.scale), round(self.width * self.scale), 4), np.uint8)
+            with self.condition:
+                self.position = target + 1
+                self.frames[target] = frame
+                while len(self.frames) > self.capacity:
+                    self.frames.popitem(last=False)
+                self.condition.notify_all()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+        self.capture.release()
+
+def load_overlay(labels_dir, width, height, fit_method='direct'):
+    """
+    Labels of a clip in video pixels with their ellipse fits (true axes by
+    default, so the overlay matches the wheels): (labels, ellipses).
+    """
+    labels, _ = load_labels(labels_dir)
+    labels = dict(labels, points=np.asarray(labels['points']) * (width, height))
+    return labels, fit_ellipses(labels, fit_method)
+
+def frame_polygons(labels, frame):
+    """Polygon index range [p0, p1) of one true frame number."""
+    i0, i1 = frame_bounds(labels['file_frame'], frame, frame)
+    return int(labels['file_poly_start'][i0]), int(labels['file_poly_start'][i1])
+
+class VideoViewer:
+    """
+    Scrub a video with its fitted wheel ellipses and filtered signals.
+
+    The image, the ellipse patches, the cursor and the frame counter are
+    animated artists created once and updated in place; every frame change
+    restores the cached static background and blits only those artists.
+    Drag on the signal panel or use the arrow keys to scrub; space plays.
+    """
+
+    def __init__(self, frames, labels=None, ellipses=None, filtered_data=None, frame_offset=0):
+        import matplotlib.pyplot as plt
+        from matplotlib.patches import Ellipse
+        from plot_decimation import plot_decimated
+
+        self.frames = frames
+        self.labels = labels
+        self.ellipses = ellipses
+        self.frame_offset = frame_offset
+        self.index = 0
+        self.playing = False
+
+        self.figure, (self.video_axis, self.signal_axis) = plt.subplots(
+            2, 1, figsize=(12, 9), gridspec_kw={'height_ratios': [3, 1]})
+        self.canvas = self.figure.canvas
+        # No interpolation: resampling the frame dominates the blit time otherwise
+        self.image = self.video_axis.imshow(frames.get(0), extent=(0, frames.width, frames.height, 0),
+                                            interpolation='none', animated=True)
+        self.video_axis.set_axis_off()
+        self.counter = self.video_axis.text(0.01, 0.98, '', transform=self.video_axis.transAxes, color='white',
+                                            va='top', animated=True)
+
+        most = 0
+        if labels is not None and len(labels['file_frame']):
+            most = int(np.diff(labels['file_poly_start']).max())
+        self.patches = []
+        for _ in range(most):
+            patch = Ellipse((0, 0), 0, 0, fill=False, linewidth=2, animated=True, visible=False)
+            self.video_axis.add_patch(patch)
+            self.patches.append(patch)
+
+        if filtered_data:
+            signals = np.concatenate([np.ravel(data[field]) for data in filtered_data.values()
+                                      for field in ('x_pos', 'y_pos')]).astype(float)
+            signals = signals[np.isfinite(signals)]
+            if len(signals):
+                low, high = signals.min(), signals.max()
+                margin = 0.05 * (high - low) or 0.05 * max(abs(high), 1.0)
+                self.signal_axis.set_ylim(low - margin, high + margin)
+            for class_id, data in filtered_data.items():
+                color = WHEEL_COLORS[class_id % len(WHEEL_COLORS)]
+                plot_decimated(self.signal_axis, np.asarray(data['frames']) - frame_offset, data['x_pos'], '-',
+                               color=color, label=f'Wheel {class_id} x')
+                plot_decimated(self.signal_axis, np.asarray(data['frames']) - frame_offset, data['y_pos'], '--',
+                               color=color, label=f'Wheel {class_id} y')
+            self.signal_axis.legend(loc='upper right')
+        self.signal_axis.set_xlim(0, frames.count - 1)
+        self.signal_axis.set_xlabel('Video frame')
+        self.signal_axis.set_ylabel('Filtered position')
+        self.signal_axis.grid(True)
+        self.cursor = self.signal_axis.axvline(0, color='black', animated=True)
+
+        self.background = None
+        self.timer = self.canvas.new_timer(interval=1000 / frames.fps)
+        self.timer.add_callback(self.step)
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+        self.canvas.mpl_connect('key_press_event', self.on_key)
+        self.canvas.mpl_connect('button_press_event', self.on_mouse)
+        self.canvas.mpl_connect('motion_notify_event', self.on_mouse)
+
+    @property
+    def animated(self):
+        return [self.image, *self.patches, self.cursor, self.counter]
+
+    def on_draw(self, _):
+        # Full redraws skip animated artists: keep the result as the blit background
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.draw_animated()
+
+    def draw_animated(self):
+        for artist in self.animated:
+            artist.axes.draw_artist(artist)
+
+    def update_artists(self, index):
+        self.index = min(max(int(index), 0), self.frames.count - 1)
+        self.image.set_data(self.frames.get(self.index))
+        self.cursor.set_xdata([self.index, self.index])
+        self.counter.set_text(f'frame {self.index}/{self.frames.count - 1}')
+        p0 = p1 = 0
+        if self.labels is not None:
+            p0, p1 = frame_polygons(self.labels, self.index + self.frame_offset)
+        for i, patch in enumerate(self.patches):
+            poly = p0 + i
+            patch.set_visible(poly < p1)
+            if poly < p1:
+                e = self.ellipses
+                patch.set_center((e['center_x'][poly], e['center_y'][poly]))
+                patch.set_width(e['major_axis'][poly])
+                patch.set_height(e['minor_axis'][poly])
+                patch.set_angle(e['angle'][poly])
+                class_id = int(self.labels['class_id'][poly])
+                patch.set_edgecolor(WHEEL_COLORS[class_id % len(WHEEL_COLORS)])
+
+    def show(self, index):
+        """Move to a frame, blitting only the animated artists."""
+        self.update_artists(index)
+        if self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_animated()
+        self.canvas.blit(self.figure.bbox)
+
+    def step(self):
+        if self.index >= self.frames.count - 1:
+            self.toggle_play()
+        else:
+            self.show(self.index + 1)
+
+    def toggle_play(self):
+        self.playing = not self.playing
+        if self.playing:
+            self.timer.start()
+        else:
+            self.timer.stop()
+
+    def on_key(self, event):
+        moves = {'right': 1, 'left': -1, 'up': 10, 'down': -10, 'pageup': 100, 'pagedown': -100}
+        if event.key in moves:
+            self.show(self.index + moves[event.key])
+        elif event.key == ' ':
+            self.toggle_play()
+        elif event.key == 'home':
+            self.show(0)
+        elif event.key == 'end':
+            self.show(self.frames.count - 1)
+
+    def on_mouse(self, event):
+        if event.inaxes is self.signal_axis and event.button == 1 and event.xdata is not None:
+            self.show(round(event.xdata))
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Scrub a video with the fitted wheel ellipses overlaid.')
+    parser.add_argument('video', type=str, help='Video file, e.g. 005-ytcrash.mp4 or ../dygert.mp4')
+    parser.add_argument('--labels', type=str, default=None,
+                       help='Directory of YOLOv8 .txt files for this video, e.g. Data/5-ytcrash-yolo/labels/train')
+    parser.add_argument('--frame-offset', type=int, default=0, help='Label frame number of video frame 0')
+    parser.add_argument('--cutoff', type=float, default=2.0, help='Lowpass filter cutoff frequency')
+    parser.add_argument('--fs', type=float, default=30.0, help='Sampling frequency')
+    parser.add_argument('--cache', type=int, default=256, help='Decoded frames kept in memory')
+    parser.add_argument('--read-ahead', type=int, default=32, help='Frames decoded ahead of the current one')
+    parser.add_argument('--scale', type=float, default=0.5, help='Downscale decoded frames for display')
+    parser.add_argument('--benchmark', action='store_true',
+                       help='Scrub every frame headlessly and report the update rate instead of opening a window')
+
+    args = parser.parse_args()
+    if args.benchmark:
+        import matplotlib
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    frames = FrameCache(args.video, args.cache, args.read_ahead, args.scale)
+    labels = ellipses = filtered_data = None
+    if args.labels:
+        from label_cache import process_directory
+        from track_filter import apply_filters
+        labels, ellipses = load_overlay(args.labels, frames.width, frames.height)
+        filtered_data = apply_filters(process_directory(args.labels), args.cutoff, args.fs)
+
+    viewer = VideoViewer(frames, labels, ellipses, filtered_data, args.frame_offset)
+    if args.benchmark:
+        viewer.canvas.draw()
+        start = time.perf_counter()
+        for index in range(frames.count):
+            viewer.show(index)
+        forward = time.perf_counter() - start
+        order = np.random.default_rng(0).integers(frames.count, size=frames.count)
+        start = time.perf_counter()
+        for index in order:
+            viewer.show(index)
+        random = time.perf_counter() - start
+        print(f"{frames.count} frames ({frames.fps:.1f} fps video): sequential scrub {frames.count / forward:.0f} fps, "
+              f"random jumps {frames.count / random:.0f} fps, cache hits {frames.hits}, misses {frames.misses}")
+    else:
+        plt.show()
+    frames.close()
@@ -1,127 +1,44 @@
-import os
 import numpy as np
 import matplotlib.pyplot as plt
-import math
-import re
-from collections import defaultdict
-from scipy.signal import butter, filtfilt, savgol_filter
 import argparse
+from label_cache import process_directory
+from track_filter import apply_filters
+from track_kalman import smooth_tracks
 
-def butter_lowpass(cutoff, fs, order=5):
-    """Design a Butterworth lowpass filter."""
-    nyq = 0.5 * fs
-    normal_cutoff = cutoff / nyq
-    b, a = butter(order, normal_cutoff, btype='low', analog=False)
-    return b, a
-
-def lowpass_filter(data, cutoff=2.0, fs=30.0, order=5):
-    """Apply lowpass filter to data."""
-    b, a = butter_lowpass(cutoff, fs, order=order)
-    y = filtfilt(b, a, data)
-    return y
-
-def natural_sort_key(s):
-    """Natural sorting for filenames."""
-    return [int(text) if text.isdigit() else text.lower() for text in re.split('([0-9]+)', s)]
-
-def parse_yolov8_segmentation(file_path):
-    """Parse YOLOv8 segmentation data."""
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
-    
-    ellipses = []
-    for line in lines:
-        parts = list(map(float, line.strip().split()))
-        if len(parts) < 11:  # Need at least 5 points
-            continue
-            
-        class_id = int(parts[0])
-        points = np.array(parts[1:]).reshape(-1, 2)
-        center = np.mean(points, axis=0)
-        centered_points = points - center
-        cov = np.cov(centered_points.T)
-        eigenvalues, eigenvectors = np.linalg.eig(cov)
-        major_axis = 2 * math.sqrt(max(eigenvalues))
-        minor_axis = 2 * math.sqrt(min(eigenvalues))
-        angle = math.degrees(math.atan2(eigenvectors[1, 0], eigenvectors[0, 0]))
-        
-        ellipses.append({
-            'class_id': class_id,
-            'center': center,
-            'major_axis': major_axis,
-            'minor_axis': minor_axis,
-            'angle': angle
-        })
-    
-    return ellipses
-
-def process_directory(directory_path):
-    """Process all .txt files in directory."""
-    files = [f for f in os.listdir(directory_path) if f.endswith('.txt')]
-    files.sort(key=natural_sort_key)
-    
-    tracking_data = defaultdict(lambda: {
-        'x_pos': [], 'y_pos': [], 'major_axes': [], 'minor_axes': [], 'angles': [], 'frames': []
-    })
-    
-    for frame_idx, filename in enumerate(files):
-        file_path = os.path.join(directory_path, filename)
-        for ellipse in parse_yolov8_segmentation(file_path):
-            class_id = ellipse['class_id']
-            tracking_data[class_id]['x_pos'].append(ellipse['center'][0])
-            tracking_data[class_id]['y_pos'].append(ellipse['center'][1])
-            tracking_data[class_id]['major_axes'].append(ellipse['major_axis'])
-            tracking_data[class_id]['minor_axes'].append(ellipse['minor_axis'])
-            tracking_data[class_id]['angles'].append(ellipse['angle'])
-            tracking_data[class_id]['frames'].append(frame_idx)
-    
-    return tracking_data
-
-def apply_filters(tracking_data, cutoff=2.0, fs=30.0):
-    """Apply lowpass filters to all tracking data."""
-    filtered_data = {}
-    for class_id, data in tracking_data.items():
-        filtered = {
-            'x_pos': lowpass_filter(data['x_pos'], cutoff, fs),
-            'y_pos': lowpass_filter(data['y_pos'], cutoff, fs),
-            'major_axes': lowpass_filter(data['major_axes'], cutoff, fs),
-            'minor_axes': lowpass_filter(data['minor_axes'], cutoff, fs),
-            'angles': lowpass_filter(data['angles'], cutoff, fs),
-            'frames': data['frames']
-        }
-        filtered_data[class_id] = filtered
-    return filtered_data
-
-def calculate_differences_and_slopes(filtered_data, absolute=True, window_size=5):
-    """Calculate differences and their slopes between both ellipses."""
-    if len(filtered_data) < 2:
+def calculate_differences_and_slopes(tracking_data, absolute=True, cutoff=2.0, fs=30.0):
+    """
+    Calculate differences and their slopes between both ellipses from one
+    Kalman/RTS smoothing of the raw tracks: differences of the smoothed
+    positions, slopes from the velocity states (per frame).
+    """
+    if 0 not in tracking_data or 1 not in tracking_data:
         return None
     
-    # Get common frame range
-    min_frames = min(len(filtered_data[0]['x_pos']), len(filtered_data[1]['x_pos']))
-    frames = np.arange(min_frames)
+    smoothed = smooth_tracks(tracking_data, cutoff, fs)
+    front, rear = smoothed['class_ids'].index(0), smoothed['class_ids'].index(1)
+    x, y = smoothed['fields'].index('x_pos'), smoothed['fields'].index('y_pos')
+    
+    # Compare the wheels on the frames where both were seen
+    both = smoothed['observed'][:, front] & smoothed['observed'][:, rear]
+    frames = smoothed['frames'][both]
+    position, velocity = smoothed['position'][both], smoothed['velocity'][both]
     
     # Calculate differences (Y values are already inverted)
-    x_diff = np.array(filtered_data[0]['x_pos'][:min_frames]) - np.array(filtered_data[1]['x_pos'][:min_frames])
-    y_diff = np.array(filtered_data[1]['y_pos'][:min_frames]) - np.array(filtered_data[0]['y_pos'][:min_frames])  # Inverted subtraction
+    x_diff = position[:, front, x] - position[:, rear, x]
+    x_velocity = velocity[:, front, x] - velocity[:, rear, x]
+    y_diff = position[:, rear, y] - position[:, front, y]  # Inverted subtraction
+    y_velocity = velocity[:, rear, y] - velocity[:, front, y]
     
     if absolute:
+        # Slope of |d| is sign(d) * d'
+        x_velocity = np.sign(x_diff) * x_velocity
+        y_velocity = np.sign(y_diff) * y_velocity
         x_diff = np.abs(x_diff)
         y_diff = np.abs(y_diff)
     
-    # Calculate slopes in radians
-    if len(x_diff) > window_size:
-        dx = np.diff(x_diff)
-        dy = np.diff(y_diff)
-        x_slope_rad = np.arctan2(dx, 1)
-        y_slope_rad = np.arctan2(dy, 1)
-        x_slope_rad = np.concatenate(([0], x_slope_rad))
-        y_slope_rad = np.concatenate(([0], y_slope_rad))
-        x_slope_rad = savgol_filter(x_slope_rad, window_size, 2)
-        y_slope_rad = savgol_filter(y_slope_rad, window_size, 2)
-    else:
-        x_slope_rad = np.zeros_like(x_diff)
-        y_slope_rad = np.zeros_like(y_diff)
+    # Calculate slopes in radians from the velocity (per frame)
+    x_slope_rad = np.arctan(x_velocity)
+    y_slope_rad = np.arctan(y_velocity)
     
     # Calculate statistics
     max_x_diff = np.max(x_diff)
@@ -165,7 +82,7 @@ def calculate_differences_and_slopes(filtered_data, absolute=True, window_size=5
         'max_y_slope': max_y_slope
     }
 
-def plot_data(tracking_data, filtered_data, show_raw=False, absolute_diff=True):
+def plot_data(tracking_data, filtered_data, show_raw=False, absolute_diff=True, cutoff=2.0, fs=30.0):
     """Plot data with specified options."""
     plt.figure(figsize=(18, 15))
     
@@ -176,7 +93,7 @@ def plot_data(tracking_data, filtered_data, show_raw=False, absolute_diff=True):
     raw_alpha = 0.3 if show_raw else 0
     
     # Calculate differences and slopes
-    diff_metrics = calculate_differences_and_slopes(filtered_data, absolute_diff)
+    diff_metrics = calculate_differences_and_slopes(tracking_data, absolute_diff, cutoff, fs)
     
     # Plot X Position
     ax1 = plt.subplot(3, 2, 1)
@@ -186,7 +103,7 @@ def plot_data(tracking_data, filtered_data, show_raw=False, absolute_diff=True):
                     alpha=raw_alpha, label=f'Raw Ellipse {class_id} X')
         ax1.plot(filtered_data[class_id]['frames'], filtered_data[class_id]['x_pos'], '-', 
                 color=ellipse_colors[class_id], linewidth=2, label=f'Filtered Ellipse {class_id} X')
-    ax1.set_title('X Position')
+    ax1.set_title('X Position (Butterworth)')
     ax1.set_ylabel('X position (pixels)')
     ax1.legend()
     ax1.grid(True)
@@ -199,7 +116,7 @@ def plot_data(tracking_data, filtered_data, show_raw=False, absolute_diff=True):
                     alpha=raw_alpha, label=f'Raw Ellipse {class_id} Y')
         ax2.plot(filtered_data[class_id]['frames'], filtered_data[class_id]['y_pos'], '-', 
                 color=ellipse_colors[class_id], linewidth=2, label=f'Filtered Ellipse {class_id} Y')
-    ax2.set_title('Y Position')
+    ax2.set_title('Y Position (Butterworth)')
     ax2.set_ylabel('Y position (pixels)')
     ax2.invert_yaxis()  # Inverted Y-axis here
     ax2.grid(True)
@@ -212,7 +129,7 @@ def plot_data(tracking_data, filtered_data, show_raw=False, absolute_diff=True):
                     alpha=raw_alpha, label=f'Raw Ellipse {class_id}')
         ax3.plot(filtered_data[class_id]['frames'], filtered_data[class_id]['major_axes'], '-', 
                 color=ellipse_colors[class_id], linewidth=2, label=f'Filtered Ellipse {class_id}')
-    ax3.set_title('Major Axis')
+    ax3.set_title('Major Axis (Butterworth)')
     ax3.set_ylabel('Major axis (pixels)')
     ax3.grid(True)
     
@@ -224,7 +141,7 @@ def plot_data(tracking_data, filtered_data, show_raw=False, absolute_diff=True):
                     alpha=raw_alpha, label=f'Raw Ellipse {class_id}')
         ax4.plot(filtered_data[class_id]['frames'], filtered_data[class_id]['angles'], '-', 
                 color=ellipse_colors[class_id], linewidth=2, label=f'Filtered Ellipse {class_id}')
-    ax4.set_title('Angle')
+    ax4.set_title('Angle (Butterworth)')
     ax4.set_ylabel('Angle (degrees)')
     ax4.grid(True)
     
@@ -237,7 +154,7 @@ def plot_data(tracking_data, filtered_data, show_raw=False, absolute_diff=True):
                 color=diff_colors[1], label='Y Difference')
         
         diff_type = 'Absolute' if absolute_diff else 'Signed'
-        ax5.set_title(f'{diff_type} Differences Between Ellipses')
+        ax5.set_title(f'{diff_type} Differences Between Ellipses (Kalman/RTS)')
         ax5.set_ylabel(f'{diff_type} Difference (pixels)')
         ax5.legend()
         ax5.grid(True)
@@ -257,7 +174,7 @@ def plot_data(tracking_data, filtered_data, show_raw=False, absolute_diff=True):
         ax6.plot(diff_metrics['frames'], diff_metrics['y_slope_rad'], '-', 
                 color=slope_colors[1], label='Y Slope (rad)')
         
-        ax6.set_title('Slope of Differences (Radians)')
+        ax6.set_title('Slope of Differences (Radians) (Kalman/RTS)')
         ax6.set_xlabel('Frame number')
         ax6.set_ylabel('Slope (radians)')
         ax6.legend()
@@ -290,4 +207,5 @@ if __name__ == "__main__":
     
     tracking_data = process_directory(args.directory)
     filtered_data = apply_filters(tracking_data, args.cutoff, args.fs)
-    plot_data(tracking_data, filtered_data, show_raw=args.raw, absolute_diff=absolute_diff)
+    plot_data(tracking_data, filtered_data, show_raw=args.raw, absolute_diff=absolute_diff,
+              cutoff=args.cutoff, fs=args.fs)
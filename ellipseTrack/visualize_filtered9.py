@@ -1,115 +1,26 @@
-import os
 import numpy as np
 import matplotlib.pyplot as plt
-import math
-import re
-from collections import defaultdict
-from scipy.signal import butter, filtfilt
 import argparse
+from label_cache import process_directory
+from track_filter import apply_filters
+from track_grid import common_frames
+from plot_decimation import plot_decimated
 
 plt.rcParams['figure.constrained_layout.use'] = True
 plt.rcParams.update({'font.size': 16})
 # plt.rcParams['font.family'] = 'Times New Roman'
 
-
-
-def butter_lowpass(cutoff, fs, order=5):
-    """Design a Butterworth lowpass filter."""
-    nyq = 0.5 * fs
-    normal_cutoff = cutoff / nyq
-    b, a = butter(order, normal_cutoff, btype='low', analog=False)
-    return b, a
-
-def lowpass_filter(data, cutoff=2.0, fs=30.0, order=5):
-    """Apply lowpass filter to data."""
-    b, a = butter_lowpass(cutoff, fs, order=order)
-    y = filtfilt(b, a, data)
-    return y
-
-def natural_sort_key(s):
-    """Natural sorting for filenames."""
-    return [int(text) if text.isdigit() else text.lower() for text in re.split('([0-9]+)', s)]
-
-def parse_yolov8_segmentation(file_path):
-    """Parse YOLOv8 segmentation data."""
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
-    
-    ellipses = []
-    for line in lines:
-        parts = list(map(float, line.strip().split()))
-        if len(parts) < 11:  # Need at least 5 points
-            continue
-            
-        class_id = int(parts[0])
-        points = np.array(parts[1:]).reshape(-1, 2)
-        center = np.mean(points, axis=0)
-        centered_points = points - center
-        cov = np.cov(centered_points.T)
-        eigenvalues, eigenvectors = np.linalg.eig(cov)
-        major_axis = 2 * math.sqrt(max(eigenvalues))
-        minor_axis = 2 * math.sqrt(min(eigenvalues))
-        angle = math.degrees(math.atan2(eigenvectors[1, 0], eigenvectors[0, 0]))
-        
-        ellipses.append({
-            'class_id': class_id,
-            'center': center,
-            'major_axis': major_axis,
-            'minor_axis': minor_axis,
-            'angle': angle
-        })
-    
-    return ellipses
-
-def process_directory(directory_path):
-    """Process all .txt files in directory."""
-    files = [f for f in os.listdir(directory_path) if f.endswith('.txt')]
-    files.sort(key=natural_sort_key)
-    
-    tracking_data = defaultdict(lambda: {
-        'x_pos': [], 'y_pos': [], 'major_axes': [], 'minor_axes': [], 'angles': [], 'frames': []
-    })
-    
-    for frame_idx, filename in enumerate(files):
-        file_path = os.path.join(directory_path, filename)
-        for ellipse in parse_yolov8_segmentation(file_path):
-            class_id = ellipse['class_id']
-            tracking_data[class_id]['x_pos'].append(ellipse['center'][0])
-            tracking_data[class_id]['y_pos'].append(ellipse['center'][1])
-            tracking_data[class_id]['major_axes'].append(ellipse['major_axis'])
-            tracking_data[class_id]['minor_axes'].append(ellipse['minor_axis'])
-            tracking_data[class_id]['angles'].append(ellipse['angle'])
-            tracking_data[class_id]['frames'].append(frame_idx)
-    
-    return tracking_data
-
-def apply_filters(tracking_data, cutoff=2.0, fs=30.0):
-    """Apply lowpass filters to all tracking data."""
-    filtered_data = {}
-    for class_id, data in tracking_data.items():
-        filtered = {
-            'x_pos': lowpass_filter(data['x_pos'], cutoff, fs),
-            'y_pos': lowpass_filter(data['y_pos'], cutoff, fs),
-            'major_axes': lowpass_filter(data['major_axes'], cutoff, fs),
-            'minor_axes': lowpass_filter(data['minor_axes'], cutoff, fs),
-            'angles': lowpass_filter(data['angles'], cutoff, fs),
-            'frames': data['frames']
-        }
-        filtered_data[class_id] = filtered
-    return filtered_data
-
 def calculate_differences(filtered_data, absolute=True):
     """Calculate differences between both ellipses."""
     if len(filtered_data) < 2:
         return None
     
-    # Get common frame range
-    min_frames = min(len(filtered_data[0]['x_pos']), len(filtered_data[1]['x_pos']))
-    frames = np.arange(min_frames)
+    # Compare the wheels on the frames where both were seen
+    frames, i0, i1 = common_frames(filtered_data)
     
     # Calculate differences (Y values are already inverted)
-    x_diff = np.array(filtered_data[0]['x_pos'][:min_frames]) - np.array(filtered_data[1]['x_pos'][:min_frames])
-    y_diff = np.array(filtered_data[1]['y_pos'][:min_frames]) - np.array(filtered_data[0]['y_pos'][:min_frames])  # Inverted subtraction
+    x_diff = np.asarray(filtered_data[0]['x_pos'][i0]) - np.asarray(filtered_data[1]['x_pos'][i1])
+    y_diff = np.asarray(filtered_data[1]['y_pos'][i1]) - np.asarray(filtered_data[0]['y_pos'][i0])  # Inverted subtraction
     
     if absolute:
         x_diff = np.abs(x_diff)
@@ -162,9 +73,9 @@ def plot_data(tracking_data, filtered_data, show_raw=False, absolute_diff=True):
             class_name = 'Rear'
 
         if show_raw:
-            ax1.plot(data['frames'], data['x_pos'], '-', color=ellipse_colors[class_id], 
+            plot_decimated(ax1, data['frames'], data['x_pos'], '-', color=ellipse_colors[class_id], 
                     alpha=raw_alpha, label=f'{class_name} wheel raw')
-        ax1.plot(filtered_data[class_id]['frames'], filtered_data[class_id]['x_pos'], '-', 
+        plot_decimated(ax1, filtered_data[class_id]['frames'], filtered_data[class_id]['x_pos'], '-', 
                 color=ellipse_colors[class_id], linewidth=2, label=f'{class_name} wheel filtered')
     ax1.set_title('$x$ Position', fontweight='bold')
     ax1.set_ylabel('$x$ position (pixels)')#, fontsize = 16)
@@ -175,9 +86,9 @@ def plot_data(tracking_data, filtered_data, show_raw=False, absolute_diff=True):
     ax2 = plt.subplot(2, 3, 2)
     for class_id, data in tracking_data.items():
         if show_raw:
-            ax2.plot(data['frames'], data['y_pos'], '-', color=ellipse_colors[class_id], 
+            plot_decimated(ax2, data['frames'], data['y_pos'], '-', color=ellipse_colors[class_id], 
                     alpha=raw_alpha, label=f'{class_name} wheel Y raw')
-        ax2.plot(filtered_data[class_id]['frames'], filtered_data[class_id]['y_pos'], '-', 
+        plot_decimated(ax2, filtered_data[class_id]['frames'], filtered_data[class_id]['y_pos'], '-', 
                 color=ellipse_colors[class_id], linewidth=2, label=f'{class_name} wheel filtered')
     ax2.set_title('$y$ Position', fontweight='bold')
     ax2.set_ylabel('$y$ position (pixels)')
@@ -195,12 +106,12 @@ def plot_data(tracking_data, filtered_data, show_raw=False, absolute_diff=True):
 
         # Calculate ratio
         if show_raw:
-            ratio_raw = np.array(data['major_axes']) / np.array(data['minor_axes'])
-            ax3.plot(data['frames'], ratio_raw, '-', color=ellipse_colors[class_id], 
+            ratio_raw = np.asarray(data['major_axes']) / np.asarray(data['minor_axes'])
+            plot_decimated(ax3, data['frames'], ratio_raw, '-', color=ellipse_colors[class_id], 
                     alpha=raw_alpha, label=f'{class_name} wheel ellipse ratio')
         
-        ratio_filtered = np.array(filtered_data[class_id]['major_axes']) / np.array(filtered_data[class_id]['minor_axes'])
-        ax3.plot(filtered_data[class_id]['frames'], ratio_filtered, '-', 
+        ratio_filtered = np.asarray(filtered_data[class_id]['major_axes']) / np.asarray(filtered_data[class_id]['minor_axes'])
+        plot_decimated(ax3, filtered_data[class_id]['frames'], ratio_filtered, '-', 
                 color=ellipse_colors[class_id], linewidth=2, label=f'{class_name} wheel ellipse ratio')
     ax3.set_title('Major/Minor Axis Ratio', fontweight='bold')
     ax3.set_ylabel('Ratio (major/minor)')
@@ -212,9 +123,9 @@ def plot_data(tracking_data, filtered_data, show_raw=False, absolute_diff=True):
     ax4 = plt.subplot(2, 3, 6)
     for class_id, data in tracking_data.items():
         if show_raw:
-            ax4.plot(data['frames'], data['angles'], '-', color=ellipse_colors[class_id], 
+            plot_decimated(ax4, data['frames'], data['angles'], '-', color=ellipse_colors[class_id], 
                     alpha=raw_alpha, label=f'{class_name} wheel')
-        ax4.plot(filtered_data[class_id]['frames'], filtered_data[class_id]['angles'], '-', 
+        plot_decimated(ax4, filtered_data[class_id]['frames'], filtered_data[class_id]['angles'], '-', 
                 color=ellipse_colors[class_id], linewidth=2, label=f'{class_name} wheel')
     ax4.set_title('Angle', fontweight='bold')
     ax4.set_xlabel('Frame number')
@@ -224,7 +135,7 @@ def plot_data(tracking_data, filtered_data, show_raw=False, absolute_diff=True):
     # Plot X Differences (NEW separate plot)
     ax5 = plt.subplot(2, 3, 4)
     if diff_metrics:
-        ax5.plot(diff_metrics['frames'], diff_metrics['x_difference'], '-', 
+        plot_decimated(ax5, diff_metrics['frames'], diff_metrics['x_difference'], '-', 
                 color=diff_colors[0], label='$x$ Difference')
         
         diff_type = 'Absolute' if absolute_diff else 'Signed'
@@ -244,7 +155,7 @@ def plot_data(tracking_data, filtered_data, show_raw=False, absolute_diff=True):
     # Plot Y Differences (NEW separate plot)
     ax6 = plt.subplot(2, 3, 5)
     if diff_metrics:
-        ax6.plot(diff_metrics['frames'], diff_metrics['y_difference'], '-', 
+        plot_decimated(ax6, diff_metrics['frames'], diff_metrics['y_difference'], '-', 
                 color=diff_colors[1], label='Y Difference')
         
         diff_type = 'Absolute' if absolute_diff else 'Signed'
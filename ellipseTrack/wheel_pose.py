@@ -0,0 +1,194 @@
+import numpy as np
+
+WHEEL_DIAMETER = 28.0  # inches
+
+
+def camera_matrix(width, height, focal=None):
+    """Pinhole intrinsics with the principal point at the image center; focal defaults to the image width."""
+    focal = float(width) if focal is None else focal
+    return np.array([[focal, 0.0, width / 2.0],
+                     [0.0, focal, height / 2.0],
+                     [0.0, 0.0, 1.0]])
+
+def ellipse_conics(ellipses):
+    """
+    3x3 conic matrices (x, y, 1) C (x, y, 1)^T = 0 of ellipse dicts with
+    full axes and the major-axis angle in degrees: (N, 3, 3).
+    """
+    cx = np.asarray(ellipses['center_x'], dtype=np.float64)
+    cy = np.asarray(ellipses['center_y'], dtype=np.float64)
+    theta = np.radians(ellipses['angle'])
+    c, s = np.cos(theta), np.sin(theta)
+    inv_a = 1 / (0.5 * np.asarray(ellipses['major_axis'], dtype=np.float64)) ** 2
+    inv_b = 1 / (0.5 * np.asarray(ellipses['minor_axis'], dtype=np.float64)) ** 2
+    # Quadratic part R diag(1/a^2, 1/b^2) R^T
+    qa = c * c * inv_a + s * s * inv_b
+    qb = c * s * (inv_a - inv_b)
+    qc = s * s * inv_a + c * c * inv_b
+    conics = np.empty((len(cx), 3, 3))
+    conics[:, 0, 0], conics[:, 0, 1], conics[:, 1, 1] = qa, qb, qc
+    conics[:, 1, 0] = qb
+    conics[:, 0, 2] = conics[:, 2, 0] = -(qa * cx + qb * cy)
+    conics[:, 1, 2] = conics[:, 2, 1] = -(qb * cx + qc * cy)
+    conics[:, 2, 2] = qa * cx * cx + 2 * qb * cx * cy + qc * cy * cy - 1
+    return conics
+
+def circle_poses(conics, intrinsics, radius):
+    """
+    Both 3D poses of circles of known radius seen as image conics.
+
+    Back-projects every conic to a cone Q = K^T C K, diagonalizes it and
+    cuts it with the two families of planes that give circular sections;
+    the plane offset is then fixed by the radius. Returns (centers, normals),
+    each (N, 2 solutions, 3) in camera coordinates and the radius' units,
+    with centers in front of the camera and normals facing it.
+    """
+    cones = np.einsum('ji,njk,kl->nil', intrinsics, conics, intrinsics)
+    values, vectors = np.linalg.eigh(cones)
+    # Two positive eigenvalues and one negative: flip cones with the opposite signature
+    flip = (values > 0).sum(axis=1) < 2
+    values[flip] = -values[flip, ::-1]
+    vectors[flip] = vectors[flip, :, ::-1]
+    l3, l2, l1 = values.T
+    vectors = vectors[:, :, ::-1]
+
+    # Unit normals in the eigenframe (axes e1 = largest, e2, e3 = negative eigenvalue)
+    nx = np.sqrt(np.clip((l1 - l2) / (l1 - l3), 0, 1))
+    nz = np.sqrt(np.clip((l2 - l3) / (l1 - l3), 0, 1))
+    sign = np.array([1.0, -1.0])
+    zeros = np.zeros((len(conics), 2))
+    normal = np.stack((nx[:, None] * sign, zeros, np.broadcast_to(nz[:, None], (len(conics), 2))), axis=-1)
+    u = np.stack((normal[..., 2], zeros, -normal[..., 0]), axis=-1)
+    v = np.zeros_like(normal)
+    v[..., 1] = 1.0
+
+    # Section by the plane n.X = 1: X = n + s u + t v gives the circle
+    # (s, t) A (s, t)^T + 2 b.(s, t) + c = 0
+    diag = np.stack((l1, l2, l3), axis=-1)[:, None, :]
+    basis = np.stack((u, v), axis=-2)                                 # (N, 2, 2, 3)
+    a = np.einsum('nsik,nsk,nsjk->nsij', basis, np.broadcast_to(diag, normal.shape), basis)
+    b = np.einsum('nsik,nsk->nsi', basis, diag * normal)
+    c = np.einsum('nsk,nsk->ns', normal, diag * normal)
+    middle = -np.linalg.solve(a, b[..., None])[..., 0]
+    section = (np.einsum('nsi,nsi->ns', b, -middle) - c) / (0.5 * np.trace(a, axis1=-2, axis2=-1))
+    center = normal + np.einsum('nsi,nsik->nsk', middle, basis)
+    center *= (radius / np.sqrt(np.abs(section)))[..., None]
+
+    centers = np.einsum('nij,nsj->nsi', vectors, center)
+    normals = np.einsum('nij,nsj->nsi', vectors, normal)
+    centers *= np.where(centers[..., 2:] < 0, -1.0, 1.0)
+    normals *= np.where(np.einsum('nsi,nsi->ns', normals, centers)[..., None] > 0, -1.0, 1.0)
+    return centers, normals
+
+def pick_solutions(class_ids, file_idx, normals, front=0, rear=1):
+    """
+    Choose one of the two poses per ellipse. Where both wheels are seen in
+    a frame, take the combination whose wheel planes agree best (a bicycle's
+    wheels are coplanar); elsewhere take the solution closest to the median
+    normal of those frames. Returns the chosen solution index per ellipse.
+    """
+    choice = np.zeros(len(class_ids), dtype=np.int64)
+    is_front, is_rear = class_ids == front, class_ids == rear
+    both, i0, i1 = np.intersect1d(file_idx[is_front], file_idx[is_rear], return_indices=True)
+    i0 = np.flatnonzero(is_front)[i0]
+    i1 = np.flatnonzero(is_rear)[i1]
+    if len(both):
+        agreement = np.abs(np.einsum('nsk,ntk->nst', normals[i0], normals[i1])).reshape(len(i0), 4)
+        best = agreement.argmax(axis=1)
+        choice[i0], choice[i1] = best // 2, best % 2
+        reference = np.median(normals[i0, choice[i0]], axis=0)
+        paired = np.zeros(len(class_ids), dtype=bool)
+        paired[i0] = paired[i1] = True
+        single = np.flatnonzero(~paired)
+        choice[single] = np.abs(normals[single] @ reference).argmax(axis=1)
+    return choice
+
+def wheel_poses(labels, ellipses, intrinsics, diameter=WHEEL_DIAMETER, front=0, rear=1):
+    """
+    Metric 3D center and plane normal of every wheel ellipse in one call.
+    ellipses must be true-axis fits in pixels (e.g. fit_ellipses(labels, 'direct')
+    on pixel coordinates). Returns a dict of per-ellipse arrays: class_id,
+    file_idx, center (N, 3), normal (N, 3) and distance, in the diameter's units.
+    """
+    centers, normals = circle_poses(ellipse_conics(ellipses), intrinsics, diameter / 2.0)
+    class_ids = np.asarray(labels['class_id'])
+    file_idx = np.asarray(labels['file_idx'])
+    choice = pick_solutions(class_ids, file_idx, normals, front, rear)
+    rows = np.arange(len(choice))
+    center = centers[rows, choice]
+    return {
+        'class_id': class_ids,
+        'file_idx': file_idx,
+        'center': center,
+        'normal': normals[rows, choice],
+        'distance': np.linalg.norm(center, axis=1),
+    }
+
+def project_circle(center, normal, radius, intrinsics, n_points=64):
+    """Image points of a 3D circle, used to check the solver on synthetic wheels."""
+    normal = normal / np.linalg.norm(normal)
+    u = np.cross(normal, [0.0, 1.0, 0.0] if abs(normal[1]) < 0.9 else [1.0, 0.0, 0.0])
+    u /= np.linalg.norm(u)
+    v = np.cross(normal, u)
+    t = np.linspace(0, 2 * np.pi, n_points, endpoint=False)[:, None]
+    points = center + radius * (np.cos(t) * u + np.sin(t) * v)
+    image = points @ intrinsics.T
+    return image[:, :2] / image[:, 2:]
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from ellipse_fit import FIT_METHODS, fit_direct, fit_ellipses
+    from label_cache import load_labels
+
+    parser = argparse.ArgumentParser(description='Metric 3D wheel centers and normals from ellipse conics.')
+    parser.add_argument('directory', type=str, nargs='?', help='Directory containing YOLOv8 .txt files')
+    parser.add_argument('--width', type=float, default=1920.0, help='Image width in pixels')
+    parser.add_argument('--height', type=float, default=1080.0, help='Image height in pixels')
+    parser.add_argument('--focal', type=float, default=None, help='Focal length in pixels (default: image width)')
+    parser.add_argument('--diameter', type=float, default=WHEEL_DIAMETER, help='Wheel diameter (inches)')
+    parser.add_argument('--fit-method', type=str, default='direct', choices=FIT_METHODS[1:],
+                       help='True-axis ellipse fit used for the conics')
+
+    args = parser.parse_args()
+    intrinsics = camera_matrix(args.width, args.height, args.focal)
+
+    # Synthetic check: random wheels projected, fitted and solved again
+    rng = np.random.default_rng(0)
+    n = 2000
+    true_centers = np.column_stack((rng.uniform(-60, 60, n), rng.uniform(-30, 30, n), rng.uniform(100, 400, n)))
+    true_normals = rng.normal(size=(n, 3)) + [0, 0, -2]
+    true_normals /= np.linalg.norm(true_normals, axis=1, keepdims=True)
+    rings = [project_circle(c, m, args.diameter / 2, intrinsics) for c, m in zip(true_centers, true_normals)]
+    synthetic = {
+        'points': np.concatenate(rings),
+        'offsets': np.arange(n + 1) * len(rings[0]),
+        'class_id': np.zeros(n, dtype=np.int64),
+        'file_idx': np.arange(n),
+    }
+    start = time.perf_counter()
+    centers, normals = circle_poses(ellipse_conics(fit_direct(synthetic)), intrinsics, args.diameter / 2)
+    elapsed = time.perf_counter() - start
+    errors = np.linalg.norm(centers - true_centers[:, None], axis=2)
+    best = errors.argmin(axis=1)
+    rows = np.arange(n)
+    angle = np.degrees(np.arccos(np.clip(np.abs(np.einsum('nk,nk->n', normals[rows, best], true_normals)), 0, 1)))
+    print(f"Synthetic: {n} wheels in {elapsed * 1000:.1f} ms, "
+          f"median center error {np.median(errors[rows, best]):.3g} in, "
+          f"median normal error {np.median(angle):.3g} deg")
+
+    if args.directory:
+        labels, _ = load_labels(args.directory)
+        labels = dict(labels, points=labels['points'] * (args.width, args.height))
+        ellipses = fit_ellipses(labels, args.fit_method)
+        start = time.perf_counter()
+        poses = wheel_poses(labels, ellipses, intrinsics, args.diameter)
+        elapsed = time.perf_counter() - start
+        print(f"{len(poses['center'])} wheels in {elapsed * 1000:.1f} ms")
+        print(f"\n{'class':>5} {'count':>6} {'distance (in)':>14} {'center x/y/z (median, in)':>28}")
+        for class_id in np.unique(poses['class_id']):
+            mask = poses['class_id'] == class_id
+            median = np.median(poses['center'][mask], axis=0)
+            print(f"{class_id:>5} {mask.sum():>6} {np.median(poses['distance'][mask]):>14.1f} "
+                  f"{median[0]:>9.1f} {median[1]:>9.1f} {median[2]:>9.1f}")
@@ -0,0 +1,265 @@
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+INFEASIBLE = 1e6
+
+
+def polygon_masks(points, offsets, bounds, resolution=64):
+    """
+    Rasterize polygons on a resolution x resolution grid spanning bounds
+    (xmin, ymin, xmax, ymax). Every edge toggles the cells of each grid row
+    to the right of where it crosses that row; a running sum along the row
+    then gives the even-odd inside test for all polygons at once.
+    Returns a (polygons, resolution**2) boolean array.
+    """
+    xmin, ymin, xmax, ymax = bounds
+    dx = max(xmax - xmin, 1e-12) / resolution
+    dy = max(ymax - ymin, 1e-12) / resolution
+    gy = ymin + (np.arange(resolution) + 0.5) * dy
+
+    n_poly = len(offsets) - 1
+    counts = np.diff(offsets)
+    nxt = np.arange(len(points)) + 1
+    nxt[offsets[1:] - 1] = offsets[:-1]
+    x1, y1 = points[:, 0, None], points[:, 1, None]
+    x2, y2 = points[nxt, 0, None], points[nxt, 1, None]
+
+    edge, row = np.nonzero((y1 > gy) != (y2 > gy))
+    x1, y1, x2, y2 = x1[edge, 0], y1[edge, 0], x2[edge, 0], y2[edge, 0]
+    x_cross = x1 + (gy[row] - y1) * (x2 - x1) / (y2 - y1)
+    column = np.clip(np.floor((x_cross - xmin) / dx - 0.5).astype(np.int64) + 1, 0, resolution)
+
+    toggles = np.zeros((n_poly, resolution, resolution + 1), dtype=np.int32)
+    np.add.at(toggles, (np.repeat(np.arange(n_poly), counts)[edge], row, column), 1)
+    inside = np.cumsum(toggles, axis=2)[:, :, :resolution] % 2
+    return inside.reshape(n_poly, -1).astype(bool)
+
+def polygon_iou(points_a, offsets_a, points_b, offsets_b, resolution=64):
+    """IoU of every polygon in a against every polygon in b, rasterized over their common bounding box."""
+    both = np.vstack((points_a, points_b))
+    bounds = (*both.min(axis=0), *both.max(axis=0))
+    masks_a = polygon_masks(points_a, offsets_a, bounds, resolution).astype(np.float32)
+    masks_b = polygon_masks(points_b, offsets_b, bounds, resolution).astype(np.float32)
+    inter = masks_a @ masks_b.T
+    union = masks_a.sum(axis=1)[:, None] + masks_b.sum(axis=1)[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1), 0.0)
+
+def pack_polygons(polygons):
+    """List of (n, 2) vertex arrays -> (points, offsets)."""
+    offsets = np.zeros(len(polygons) + 1, dtype=np.int64)
+    np.cumsum([len(p) for p in polygons], out=offsets[1:])
+    return np.vstack(polygons), offsets
+
+class WheelTracker:
+    """
+    Frame-by-frame association of wheel detections to tracks with stable IDs.
+
+    Each frame builds a tracks x detections cost matrix from the distance
+    to the constant-velocity predicted center (in units of the track's major
+    axis), the log ratio of the axes and 1 - IoU of the polygons, solves it
+    with linear_sum_assignment, and keeps unmatched tracks alive for up to
+    max_age frames so short dropouts do not change IDs.
+    """
+
+    def __init__(self, max_age=10, gate=2.0, max_cost=3.0, weights=(1.0, 0.5, 1.0), resolution=64):
+        self.max_age = max_age
+        self.gate = gate
+        self.max_cost = max_cost
+        self.weights = weights
+        self.resolution = resolution
+        self.next_id = 0
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.centers = np.zeros((0, 2))
+        self.velocity = np.zeros((0, 2))
+        self.axes = np.zeros((0, 2))
+        self.last_frame = np.zeros(0, dtype=np.int64)
+        self.polygons = []
+
+    def cost_matrix(self, frame, points, offsets, centers, axes):
+        """Association cost of every live track against every detection (tracks x detections)."""
+        dt = (frame - self.last_frame)[:, None]
+        predicted = self.centers + self.velocity * dt
+        distance = np.hypot(*(predicted[:, None, :] - centers[None, :, :]).transpose(2, 0, 1))
+        distance /= np.maximum(self.axes[:, 0], 1e-9)[:, None]
+
+        log_axes = np.log(np.maximum(axes, 1e-9))
+        track_log_axes = np.log(np.maximum(self.axes, 1e-9))
+        axis_cost = np.abs(track_log_axes[:, None, :] - log_axes[None, :, :]).sum(axis=2)
+
+        # Compare shapes where the tracks are expected to be now
+        moved = [polygon + shift for polygon, shift in zip(self.polygons, predicted - self.centers)]
+        track_points, track_offsets = pack_polygons(moved)
+        iou = polygon_iou(track_points, track_offsets, points, offsets, self.resolution)
+
+        w_distance, w_axes, w_iou = self.weights
+        cost = w_distance * distance + w_axes * axis_cost + w_iou * (1.0 - iou)
+        cost[distance > self.gate] = INFEASIBLE
+        return cost
+
+    def update(self, frame, points, offsets, centers, axes):
+        """
+        Associate one frame's detections (polygons as points/offsets, centers
+        (n, 2), axes (n, 2) major/minor); returns their track IDs.
+        """
+        n = len(offsets) - 1
+        track_ids = np.full(n, -1, dtype=np.int64)
+        matched_tracks = np.zeros(0, dtype=np.int64)
+        matched = np.zeros(n, dtype=bool)
+        if n and len(self.ids):
+            cost = self.cost_matrix(frame, points, offsets, centers, axes)
+            rows, cols = linear_sum_assignment(cost)
+            keep = cost[rows, cols] < self.max_cost
+            matched_tracks, cols = rows[keep], cols[keep]
+            matched[cols] = True
+            track_ids[cols] = self.ids[matched_tracks]
+
+            dt = np.maximum(frame - self.last_frame[matched_tracks], 1)[:, None]
+            self.velocity[matched_tracks] = (centers[cols] - self.centers[matched_tracks]) / dt
+            self.centers[matched_tracks] = centers[cols]
+            self.axes[matched_tracks] = axes[cols]
+            self.last_frame[matched_tracks] = frame
+            for t, d in zip(matched_tracks, cols):
+                self.polygons[t] = points[offsets[d]:offsets[d + 1]]
+
+        # Unmatched detections start new tracks
+        new = np.flatnonzero(~matched)
+        track_ids[new] = np.arange(self.next_id, self.next_id + len(new))
+        self.next_id += len(new)
+        self.ids = np.concatenate((self.ids, track_ids[new]))
+        self.centers = np.vstack((self.centers, centers[new]))
+        self.velocity = np.vstack((self.velocity, np.zeros((len(new), 2))))
+        self.axes = np.vstack((self.axes, axes[new]))
+        self.last_frame = np.concatenate((self.last_frame, np.full(len(new), frame)))
+        self.polygons += [points[offsets[d]:offsets[d + 1]] for d in new]
+
+        # Forget tracks that have been missing for too long
+        alive = frame - self.last_frame <= self.max_age
+        if not alive.all():
+            self.ids, self.centers, self.velocity = self.ids[alive], self.centers[alive], self.velocity[alive]
+            self.axes, self.last_frame = self.axes[alive], self.last_frame[alive]
+            self.polygons = [p for p, a in zip(self.polygons, alive) if a]
+        return track_ids
+
+def track_labels(labels, ellipses, **options):
+    """Track IDs for every polygon of packed labels (frames from file_frame), one tracker per clip."""
+    tracker = WheelTracker(**options)
+    track_ids = np.full(len(labels['class_id']), -1, dtype=np.int64)
+    centers = np.column_stack((ellipses['center_x'], ellipses['center_y']))
+    axes = np.column_stack((ellipses['major_axis'], ellipses['minor_axis']))
+    bounds = labels['file_poly_start']
+    for i, frame in enumerate(labels['file_frame']):
+        p0, p1 = bounds[i], bounds[i + 1]
+        if p0 == p1:
+            continue
+        q0, q1 = labels['offsets'][p0], labels['offsets'][p1]
+        track_ids[p0:p1] = tracker.update(int(frame), labels['points'][q0:q1],
+                                          labels['offsets'][p0:p1 + 1] - q0,
+                                          centers[p0:p1], axes[p0:p1])
+    return track_ids
+
+def process_directory(directory_path, **options):
+    """Like label_cache.process_directory, but keyed by track ID instead of class_id."""
+    from label_cache import load_labels
+    from track_store import TrackStore
+
+    labels, ellipses = load_labels(directory_path)
+    track_ids = track_labels(labels, ellipses, **options)
+    return TrackStore.from_ellipses(track_ids, labels['file_frame'][labels['file_idx']], ellipses)
+
+def replicate_scene(labels, copies):
+    """
+    Stress-test input: every frame repeated copies x copies times, shrunk
+    into a grid of tiles, as if that many cyclists were in view.
+    """
+    tiles = np.array([(i, j) for i in range(copies) for j in range(copies)], dtype=np.float64)
+    n_poly, n_files = len(labels['class_id']), len(labels['files'])
+    counts = np.diff(labels['offsets'])
+
+    # Keep every frame's polygons (all tiles) contiguous
+    file_of_poly = labels['file_idx']
+    poly = np.tile(np.arange(n_poly), len(tiles))
+    tile = np.repeat(np.arange(len(tiles)), n_poly)
+    order = np.lexsort((poly, tile, file_of_poly[poly]))
+    poly, tile = poly[order], tile[order]
+
+    offsets = np.zeros(len(poly) + 1, dtype=np.int64)
+    np.cumsum(counts[poly], out=offsets[1:])
+    index = np.arange(offsets[-1]) - np.repeat(offsets[:-1] - labels['offsets'][poly], counts[poly])
+    points = (labels['points'][index] + tiles[np.repeat(tile, counts[poly])]) / copies
+
+    file_idx = file_of_poly[poly]
+    file_poly_start = np.searchsorted(file_idx, np.arange(n_files + 1))
+    return {
+        'class_id': labels['class_id'][poly],
+        'file_idx': file_idx,
+        'offsets': offsets,
+        'points': points,
+        'files': labels['files'],
+        'file_frame': labels['file_frame'],
+        'file_poly_start': file_poly_start,
+    }
+
+def summarize_tracks(labels, track_ids):
+    """Number of tracks, their lengths, and how often a track changes class label (swapped detections)."""
+    order = np.lexsort((labels['file_frame'][labels['file_idx']], track_ids))
+    ids, classes = track_ids[order], labels['class_id'][order]
+    same_track = ids[1:] == ids[:-1]
+    lengths = np.bincount(np.unique(track_ids, return_inverse=True)[1])
+    return {
+        'tracks': len(lengths),
+        'longest': int(lengths.max()) if len(lengths) else 0,
+        'median_length': float(np.median(lengths)) if len(lengths) else 0.0,
+        'class_changes': int((same_track & (classes[1:] != classes[:-1])).sum()),
+    }
+
+def track_clip(clip, copies=1, **options):
+    """Track one clip (batch_ingest clip dict); runs inside a worker process."""
+    import time
+    from label_cache import load_labels
+    from ellipse_fit import fit_ellipses
+
+    labels, ellipses = load_labels(clip['source'])
+    if copies > 1:
+        labels = replicate_scene(labels, copies)
+        ellipses = fit_ellipses(labels)
+    start = time.perf_counter()
+    track_ids = track_labels(labels, ellipses, **options)
+    summary = summarize_tracks(labels, track_ids)
+    summary.update({
+        'clip_id': clip['clip_id'],
+        'frames': len(labels['files']),
+        'detections': len(track_ids),
+        'seconds': time.perf_counter() - start,
+    })
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+    from concurrent.futures import ProcessPoolExecutor
+    from functools import partial
+    import pandas as pd
+    from batch_ingest import DATA_ROOTS, discover_clips
+
+    parser = argparse.ArgumentParser(description='Associate wheel detections into tracks with stable IDs for every clip.')
+    parser.add_argument('roots', type=str, nargs='*', default=DATA_ROOTS,
+                       help='Directories containing *-yolo clip exports (default: Data Data-NoCrash)')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: all cores)')
+    parser.add_argument('--max-age', type=int, default=10, help='Frames a track may be missing before its ID is dropped')
+    parser.add_argument('--gate', type=float, default=2.0, help='Largest center jump, in major axes of the track')
+    parser.add_argument('--copies', type=int, default=1,
+                       help='Stress test: tile every frame copies x copies times (e.g. 5 for ~50 wheels per frame)')
+
+    args = parser.parse_args()
+
+    clips = discover_clips(args.roots)
+    worker = partial(track_clip, copies=args.copies, max_age=args.max_age, gate=args.gate)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        summaries = pd.DataFrame(list(pool.map(worker, clips)))
+
+    summaries['detections_per_frame'] = summaries['detections'] / summaries['frames']
+    summaries['ms_per_frame'] = 1000 * summaries['seconds'] / summaries['frames']
+    print("\n=== Tracking Summary ===")
+    print(summaries[['clip_id', 'frames', 'detections_per_frame', 'tracks', 'longest',
+                     'class_changes', 'ms_per_frame']].to_string(index=False, float_format='%.2f'))
+    print("========================")
@@ -0,0 +1,108 @@
+import os
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+FIELD_SUFFIXES = {'x_pos': 'x', 'y_pos': 'y', 'major_axes': 'major', 'minor_axes': 'minor', 'angles': 'angle'}
+
+
+def pivot_tracks(tracking_data, track_ids=None, fields=('x_pos', 'y_pos'), dtype=np.float32):
+    """
+    Scatter any number of tracks into one preallocated (frames, tracks, fields)
+    array over the union of their frames, NaN where a track has no sample.
+    Returns a dict with 'frames', 'track_ids', 'fields', 'values' and 'observed'.
+    """
+    track_ids = sorted(tracking_data) if track_ids is None else list(track_ids)
+    present = [(t, tracking_data[track_id]) for t, track_id in enumerate(track_ids) if track_id in tracking_data]
+    lengths = [len(track['frames']) for _, track in present]
+    if present:
+        frames = np.concatenate([np.asarray(track['frames']) for _, track in present])
+        samples = np.concatenate([np.column_stack([np.asarray(track[f]) for f in fields]) for _, track in present])
+        columns = np.repeat([t for t, _ in present], lengths)
+    else:
+        frames = np.zeros(0, dtype=np.int64)
+        samples = np.zeros((0, len(fields)))
+        columns = np.zeros(0, dtype=np.int64)
+
+    # Frame numbers are small integers: mark them on a dense range instead of sorting
+    first = frames.min() if len(frames) else 0
+    seen = np.zeros(frames.max() - first + 1 if len(frames) else 0, dtype=bool)
+    seen[frames - first] = True
+    grid = np.flatnonzero(seen) + first
+    rows = (np.cumsum(seen) - 1)[frames - first]
+    values = np.full((len(grid), len(track_ids), len(fields)), np.nan, dtype=dtype)
+    observed = np.zeros((len(grid), len(track_ids)), dtype=bool)
+    values[rows, columns] = samples
+    observed[rows, columns] = True
+    return {
+        'frames': grid.astype(np.int64),
+        'track_ids': track_ids,
+        'fields': tuple(fields),
+        'values': values,
+        'observed': observed,
+    }
+
+def wide_columns(n_tracks, fields=('x_pos', 'y_pos')):
+    """Feature1_x, Feature1_y, Feature2_x, ... for the tracks in pivot order."""
+    return [f'Feature{t + 1}_{FIELD_SUFFIXES.get(field, field)}' for t in range(n_tracks) for field in fields]
+
+def wide_table(pivot):
+    """pyarrow Table with a Frame column plus one column per (track, field); NaN becomes null."""
+    n = len(pivot['frames'])
+    flat = pivot['values'].reshape(n, -1)
+    names = wide_columns(len(pivot['track_ids']), pivot['fields'])
+    arrays = [pa.array(pivot['frames'])] + [pa.array(flat[:, i], from_pandas=True) for i in range(flat.shape[1])]
+    return pa.Table.from_arrays(arrays, names=['Frame'] + names)
+
+def write_wide(pivot, output_file):
+    """Write the pivot as Parquet (.parquet) or CSV (anything else) through pyarrow's columnar writers."""
+    table = wide_table(pivot)
+    if os.path.splitext(output_file)[1] == '.parquet':
+        pq.write_table(table, output_file)
+    else:
+        # Header written by hand: pyarrow quotes header names whatever the quoting style
+        with pa.OSFile(output_file, 'wb') as sink:
+            sink.write((','.join(table.column_names) + '\n').encode())
+            pa_csv.write_csv(table, sink, pa_csv.WriteOptions(include_header=False, quoting_style='none'))
+    return table
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from label_cache import process_directory
+    from track_store import TRACK_FIELDS, TrackStore
+
+    parser = argparse.ArgumentParser(description='Pivot every track of a clip into one wide frame-by-feature table.')
+    parser.add_argument('directory', type=str, help='Directory containing YOLOv8 .txt files')
+    parser.add_argument('--fields', type=str, default='x_pos,y_pos',
+                       help=f"Comma-separated fields from {', '.join(TRACK_FIELDS)}")
+    parser.add_argument('--output', type=str, default='ellipse_wide.csv', help='Output .csv or .parquet file')
+    parser.add_argument('--benchmark', type=int, default=0,
+                       help='Also time a synthetic clip with this many frames and 20 tracks')
+
+    args = parser.parse_args()
+    fields = args.fields.split(',')
+
+    tracking_data = process_directory(args.directory)
+    start = time.perf_counter()
+    pivot = pivot_tracks(tracking_data, fields=fields)
+    table = write_wide(pivot, args.output)
+    elapsed = time.perf_counter() - start
+    print(f"{table.num_rows} frames x {table.num_columns} columns saved to {args.output} in {elapsed * 1000:.1f} ms")
+    print(f"Columns: {', '.join(table.column_names)}")
+
+    if args.benchmark:
+        rng = np.random.default_rng(0)
+        store = TrackStore()
+        for track_id in range(20):
+            frames = np.flatnonzero(rng.random(args.benchmark) < 0.9)
+            store.extend(np.full(len(frames), track_id), frames, rng.random((len(TRACK_FIELDS), len(frames))))
+        start = time.perf_counter()
+        pivot = pivot_tracks(store, fields=TRACK_FIELDS)
+        middle = time.perf_counter()
+        write_wide(pivot, '/dev/null')
+        end = time.perf_counter()
+        print(f"Synthetic {args.benchmark} frames x 20 tracks x {len(TRACK_FIELDS)} fields: "
+              f"pivot {(middle - start) * 1000:.1f} ms, CSV {(end - middle) * 1000:.1f} ms")
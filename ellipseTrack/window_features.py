@@ -0,0 +1,141 @@
+import time
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from concurrent.futures import ProcessPoolExecutor
+from batch_ingest import wheel_classes
+from label_cache import process_directory
+from track_grid import MAX_GAP, resample_tracks, contiguous_segments
+
+SERIES = ('distance', 'x_gap', 'y_gap', 'slope', 'pitch',
+          'ratio_front', 'ratio_rear', 'ratio_rate_front', 'ratio_rate_rear',
+          'angle_rate_front', 'angle_rate_rear')
+STATISTICS = ('mean', 'std', 'min', 'max')
+SPECTRAL_SERIES = ('distance', 'slope', 'pitch')
+LABELS = {'crash': 1, 'nocrash': 0}
+
+
+def feature_names():
+    """Column names of the feature matrix, in order."""
+    names = [f'{s}_{stat}' for s in SERIES for stat in STATISTICS]
+    return names + [f'{s}_energy' for s in SPECTRAL_SERIES]
+
+def angle_rate(angles):
+    """
+    Per-frame change of major-axis angles in degrees. Angles are unwrapped
+    with period 180 first: wrapping after np.gradient would average a +89 ->
+    -89 flip into a -88.5 rate instead of +2.
+    """
+    return np.gradient(np.unwrap(angles, period=180, axis=0), axis=0)
+
+def pair_series(values):
+    """
+    Per-frame series of one contiguous wheel-pair segment.
+    values is (frames, 2 wheels, TRACK_FIELDS) for front and rear; returns (frames, len(SERIES)).
+    """
+    x, y, major, minor, angles = np.moveaxis(values, -1, 0)
+    dx = x[:, 0] - x[:, 1]
+    dy = y[:, 0] - y[:, 1]
+    distance = np.hypot(dx, dy)
+    ratio = minor / major
+    # Pitch of the line through both wheel centers; image y grows downwards
+    pitch = np.degrees(np.arctan2(-dy, np.abs(dx)))
+    if len(distance) > 1:
+        slope = np.gradient(distance)
+        ratio_rate = np.gradient(ratio, axis=0)
+        angle_rates = angle_rate(angles)
+    else:
+        slope = np.zeros_like(distance)
+        ratio_rate = angle_rates = np.zeros_like(ratio)
+    return np.column_stack((distance, np.abs(dx), np.abs(dy), slope, pitch,
+                            ratio, ratio_rate, angle_rates))
+
+def window_statistics(series, window, step):
+    """
+    Statistics of every window of one segment's series via a zero-copy
+    sliding view: (windows, features) plus the start offsets of the windows.
+    """
+    windows = sliding_window_view(series, window, axis=0)[::step]  # (windows, series, window)
+    stats = np.stack((windows.mean(axis=-1), windows.std(axis=-1),
+                      windows.min(axis=-1), windows.max(axis=-1)), axis=-1)
+
+    # Spectral energy of the detrended window, DC removed, per sample
+    spectral = windows[:, [SERIES.index(s) for s in SPECTRAL_SERIES]]
+    spectral = spectral - spectral.mean(axis=-1, keepdims=True)
+    energy = np.sum(np.abs(np.fft.rfft(spectral, axis=-1)[..., 1:]) ** 2, axis=-1) / window ** 2
+
+    features = np.concatenate((stats.reshape(len(windows), -1), energy), axis=1)
+    return features, np.arange(len(windows)) * step
+
+def clip_features(tracking_data, window=30, step=5, max_gap=MAX_GAP, front=0, rear=1):
+    """
+    Windowed features of one clip: (feature matrix, window start frames).
+    Windows only cover frames where both wheels are valid (short gaps interpolated).
+    """
+    grid = resample_tracks(tracking_data, max_gap=max_gap, class_ids=[front, rear])
+    starts, stops = contiguous_segments(grid['valid'].all(axis=1))
+    features, frames = [], []
+    for start, stop in zip(starts, stops):
+        if stop - start < window:
+            continue
+        segment, offsets = window_statistics(pair_series(grid['values'][start:stop]), window, step)
+        features.append(segment)
+        frames.append(grid['frames'][start + offsets])
+    if not features:
+        return np.zeros((0, len(feature_names()))), np.zeros(0, dtype=np.int64)
+    return np.concatenate(features), np.concatenate(frames)
+
+def extract_clip(clip, window=30, step=5):
+    """Feature rows of one clip, tagged with its id and label. Runs inside a worker process."""
+    start = time.perf_counter()
+    # Front and rear from data.yaml: not every export numbers the front wheel 0
+    front, rear = wheel_classes(clip['class_names'])
+    features, frames = clip_features(process_directory(clip['source']), window, step, front=front, rear=rear)
+    df = pd.DataFrame(features.astype(np.float32), columns=feature_names())
+    df.insert(0, 'clip_id', clip['clip_id'])
+    df.insert(1, 'category', clip['category'])
+    df.insert(2, 'label', LABELS[clip['category']])
+    df.insert(3, 'start_frame', frames)
+    df.insert(4, 'end_frame', frames + window - 1)
+    return df, time.perf_counter() - start
+
+def extract_dataset(clips, window=30, step=5, workers=None):
+    """Windowed features of all clips in a process pool: (one DataFrame, per-clip seconds)."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(extract_clip, clips, [window] * len(clips), [step] * len(clips)))
+    frames = [df for df, _ in results]
+    dataset = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    for column in ('clip_id', 'category'):
+        if column in dataset:
+            dataset[column] = dataset[column].astype('category')
+    return dataset, [seconds for _, seconds in results]
+
+
+if __name__ == "__main__":
+    import argparse
+    from batch_ingest import DATA_ROOTS, discover_clips
+    from yolo2df import save_dataset
+
+    parser = argparse.ArgumentParser(description='Extract sliding-window crash/no-crash features from every clip.')
+    parser.add_argument('roots', type=str, nargs='*', default=DATA_ROOTS,
+                       help='Directories containing *-yolo clip exports (default: Data Data-NoCrash)')
+    parser.add_argument('--window', type=int, default=30, help='Window length in frames')
+    parser.add_argument('--step', type=int, default=5, help='Frames between window starts')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: all cores)')
+    parser.add_argument('--output', type=str, default=None,
+                       help='Save the feature matrix (without extension unless --csv-only)')
+    parser.add_argument('--csv-only', action='store_true', help='Save only CSV format')
+
+    args = parser.parse_args()
+
+    clips = discover_clips(args.roots)
+    start = time.perf_counter()
+    dataset, seconds = extract_dataset(clips, args.window, args.step, args.workers)
+    wall_time = time.perf_counter() - start
+
+    print(f"Feature matrix: {len(dataset)} windows x {len(feature_names())} features "
+          f"from {len(clips)} clips in {wall_time:.2f} s (summed clip time {sum(seconds):.2f} s)")
+    if len(dataset):
+        print(dataset.groupby('category', observed=True).size())
+    if args.output:
+        save_dataset(dataset, args.output, csv_only=args.csv_only)